@@ -0,0 +1,90 @@
+"""Benchmark batch throughput against the number of worker processes.
+
+Runs the same offline prompt set through `run_batch` with 1, 2, 4... worker
+processes. The stand-in model waits a fixed latency per request, like a
+remote API, and calls a tool every other prompt, so per-process CPU
+(validation, JSON, message handling) is what limits throughput. It should
+scale close to linearly until the number of CPUs.
+
+Usage:
+    uv run python benchmarks/bench_batch.py [--prompts 1000] [--workers 1,2,4]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from nestor.batch import run_batch
+
+# Seconds per model request, like a fast remote model
+MODEL_LATENCY = 0.02
+
+
+def stand_in_model() -> FunctionModel:
+    """Model with fixed latency calling `get_current_time` for odd prompts."""
+
+    async def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        await asyncio.sleep(MODEL_LATENCY)
+        last = messages[-1].parts[-1]
+        if isinstance(last, UserPromptPart) and str(last.content).endswith(
+            ("1", "3", "5", "7", "9")
+        ):
+            return ModelResponse(
+                parts=[ToolCallPart("get_current_time", {"timezone": "Europe/Madrid"})]
+            )
+        return ModelResponse(parts=[TextPart("Sure! " + "lorem ipsum " * 50)])
+
+    return FunctionModel(respond)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prompts", type=int, default=1000)
+    parser.add_argument(
+        "--workers",
+        default=",".join(str(2**i) for i in range((os.cpu_count() or 1).bit_length())),
+        help="Comma-separated worker counts",
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    prompts = [f"Question number {i}" for i in range(args.prompts)]
+    print(f"{os.cpu_count()} CPUs, {args.prompts} prompts")
+
+    baseline = None
+    for workers in map(int, args.workers.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            results = list(
+                run_batch(
+                    prompts,
+                    store_path=Path(tmp) / "batch.sqlite",
+                    workers=workers,
+                    concurrency=args.concurrency,
+                    model=stand_in_model,
+                )
+            )
+            elapsed = time.perf_counter() - start
+        assert all(r.error is None for r in results)
+        rate = len(results) / elapsed
+        baseline = baseline or rate
+        print(
+            f"  {workers:>2} workers: {rate:>7.1f} prompts/s "
+            f"({rate / baseline:.2f}x, {elapsed:.1f}s incl. start-up)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark the overhead of metrics.
+
+Times single metric updates, the metering added to every tool call, and
+exposing a registry of realistic size. Compare against the milliseconds of
+a cached tool call or the seconds of a model request.
+
+Usage:
+    uv run python benchmarks/bench_metrics.py [--iterations 200000]
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import Callable
+
+from nestor.agents.execution import INLINE, ToolTraits, executed
+from nestor.metrics import Registry
+
+
+def per_call(func: Callable[[], object], iterations: int) -> float:
+    """Nanoseconds per call, best of 3."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            func()
+        best = min(best, (time.perf_counter_ns() - start) / iterations)
+    return best
+
+
+def per_await(func: Callable[[], object], iterations: int) -> float:
+    """Nanoseconds per awaited call, best of 3."""
+
+    async def run() -> float:
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter_ns()
+            for _ in range(iterations):
+                await func()  # type: ignore[misc]
+            best = min(best, (time.perf_counter_ns() - start) / iterations)
+        return best
+
+    return asyncio.run(run())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--series", type=int, default=200)
+    args = parser.parse_args()
+    n = args.iterations
+
+    registry = Registry()
+    counter = registry.counter("bench_total", "Bench.", ("tool",))
+    histogram = registry.histogram("bench_seconds", "Bench.", ("tool",))
+    gauge = registry.gauge("bench_in_flight", "Bench.", ("tool",))
+    child = counter.labels("a")
+    observed = histogram.labels("a")
+    tracked = gauge.labels("a")
+
+    def track() -> None:
+        with tracked.track():
+            pass
+
+    print(f"Counter inc:          {per_call(child.inc, n):>8.0f} ns")
+    print(
+        f"Counter labels + inc: {per_call(lambda: counter.labels('a').inc(), n):>8.0f} ns"
+    )
+    print(
+        f"Histogram observe:    {per_call(lambda: observed.observe(0.3), n):>8.0f} ns"
+    )
+    print(f"Gauge track:          {per_call(track, n):>8.0f} ns")
+
+    # Metering of a tool call: duration, errors, in flight and queue time
+    async def tool() -> None:
+        pass
+
+    bare = per_await(tool, n // 4)
+    inline = per_await(executed(tool, INLINE), n // 4)
+    limited = per_await(executed(tool, ToolTraits(max_concurrency=8)), n // 4)
+    print(f"Tool call, bare:      {bare:>8.0f} ns")
+    print(f"Tool call, inline:    {inline:>8.0f} ns (+{inline - bare:.0f} ns)")
+    print(f"Tool call, limited:   {limited:>8.0f} ns (+{limited - bare:.0f} ns)")
+
+    # Scrape cost: a histogram has 16 samples per series
+    for i in range(args.series):
+        histogram.labels(f"tool{i}").observe(0.1)
+        counter.labels(f"tool{i}").inc()
+    start = time.perf_counter()
+    text = registry.expose()
+    elapsed = time.perf_counter() - start
+    print(
+        f"Expose {args.series} series:   {elapsed * 1000:>8.2f} ms "
+        f"({len(text.splitlines())} lines)"
+    )
+
+
+if __name__ == "__main__":
+    main()
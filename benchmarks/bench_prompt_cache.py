@@ -0,0 +1,148 @@
+"""Benchmark prompt cache hits across a multi-turn session.
+
+Drives an interactive-style session through the assistant agent with an
+offline model that simulates OpenAI prompt caching: requests hit the cache
+for their longest previously seen prefix, in 128-token steps from 1024
+tokens. Compares Néstor's stable layout with a volatile one (timestamp in
+the instructions, unordered tools) to show what the prefix discipline buys.
+
+Usage:
+    uv run python benchmarks/bench_prompt_cache.py [--turns 20]
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import hashlib
+import json
+import random
+from datetime import datetime
+
+from pydantic import SecretStr
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from pydantic_ai.usage import RequestUsage
+
+from nestor import AssistantDeps, create_assistant_agent
+from nestor.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+MIN_CACHED_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+
+PROMPTS = [
+    ("What day is it today?", "get_current_date"),
+    ("Tell me a fun fact about octopuses.", None),
+    ("What time is it in Tokyo?", "get_current_time"),
+    ("Summarize the plot of the Divine Comedy in two sentences.", None),
+]
+
+
+class SimulatedPromptCache:
+    """Longest-prefix cache in fixed token steps, like OpenAI's."""
+
+    def __init__(self) -> None:
+        self.seen: set[bytes] = set()
+
+    def request(self, text: str) -> int:
+        """Cached tokens for a request, remembering its prefixes."""
+        cached = 0
+        hit = True
+        tokens = MIN_CACHED_TOKENS
+        while tokens <= estimate_tokens(text):
+            digest = hashlib.blake2b(
+                text[: tokens * CHARS_PER_TOKEN].encode(), digest_size=16
+            ).digest()
+            if hit and digest in self.seen:
+                cached = tokens
+            else:
+                hit = False
+                self.seen.add(digest)
+            tokens += CACHE_STEP_TOKENS
+        return cached
+
+
+def serialize(
+    messages: list[ModelMessage], info: AgentInfo, volatile: bool, rng: random.Random
+) -> str:
+    """Approximate the text of a chat completions request, prefix first."""
+    tools = [dataclasses.asdict(tool) for tool in info.function_tools]
+    instructions = info.instructions or ""
+    if volatile:
+        instructions = f"Current time: {datetime.now().isoformat()}\n{instructions}"
+        rng.shuffle(tools)
+    parts = [
+        {"kind": part.part_kind, "content": str(getattr(part, "content", ""))}
+        | ({"tool": part.tool_name} if hasattr(part, "tool_name") else {})
+        for message in messages
+        for part in message.parts
+    ]
+    return json.dumps([instructions, tools, parts], ensure_ascii=False)
+
+
+async def session(turns: int, volatile: bool) -> list[tuple[int, int]]:
+    """Run a session; returns (input, cached) tokens per turn."""
+    cache = SimulatedPromptCache()
+    rng = random.Random(42)
+    per_request: list[tuple[int, int]] = []
+
+    def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        text = serialize(messages, info, volatile, rng)
+        usage = RequestUsage(
+            input_tokens=estimate_tokens(text),
+            cache_read_tokens=cache.request(text),
+            output_tokens=20,
+        )
+        per_request.append((usage.input_tokens, usage.cache_read_tokens))
+
+        last = messages[-1].parts[-1]
+        if isinstance(last, UserPromptPart):
+            tool = dict(PROMPTS)[str(last.content)]
+            if tool:
+                return ModelResponse(parts=[ToolCallPart(tool, {})], usage=usage)
+        answer = "Here you go: " + " ".join(["lorem ipsum dolor sit amet"] * 30)
+        return ModelResponse(parts=[TextPart(answer)], usage=usage)
+
+    agent = create_assistant_agent(api_key=SecretStr("offline"))
+    deps = AssistantDeps(
+        search_backend="auto", safesearch="moderate", default_location="Madrid"
+    )
+    history: list[ModelMessage] = []
+    totals = []
+    with agent.override(model=FunctionModel(respond)):
+        for turn in range(turns):
+            prompt, _ = PROMPTS[turn % len(PROMPTS)]
+            before = len(per_request)
+            result = await agent.run(prompt, deps=deps, message_history=history)
+            history = result.all_messages()
+            requests = per_request[before:]
+            totals.append((sum(i for i, _ in requests), sum(c for _, c in requests)))
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    for name, volatile in (("stable", False), ("volatile", True)):
+        totals = asyncio.run(session(args.turns, volatile))
+        input_tokens = sum(i for i, _ in totals)
+        cached = sum(c for _, c in totals)
+        last_input, last_cached = totals[-1]
+        print(f"{name} layout ({args.turns} turns):")
+        print(f"  Input tokens:    {input_tokens}")
+        print(f"  Cached tokens:   {cached} ({cached / input_tokens:.0%} hit ratio)")
+        print(
+            f"  Last turn:       {last_cached}/{last_input} cached "
+            f"({last_cached / last_input:.0%})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark search result post-processing.
+
+Reports prompt tokens saved and CPU time added by rerank/dedup/trim over
+synthetic DDGS-like result sets (long snippets, mirrored pages, tracking
+URLs).
+
+Usage:
+    uv run python benchmarks/bench_websearch.py [--iterations 2000]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from nestor import defaults
+from nestor.tokens import estimate_tokens
+from nestor.tools.websearch import SearchResult, postprocess
+
+WORDS = (
+    "python language programming guide tutorial release version library "
+    "data science web framework async performance memory typing module "
+    "package install community documentation example beginner advanced"
+).split()
+
+
+def make_results(rng: random.Random, n: int = 10) -> list[SearchResult]:
+    """Synthetic results: ~30% mirrors/duplicates, 40-80 word snippets."""
+    results: list[SearchResult] = []
+    for i in range(n):
+        if results and rng.random() < 0.3:
+            original = rng.choice(results)
+            results.append(
+                {
+                    "title": original["title"],
+                    "href": original["href"] + "?utm_source=feed",
+                    "body": original["body"] + " " + rng.choice(WORDS),
+                }
+            )
+            continue
+        body = " ".join(rng.choices(WORDS, k=rng.randint(40, 80)))
+        results.append(
+            {
+                "title": " ".join(rng.choices(WORDS, k=6)).title(),
+                "href": f"https://site{i}.example.com/{rng.choice(WORDS)}",
+                "body": body,
+            }
+        )
+    return results
+
+
+def tokens(results: list[SearchResult]) -> int:
+    return estimate_tokens(json.dumps(results, ensure_ascii=False))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--budget", type=int, default=defaults.SEARCH_TOKEN_BUDGET)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    query = "python async performance"
+    samples = [make_results(rng) for _ in range(args.iterations)]
+
+    before, after, kept, timings = [], [], [], []
+    for results in samples:
+        start = time.perf_counter()
+        processed = postprocess(query, results, args.budget)
+        timings.append(time.perf_counter() - start)
+        before.append(tokens(results))
+        after.append(tokens(processed))
+        kept.append(len(processed))
+
+    saved = 1 - sum(after) / sum(before)
+    print(f"Result sets:       {args.iterations} × {len(samples[0])} results")
+    print(f"Token budget:      {args.budget}")
+    print(
+        f"Prompt tokens:     {statistics.mean(before):.0f} → "
+        f"{statistics.mean(after):.0f} per call ({saved:.0%} saved)"
+    )
+    print(f"Results kept:      {statistics.mean(kept):.1f} per call")
+    print(
+        f"CPU time added:    p50 {statistics.median(timings) * 1e6:.0f} µs, "
+        f"max {max(timings) * 1e6:.0f} µs per call"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Memory soak test for long-running embedders.
+
+Drives thousands of offline turns through `create_assistant_agent`: a
+scripted model calls every tool with ever-changing arguments, and
+Open-Meteo, web pages and DDGS are replaced by in-process stand-ins. After
+a warm-up that fills all caches, allocations are traced with tracemalloc
+and growth is reported per subsystem. Exits with status 1 if memory grew
+more than the threshold, so it can gate releases.
+
+Usage:
+    uv run python benchmarks/soak_memory.py [--turns 500] [--max-growth-kib 2048]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+
+import httpx
+from pydantic import SecretStr
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from nestor import AssistantDeps, create_assistant_agent, http
+from nestor.diagnostics import AllocationTracker, memory_report
+from nestor.history import trim_history
+from nestor.tools import weather, websearch
+
+# More distinct arguments than any cache holds, so caches churn
+LOCATIONS = 1200
+QUERIES = 600
+PAGES = 300
+# Turns per simulated conversation, and history kept within it
+SESSION_TURNS = 40
+HISTORY_TURNS = 10
+
+PAGE = (
+    "<html><head><title>Page {n}</title></head><body><nav>Menu</nav>"
+    "<main>{text}</main></body></html>"
+)
+
+
+def open_meteo_and_pages(request: httpx.Request) -> httpx.Response:
+    """Stand-in for Open-Meteo and arbitrary web pages."""
+    params = request.url.params
+    if str(request.url).startswith(weather.GEOCODING_API):
+        name = params["name"]
+        result = {
+            "name": name,
+            "country": "Spain",
+            "latitude": 40 + hash(name) % 1000 / 1000,
+            "longitude": -3.7,
+            "elevation": 650.0,
+        }
+        return httpx.Response(200, json={"results": [result]})
+
+    if str(request.url).startswith(weather.FORECAST_API):
+        today = datetime.now(UTC).date()
+        if "daily" in params:
+            n = int(params["forecast_days"])
+            days = [(today + timedelta(days=i)).isoformat() for i in range(n)]
+            series = {v: [1] * n for v in params["daily"].split(",")}
+            body = {"utc_offset_seconds": 0, "daily": {"time": days, **series}}
+        else:
+            date = params["start_date"]
+            hours = [f"{date}T{h:02d}:00" for h in range(24)]
+            series = {v: [1] * 24 for v in params["hourly"].split(",")}
+            body = {"utc_offset_seconds": 0, "hourly": {"time": hours, **series}}
+        return httpx.Response(200, json=body)
+
+    n = request.url.path.strip("/")
+    text = "<p>" + "Lorem ipsum dolor sit amet. " * 200 + "</p>"
+    return httpx.Response(
+        200,
+        headers={"content-type": "text/html", "etag": f'"{n}"'},
+        text=PAGE.format(n=n, text=text),
+    )
+
+
+class StandInDDGS:
+    """Offline DDGS returning synthetic results."""
+
+    def __init__(self, timeout: int):
+        self.timeout = timeout
+
+    def text(self, query: str, **kwargs: object) -> list[dict[str, str]]:
+        return [
+            {
+                "title": f"{query} result {i}",
+                "href": f"https://example.com/{query.replace(' ', '-')}/{i}",
+                "body": f"About {query}. " * 20,
+            }
+            for i in range(int(str(kwargs.get("max_results") or 5)))
+        ]
+
+
+def scripted_model() -> FunctionModel:
+    """Model calling every tool with new arguments each turn, then answering."""
+    turn = 0
+
+    def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        nonlocal turn
+        if not isinstance(messages[-1].parts[-1], UserPromptPart):
+            return ModelResponse(parts=[TextPart("Here is what I found. " * 10)])
+
+        turn += 1
+        calls = [
+            ToolCallPart("get_weather", {"location": f"Town {turn % LOCATIONS}"}),
+            ToolCallPart(
+                "get_hourly_forecast", {"location": f"Town {turn % LOCATIONS}"}
+            ),
+            ToolCallPart(
+                "web_search",
+                {
+                    "query": f"topic {turn % QUERIES}",
+                    "max_results": 5,
+                    "region": "ww-en",
+                    "timelimit": None,
+                },
+            ),
+            ToolCallPart("fetch_page", {"url": f"https://example.com/{turn % PAGES}"}),
+            ToolCallPart("get_current_date", {}),
+        ]
+        return ModelResponse(parts=calls)
+
+    return FunctionModel(respond)
+
+
+async def soak(turns: int) -> None:
+    """Run `turns` turns in conversations of `SESSION_TURNS`."""
+    agent = create_assistant_agent(api_key=SecretStr("offline"))
+    deps = AssistantDeps(
+        search_backend="auto", safesearch="moderate", default_location="Madrid"
+    )
+    history: list[ModelMessage] = []
+    with agent.override(model=scripted_model()):
+        for turn in range(turns):
+            if turn % SESSION_TURNS == 0:
+                history = []
+            result = await agent.run(
+                f"Question {turn}", deps=deps, message_history=history
+            )
+            history = trim_history(result.all_messages(), HISTORY_TURNS)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=None)
+    parser.add_argument("--max-growth-kib", type=float, default=2048)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    # Cycle through every argument once, filling all caches
+    warmup = args.warmup or max(LOCATIONS, QUERIES, PAGES)
+
+    http.transport = httpx.MockTransport(open_meteo_and_pages)
+    websearch.ddgs_pool.factory = StandInDDGS  # type: ignore[assignment]
+
+    async def run() -> list:
+        # Trace the warm-up too, so entries evicted later are accounted for
+        tracker = AllocationTracker(frames=5)
+        tracker.start()
+        start = time.perf_counter()
+        await soak(warmup)
+        print(f"Warm-up:  {warmup} turns in {time.perf_counter() - start:.1f}s")
+
+        tracker.start()
+        start = time.perf_counter()
+        await soak(args.turns)
+        print(f"Measured: {args.turns} turns in {time.perf_counter() - start:.1f}s")
+        growth = tracker.growth()
+        tracker.stop()
+        return growth
+
+    growth = asyncio.run(run())
+    total = sum(g.size for g in growth)
+
+    print(f"\nTop growth by subsystem ({args.turns} turns):")
+    for g in growth[: args.top]:
+        print(f"  {g}")
+    print(f"\n{memory_report().format()}")
+    print(f"\nTotal growth: {total / 1024:+.1f} KiB (limit {args.max_growth_kib} KiB)")
+
+    if total > args.max_growth_kib * 1024:
+        print("FAIL: memory grew beyond the limit")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main()
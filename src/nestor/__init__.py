@@ -3,11 +3,29 @@
 from importlib.metadata import version
 
 from .agents.assistant import create_assistant_agent
+from .answers import AnswerCache
+from .deadline import Deadline, run_with_deadline
 from .dependencies import AssistantDeps
+from .diagnostics import memory_report
+from .digest import Subscriber, build_digests
+from .speculation import Speculation
+from .tenants import Tenancy, UserProfile
+from .warmup import Warmer, warm_up
 
 __version__ = version("nestor")
 
 __all__ = [
     "create_assistant_agent",
+    "AnswerCache",
     "AssistantDeps",
+    "build_digests",
+    "Deadline",
+    "memory_report",
+    "run_with_deadline",
+    "Speculation",
+    "Subscriber",
+    "Tenancy",
+    "UserProfile",
+    "Warmer",
+    "warm_up",
 ]
@@ -1,14 +1,24 @@
 """Agent creation utilities for Néstor."""
 
+from collections.abc import Sequence
 from types import NoneType
-from typing import TypeVar
+from typing import Any, TypeVar
 
 from pydantic import SecretStr
 from pydantic_ai import Agent
+from pydantic_ai.models import Model
 from pydantic_ai.models.openai import OpenAIChatModel
 from pydantic_ai.providers.openai import OpenAIProvider
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.tools import ToolsPrepareFunc
+from pydantic_ai.toolsets import AbstractToolset
 
 from .. import defaults
+from .backends import ModelBackend
+from .metered import MeteredModel
+from .prefix import stable_tool_order, stably_ordered
+from .routing import RoutedModel
+from .scheduler import RequestScheduler, ScheduledModel
 
 T = TypeVar("T")
 D = TypeVar("D")
@@ -17,32 +27,69 @@ D = TypeVar("D")
 def create_agent(
     output_type: type[T],
     *,
-    api_key: SecretStr,
+    api_key: SecretStr | None = None,
     instructions: str = "You are Néstor, a helpful AI assistant.",
     model_name: str = defaults.MODEL,
     max_retries: int = defaults.MAX_RETRIES,
     deps_type: type[D] | None = None,
     name: str | None = None,
+    scheduler: RequestScheduler | None = None,
+    toolsets: Sequence[AbstractToolset[Any]] | None = None,
+    fallback_models: Sequence[str] = (),
+    escalate_model: str | None = None,
+    hedge_after: float | None = None,
+    max_latency: float | None = None,
+    model_settings: ModelSettings | None = None,
+    backend: ModelBackend | None = None,
+    prepare_tools: ToolsPrepareFunc[Any] | None = None,
 ) -> Agent[D, T]:
     """Create a Néstor agent with common configuration.
 
     Args:
         output_type: Type of the agent's output
-        api_key: OpenAI API key for authentication
+        api_key: API key for authentication (optional for local backends)
         instructions: Agent instructions (role, capabilities, style)
-        model_name: The name of the OpenAI model to use
+        model_name: The name of the model to use
         max_retries: Maximum number of retries on model failures
         deps_type: Optional dependency type (None for no dependencies)
         name: Agent name, used for pydantic-ai's internal identification
+        scheduler: Optional shared scheduler enforcing provider rate limits
+        toolsets: Toolsets available to the agent
+        fallback_models: Models tried, in order, when the primary fails or
+            is slow
+        escalate_model: Stronger model for prompts classified as hard
+        hedge_after: Seconds before racing a slow request against the next
+            model (requires fallbacks)
+        max_latency: Demote models whose recent p95 latency exceeds this
+        model_settings: Default model settings for every run
+        backend: Model server and connection pool. Defaults to OpenAI.
+        prepare_tools: Selects or modifies the tools of each request, e.g. a
+            `ToolSelector`. Tools are then sent in stable order.
 
     Returns:
         Configured agent instance
     """
+    backend = backend or ModelBackend()
+    if scheduler is None:
+        client = backend.client(api_key)
+    else:
+        # Scheduled models retry themselves; SDK retries would bypass the queue
+        client = backend.client(api_key, max_retries=0)
+    provider = OpenAIProvider(openai_client=client)
 
-    model = OpenAIChatModel(
-        model_name,
-        provider=OpenAIProvider(api_key=api_key.get_secret_value()),
-    )
+    def build(model_id: str) -> Model:
+        model: Model = MeteredModel(OpenAIChatModel(model_id, provider=provider))
+        return model if scheduler is None else ScheduledModel(model, scheduler)
+
+    model = build(model_name)
+    if fallback_models or escalate_model:
+        model = RoutedModel(
+            model,
+            *map(build, fallback_models),
+            escalate=build(escalate_model) if escalate_model else None,
+            hedge_after=hedge_after,
+            max_latency=max_latency,
+        )
 
     return Agent(
         model=model,
@@ -51,4 +98,12 @@ def create_agent(
         retries=max_retries,
         name=name,
         deps_type=deps_type or NoneType,
+        toolsets=toolsets,
+        # Byte-stable tool order keeps the request prefix cacheable
+        prepare_tools=(
+            stable_tool_order
+            if prepare_tools is None
+            else stably_ordered(prepare_tools)
+        ),
+        model_settings=model_settings,
     )
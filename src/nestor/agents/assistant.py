@@ -1,15 +1,71 @@
 """Néstor's main assistant agent."""
 
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+from typing import TYPE_CHECKING, Any
+
 from pydantic import SecretStr
 from pydantic_ai import Agent
+from pydantic_ai.models.openai import OpenAIChatModelSettings
+from pydantic_ai.toolsets import FunctionToolset
 
 from .. import defaults
 from ..dependencies import AssistantDeps
-from ..tools.datetime import get_current_date, get_current_time
+from ..ledger import recorded
+from ..tools.datetime import get_current_date, get_current_time, get_current_times
 from ..tools.weather import get_hourly_forecast, get_weather
+from ..tools.webpage import fetch_page
 from ..tools.websearch import web_search
 from . import create_agent
+from .backends import ModelBackend, backend_from_settings
+from .execution import INLINE, ToolTraits, executed
+from .prefix import prompt_cache_key
+from .scheduler import RequestScheduler
+from .selection import (
+    SEARCH_PATTERN,
+    TIME_PATTERN,
+    WEATHER_PATTERN,
+    ToolGroup,
+    ToolSelector,
+)
+
+if TYPE_CHECKING:
+    from ..config import Settings
+
+TOOLS: list[tuple[Callable[..., Any], ToolTraits]] = [
+    (get_current_date, INLINE),
+    (get_current_time, INLINE),
+    (get_current_times, INLINE),
+    (web_search, ToolTraits(max_concurrency=4)),
+    (fetch_page, ToolTraits(max_concurrency=8)),
+    (get_weather, ToolTraits(max_concurrency=8)),
+    (get_hourly_forecast, ToolTraits(max_concurrency=8)),
+]
+"""Assistant tools and how they're executed (see `execution`)."""
 
+TOOL_GROUPS = [
+    ToolGroup(
+        "time",
+        frozenset({"get_current_date", "get_current_time", "get_current_times"}),
+        TIME_PATTERN,
+        always=True,
+    ),
+    ToolGroup(
+        "weather", frozenset({"get_weather", "get_hourly_forecast"}), WEATHER_PATTERN
+    ),
+    ToolGroup(
+        "search",
+        frozenset({"web_search", "fetch_page"}),
+        SEARCH_PATTERN,
+        catch_all=True,
+    ),
+]
+"""Tool groups exposed per run (see `selection`). The time tools are tiny and
+weather questions need today's date, so they're exposed with any group.
+Search answers anything else a prompt asks."""
+
+# Static, so requests share a cacheable prefix (see `prefix`)
 INSTRUCTIONS = """You are Néstor, a helpful AI assistant.
 
 Be concise and friendly in your responses."""
@@ -17,12 +73,33 @@ Be concise and friendly in your responses."""
 
 def create_assistant_agent(
     *,
-    api_key: SecretStr,
+    api_key: SecretStr | None = None,
     model_name: str = defaults.MODEL,
     max_retries: int = defaults.MAX_RETRIES,
+    scheduler: RequestScheduler | None = None,
+    fallback_models: Sequence[str] = (),
+    escalate_model: str | None = None,
+    hedge_after: float | None = None,
+    max_latency: float | None = None,
+    backend: ModelBackend | None = None,
+    select_tools: bool = True,
 ) -> Agent[AssistantDeps, str]:
-    """Create assistant agent with explicit configuration."""
-    agent = create_agent(
+    """Create assistant agent with explicit configuration.
+
+    With `select_tools`, each run only sees the tool groups its prompt
+    likely needs (see `selection`).
+    """
+    toolset = create_assistant_toolset(max_retries)
+
+    model_settings = None
+    if backend is None or backend.supports_prompt_cache_key:
+        # From all tools, so every selection is routed to the same cache
+        tool_defs = [tool.tool_def for tool in toolset.tools.values()]
+        model_settings = OpenAIChatModelSettings(
+            openai_prompt_cache_key=prompt_cache_key(INSTRUCTIONS, tool_defs)
+        )
+
+    return create_agent(
         output_type=str,
         instructions=INSTRUCTIONS,
         name="assistant",
@@ -30,12 +107,41 @@ def create_assistant_agent(
         model_name=model_name,
         max_retries=max_retries,
         deps_type=AssistantDeps,
+        scheduler=scheduler,
+        toolsets=[recorded(toolset)],
+        fallback_models=fallback_models,
+        escalate_model=escalate_model,
+        hedge_after=hedge_after,
+        max_latency=max_latency,
+        model_settings=model_settings,
+        backend=backend,
+        prepare_tools=ToolSelector(TOOL_GROUPS) if select_tools else None,
     )
 
-    agent.tool(get_current_date)
-    agent.tool(get_current_time)
-    agent.tool(web_search)
-    agent.tool(get_weather)
-    agent.tool(get_hourly_forecast)
 
-    return agent
+def create_assistant_toolset(
+    max_retries: int = defaults.MAX_RETRIES,
+) -> FunctionToolset[AssistantDeps]:
+    """The assistant's tools, wrapped with their execution traits."""
+    return FunctionToolset[AssistantDeps](
+        [executed(func, traits) for func, traits in TOOLS],
+        max_retries=max_retries,
+    )
+
+
+def assistant_from_settings(
+    settings: Settings, scheduler: RequestScheduler | None = None
+) -> Agent[AssistantDeps, str]:
+    """Create the assistant agent configured by application settings."""
+    return create_assistant_agent(
+        api_key=settings.openai_api_key,
+        model_name=settings.default_model,
+        max_retries=settings.max_retries,
+        scheduler=scheduler,
+        fallback_models=settings.fallback_models,
+        escalate_model=settings.escalate_model,
+        hedge_after=settings.hedge_after,
+        max_latency=settings.route_max_latency,
+        backend=backend_from_settings(settings),
+        select_tools=settings.select_tools,
+    )
@@ -0,0 +1,112 @@
+"""Model backends: OpenAI, or any server speaking its chat completions API.
+
+Local servers such as llama.cpp (`llama-server`), vLLM and Ollama expose an
+OpenAI-compatible API, so the same agent can run against them by changing
+the base URL. A `ModelBackend` also tunes the HTTP connection pool: local
+servers are cheap to keep many connections open to, and cold model loads
+may need a longer read timeout than the cloud.
+
+Example:
+    >>> backend = ModelBackend(
+    ...     provider="openai-compatible", base_url="http://localhost:8080/v1"
+    ... )
+    >>> agent = create_assistant_agent(model_name="qwen3-8b", backend=backend)
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import httpx
+from openai import DEFAULT_MAX_RETRIES, AsyncOpenAI
+from pydantic import SecretStr
+
+from .. import defaults
+
+if TYPE_CHECKING:
+    from ..config import Settings
+
+# The OpenAI SDK requires a key; local servers usually ignore it
+PLACEHOLDER_API_KEY = "not-needed"
+
+
+@dataclass(frozen=True)
+class ModelBackend:
+    """Where model requests go and how their connections are pooled."""
+
+    provider: defaults.ModelProvider = defaults.MODEL_PROVIDER
+    """"openai", or "openai-compatible" for other servers."""
+
+    base_url: str | None = None
+    """API base URL, e.g. "http://localhost:8080/v1". None for OpenAI."""
+
+    max_connections: int = defaults.MODEL_MAX_CONNECTIONS
+    max_keepalive_connections: int = defaults.MODEL_MAX_KEEPALIVE_CONNECTIONS
+    keepalive_expiry: float = defaults.MODEL_KEEPALIVE_EXPIRY
+    """Seconds an idle connection is kept for reuse."""
+
+    timeout: float = defaults.MODEL_TIMEOUT
+    """Seconds to wait for each read, e.g. the first token of a cold model."""
+
+    connect_timeout: float = defaults.MODEL_CONNECT_TIMEOUT
+
+    @property
+    def supports_prompt_cache_key(self) -> bool:
+        """Whether requests may carry OpenAI's `prompt_cache_key`.
+
+        Other servers cache prompt prefixes on their own, and some reject
+        unknown request fields.
+        """
+        return self.provider == "openai"
+
+    def client(
+        self, api_key: SecretStr | None, max_retries: int = DEFAULT_MAX_RETRIES
+    ) -> AsyncOpenAI:
+        """OpenAI client with this backend's URL, pool and timeouts.
+
+        Args:
+            api_key: API key. Optional for OpenAI-compatible servers; OpenAI
+                falls back to the `OPENAI_API_KEY` environment variable.
+            max_retries: SDK retries on connection errors and rate limits
+        """
+        key = api_key.get_secret_value() if api_key is not None else None
+        if key is None and self.provider != "openai":
+            key = PLACEHOLDER_API_KEY
+        timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            timeout=timeout,
+        )
+        return AsyncOpenAI(
+            api_key=key,
+            base_url=self.base_url,
+            timeout=timeout,
+            max_retries=max_retries,
+            http_client=http_client,
+        )
+
+
+def backend_from_settings(settings: Settings) -> ModelBackend:
+    """Model backend from application settings.
+
+    Raises:
+        ValueError: If OpenAI is the provider and no API key is configured.
+            Checked here, not on import, so commands and tests that never
+            build a model don't need one.
+    """
+    if settings.llm_provider == "openai" and settings.openai_api_key is None:
+        raise ValueError("NESTOR_OPENAI_API_KEY is required for the OpenAI provider")
+    return ModelBackend(
+        provider=settings.llm_provider,
+        base_url=settings.llm_base_url,
+        max_connections=settings.llm_max_connections,
+        max_keepalive_connections=settings.llm_max_keepalive_connections,
+        keepalive_expiry=settings.llm_keepalive_expiry,
+        timeout=settings.llm_timeout,
+        connect_timeout=settings.llm_connect_timeout,
+    )
@@ -0,0 +1,145 @@
+"""Compare model backends on time to first token and throughput.
+
+Streams the same prompts through each backend and times every response:
+time to first token (TTFT) is what users feel in interactive sessions, and
+decode throughput (tokens per second after the first) bounds how quickly
+long answers arrive. Aggregate throughput over concurrent requests shows how
+well a server batches.
+
+Example:
+    >>> local = create_agent(str, model_name="qwen3-8b", backend=backend)
+    >>> result = await benchmark(local, PROMPTS, concurrency=4)
+    >>> print(result.ttft_p50, result.decode_rate)
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+from pydantic_ai import Agent
+
+from ..ledger import percentile
+from ..tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+PROMPTS = (
+    "In one sentence, what is the capital of Spain?",
+    "Explain how a hash map works in three short paragraphs.",
+    "Write a haiku about Segovia's aqueduct.",
+    "List ten tips for staying focused while working from home.",
+    "Summarize the plot of Don Quixote in about 150 words.",
+)
+
+
+@dataclass(frozen=True)
+class StreamTiming:
+    """Timing of one streamed response."""
+
+    ttft: float
+    """Seconds until the first text arrived."""
+
+    total: float
+    """Seconds until the response was complete."""
+
+    output_tokens: int
+
+    @property
+    def decode_rate(self) -> float:
+        """Output tokens per second after the first token."""
+        decoding = self.total - self.ttft
+        return self.output_tokens / decoding if decoding > 0 else 0.0
+
+
+@dataclass
+class BenchmarkResult:
+    """Timings of a backend over a prompt set."""
+
+    timings: list[StreamTiming] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+    """Wall-clock seconds for all requests."""
+
+    @property
+    def ttft_p50(self) -> float:
+        return percentile([t.ttft for t in self.timings], 50)
+
+    @property
+    def ttft_p95(self) -> float:
+        return percentile([t.ttft for t in self.timings], 95)
+
+    @property
+    def decode_rate(self) -> float:
+        """Median per-request decode throughput in tokens per second."""
+        return percentile([t.decode_rate for t in self.timings], 50)
+
+    @property
+    def throughput(self) -> float:
+        """Output tokens per second across all requests."""
+        tokens = sum(t.output_tokens for t in self.timings)
+        return tokens / self.elapsed if self.elapsed > 0 else 0.0
+
+
+async def time_stream(agent: Agent[None, str], prompt: str) -> StreamTiming:
+    """Stream one answer, timing its first token and completion."""
+    start = time.perf_counter()
+    ttft = None
+    text = []
+    async with agent.run_stream(prompt) as result:
+        # Undebounced, so deltas are timed when they arrive
+        async for delta in result.stream_text(delta=True, debounce_by=None):
+            if ttft is None and delta:
+                ttft = time.perf_counter() - start
+            text.append(delta)
+        total = time.perf_counter() - start
+        # Some servers don't report usage when streaming
+        tokens = result.usage().output_tokens or estimate_tokens("".join(text))
+    return StreamTiming(
+        ttft=total if ttft is None else ttft, total=total, output_tokens=tokens
+    )
+
+
+async def benchmark(
+    agent: Agent[None, str],
+    prompts: Sequence[str] = PROMPTS,
+    *,
+    repeat: int = 1,
+    concurrency: int = 1,
+    warmup: bool = True,
+) -> BenchmarkResult:
+    """Time streamed answers to `prompts`.
+
+    Args:
+        agent: Agent on the backend to measure (without tools)
+        prompts: Prompts, each sent `repeat` times
+        repeat: Rounds over the prompt set
+        concurrency: Requests in flight at once
+        warmup: Send an untimed request first, so connection setup and cold
+            model loads aren't measured
+
+    Returns:
+        Timings; failed requests are counted, not raised
+    """
+    result = BenchmarkResult()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(prompt: str) -> None:
+        async with semaphore:
+            try:
+                result.timings.append(await time_stream(agent, prompt))
+            except Exception as e:
+                logger.warning("Benchmark request failed: %r", e)
+                result.errors += 1
+
+    if warmup:
+        try:
+            await time_stream(agent, prompts[0])
+        except Exception as e:
+            logger.warning("Benchmark warm-up failed: %r", e)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(prompt) for _ in range(repeat) for prompt in prompts))
+    result.elapsed = time.perf_counter() - start
+    return result
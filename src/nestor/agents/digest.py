@@ -0,0 +1,56 @@
+"""Agent writing weather digest summaries (see `nestor.digest`)."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from pydantic import SecretStr
+from pydantic_ai import Agent
+
+from .. import defaults
+from . import create_agent
+from .backends import ModelBackend, backend_from_settings
+from .scheduler import RequestScheduler
+
+if TYPE_CHECKING:
+    from ..config import Settings
+
+INSTRUCTIONS = """You write the weather part of a morning digest.
+
+You receive today's forecast for one location as JSON. Summarize it in one
+or two short, friendly sentences with practical advice (umbrella, coat,
+sunscreen). Don't greet anyone or repeat the location name."""
+
+
+def create_digest_agent(
+    *,
+    api_key: SecretStr | None = None,
+    model_name: str = defaults.MODEL,
+    max_retries: int = defaults.MAX_RETRIES,
+    scheduler: RequestScheduler | None = None,
+    backend: ModelBackend | None = None,
+) -> Agent[None, str]:
+    """Create the digest summary agent. It has no tools."""
+    return create_agent(
+        output_type=str,
+        instructions=INSTRUCTIONS,
+        name="digest",
+        api_key=api_key,
+        model_name=model_name,
+        max_retries=max_retries,
+        scheduler=scheduler,
+        backend=backend,
+    )
+
+
+def digest_agent_from_settings(
+    settings: Settings, scheduler: RequestScheduler | None = None
+) -> Agent[None, str]:
+    """Create the digest summary agent configured by application settings."""
+    return create_digest_agent(
+        api_key=settings.openai_api_key,
+        model_name=settings.default_model,
+        max_retries=settings.max_retries,
+        scheduler=scheduler,
+        backend=backend_from_settings(settings),
+    )
@@ -0,0 +1,194 @@
+"""Tool execution traits: where tool calls run and how many at once.
+
+pydantic-ai sends every sync tool to a worker thread and awaits async tools
+without limits. Tools are registered with traits instead:
+
+- inline: fast and non-blocking (e.g. reading the clock). Called on the
+  event loop, skipping the thread hop.
+- thread: blocking. Runs in the tool's own thread pool, so slow calls can't
+  starve other tools of workers.
+- async: awaited on the event loop, at most `max_concurrency` calls at a
+  time.
+
+Time a call spends waiting for a slot or a worker is its queue time,
+recorded in the ledger, in `queue_stats` and in `metrics`, along with call
+durations, errors and calls in flight. Upstream request rates are enforced
+by the tools, per request sent (see `upstream`).
+
+Example:
+    >>> tool = executed(get_weather, ToolTraits(max_concurrency=8))
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import time
+import weakref
+from collections import defaultdict, deque
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+from .. import metrics
+from ..ledger import percentile, record_tool_queue
+from .scheduler import WAIT_SAMPLES
+
+logger = logging.getLogger(__name__)
+
+ExecutionMode = Literal["inline", "thread", "async"]
+# Worker threads of a thread-bound tool without max_concurrency
+DEFAULT_THREADS = 4
+
+
+@dataclass(frozen=True)
+class ToolTraits:
+    """How a tool is executed."""
+
+    mode: ExecutionMode = "async"
+    max_concurrency: int | None = None
+    """Calls running at once (async), or worker threads (thread)."""
+
+
+INLINE = ToolTraits(mode="inline")
+
+
+@dataclass
+class QueueStats:
+    """Queue times of one tool's calls."""
+
+    calls: int = 0
+    waits: deque[float] = field(default_factory=lambda: deque(maxlen=WAIT_SAMPLES))
+    """Recent queue times in seconds."""
+
+    def wait_percentile(self, p: float) -> float:
+        """Recent queue time percentile in seconds (e.g. p=95)."""
+        return percentile(list(self.waits), p)
+
+
+queue_stats: defaultdict[str, QueueStats] = defaultdict(QueueStats)
+"""Queue times per tool name, process-wide."""
+
+
+class ToolExecutor:
+    """Runs the calls of one tool according to its traits."""
+
+    def __init__(self, name: str, traits: ToolTraits):
+        self.name = name
+        self.traits = traits
+        self._pool: ThreadPoolExecutor | None = None
+        self._seconds = metrics.tool_seconds.labels(name)
+        self._errors = metrics.tool_errors.labels(name)
+        self._in_flight = metrics.tools_in_flight.labels(name)
+        self._queue_seconds = metrics.tool_queue_seconds.labels(name)
+        # Semaphores are bound to the event loop they're first used on
+        self._semaphores: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Semaphore
+        ] = weakref.WeakKeyDictionary()
+
+    def queued(self, seconds: float) -> None:
+        """Record the queue time of a call."""
+        stats = queue_stats[self.name]
+        stats.calls += 1
+        stats.waits.append(seconds)
+        record_tool_queue(seconds)
+        self._queue_seconds.observe(seconds)
+
+    @contextmanager
+    def metered(self) -> Iterator[None]:
+        """Record the duration, errors and concurrency of a call."""
+        start = time.perf_counter()
+        self._in_flight.inc()
+        try:
+            yield
+        except Exception:
+            self._errors.inc()
+            raise
+        finally:
+            self._in_flight.dec()
+            self._seconds.observe(time.perf_counter() - start)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for a concurrency slot."""
+        start = time.perf_counter()
+        limit = self._semaphore() if self.traits.max_concurrency else nullcontext()
+        async with limit:
+            self.queued(time.perf_counter() - start)
+            yield
+
+    async def run_in_thread(
+        self, func: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        """Run a blocking function in this tool's thread pool."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.traits.max_concurrency or DEFAULT_THREADS,
+                thread_name_prefix=f"nestor-{self.name}",
+            )
+        submitted = time.perf_counter()
+
+        def call() -> Any:
+            self.queued(time.perf_counter() - submitted)
+            return func(*args, **kwargs)
+
+        # Copy the context, so ledger recording works in the worker
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, context.run, call)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        assert self.traits.max_concurrency is not None
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(
+                self.traits.max_concurrency
+            )
+        return semaphore
+
+
+def executed(func: Callable[..., Any], traits: ToolTraits) -> Callable[..., Any]:
+    """Wrap a tool function to run with the given traits.
+
+    The wrapper is async and keeps the function's name, signature and
+    docstring, so pydantic-ai builds the same tool definition from it.
+    """
+    executor = ToolExecutor(func.__name__, traits)
+    is_async = inspect.iscoroutinefunction(func)
+
+    if traits.mode == "inline":
+
+        @functools.wraps(func)
+        async def inline(*args: Any, **kwargs: Any) -> Any:
+            with executor.metered():
+                executor.queued(0.0)
+                result = func(*args, **kwargs)
+                return await result if is_async else result
+
+        return inline
+
+    if traits.mode == "thread":
+        if is_async:
+            raise ValueError(f"Thread-bound tool {func.__name__} must be sync")
+
+        @functools.wraps(func)
+        async def threaded(*args: Any, **kwargs: Any) -> Any:
+            with executor.metered():
+                return await executor.run_in_thread(func, *args, **kwargs)
+
+        return threaded
+
+    if not is_async:
+        raise ValueError(f"Async tool {func.__name__} must be a coroutine function")
+
+    @functools.wraps(func)
+    async def limited(*args: Any, **kwargs: Any) -> Any:
+        with executor.metered():
+            async with executor.slot():
+                return await func(*args, **kwargs)
+
+    return limited
@@ -0,0 +1,87 @@
+"""Model request metrics.
+
+A `MeteredModel` records the duration, outcome, token usage and
+concurrency of every request to the model it wraps, labelled by model
+name (see `metrics`). It wraps the bare model, inside scheduling and
+routing, so durations exclude queueing and fallbacks count per model.
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
+
+from pydantic_ai import RunContext
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.usage import RequestUsage
+
+from .. import metrics
+
+
+class MeteredModel(WrapperModel):
+    """Model whose requests are recorded in `metrics`.
+
+    Failed requests are counted by HTTP status code, or by error type;
+    requests abandoned by routing as cancelled.
+    """
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        with self._metered():
+            response = await super().request(
+                messages, model_settings, model_request_parameters
+            )
+        self._count_tokens(response.usage)
+        return response
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context: RunContext[Any] | None = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        with self._metered():
+            async with super().request_stream(
+                messages, model_settings, model_request_parameters, run_context
+            ) as stream:
+                yield stream
+        self._count_tokens(stream.usage())
+
+    @contextmanager
+    def _metered(self) -> Iterator[None]:
+        model = self.model_name
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            with metrics.models_in_flight.labels(model).track():
+                yield
+        except ModelHTTPError as e:
+            outcome = str(e.status_code)
+            raise
+        except Exception as e:
+            outcome = type(e).__name__
+            raise
+        except asyncio.CancelledError:
+            # E.g. the slower request of a hedged pair
+            outcome = "cancelled"
+            raise
+        finally:
+            metrics.model_seconds.labels(model).observe(time.perf_counter() - start)
+            metrics.model_requests.labels(model, outcome).inc()
+
+    def _count_tokens(self, usage: RequestUsage) -> None:
+        model = self.model_name
+        metrics.model_tokens.labels(model, "input").inc(usage.input_tokens)
+        metrics.model_tokens.labels(model, "cached").inc(usage.cache_read_tokens)
+        metrics.model_tokens.labels(model, "output").inc(usage.output_tokens)
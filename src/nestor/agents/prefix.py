@@ -0,0 +1,81 @@
+"""Prompt-cache-friendly request layout.
+
+OpenAI caches the longest previously seen prefix of a request (in 128-token
+steps, from 1024 tokens), discounting and speeding up those input tokens.
+Requests start with the instructions and tool schemas, so these must be
+byte-identical on every request and run:
+
+- Instructions are static. Volatile context (dates, user settings) belongs
+  in tool results or the user prompt, after the prefix.
+- Tools are sent in name order, whatever order toolsets list them in, and
+  after any per-run selection (see `selection`), which only grows within a
+  conversation.
+- Requests carry a prompt cache key derived from the instructions and all
+  of the agent's tools, so its requests are routed to the same cache,
+  whatever tools a run selects. The cache keeps each selection's prefix.
+"""
+
+import dataclasses
+import hashlib
+import json
+from collections.abc import Sequence
+from typing import Any
+
+from pydantic_ai import RunContext
+from pydantic_ai.tools import ToolDefinition, ToolsPrepareFunc
+
+from ..tokens import estimate_tokens
+
+
+async def stable_tool_order(
+    ctx: RunContext[Any], tool_defs: list[ToolDefinition]
+) -> list[ToolDefinition]:
+    """`prepare_tools` function sending tools in name order."""
+    return sorted(tool_defs, key=lambda tool: tool.name)
+
+
+def stably_ordered(prepare: ToolsPrepareFunc[Any]) -> ToolsPrepareFunc[Any]:
+    """Compose a `prepare_tools` function with `stable_tool_order`."""
+
+    async def prepare_ordered(
+        ctx: RunContext[Any], tool_defs: list[ToolDefinition]
+    ) -> list[ToolDefinition]:
+        return await stable_tool_order(ctx, await prepare(ctx, tool_defs) or [])
+
+    return prepare_ordered
+
+
+def tool_schema_tokens(tool: ToolDefinition) -> int:
+    """Estimated prompt tokens of a tool definition, as sent to the model."""
+    schema = {
+        "type": "function",
+        "function": {
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": tool.parameters_json_schema,
+        },
+    }
+    return estimate_tokens(json.dumps(schema, ensure_ascii=False))
+
+
+def prefix_digest(instructions: str | None, tool_defs: Sequence[ToolDefinition]) -> str:
+    """Digest of the request prefix: instructions and tool schemas.
+
+    Changes whenever the prefix text sent to the model would change.
+    """
+    prefix = {
+        "instructions": instructions,
+        "tools": [
+            dataclasses.asdict(tool)
+            for tool in sorted(tool_defs, key=lambda tool: tool.name)
+        ],
+    }
+    text = json.dumps(prefix, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def prompt_cache_key(
+    instructions: str | None, tool_defs: Sequence[ToolDefinition]
+) -> str:
+    """Prompt cache key of an agent with these instructions and tools."""
+    return f"nestor-{prefix_digest(instructions, tool_defs)[:16]}"
@@ -0,0 +1,367 @@
+"""Latency-aware model routing with fallbacks, hedging and escalation.
+
+A `RoutedModel` sends each request to a chain of models: the primary first,
+then fallbacks. Models with recent errors cool down and are tried last;
+models whose recent p95 latency exceeds a budget are demoted. If a request
+hasn't answered after `hedge_after` seconds, the next model is raced
+against it. Prompts a cheap classifier flags as hard go to an optional
+escalation model first. Every decision is kept for tuning cost against p95.
+"""
+
+import asyncio
+import logging
+import re
+import statistics
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from functools import cached_property
+from typing import Any, Literal
+
+from pydantic_ai import RunContext
+from pydantic_ai.exceptions import FallbackExceptionGroup, ModelAPIError
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    UserPromptPart,
+)
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.profiles import ModelProfile
+from pydantic_ai.settings import ModelSettings
+
+from ..ledger import record_route
+
+logger = logging.getLogger(__name__)
+
+# Errors that move on to the next model instead of failing the run
+FALLBACK_ON = (ModelAPIError, TimeoutError)
+# Recent outcomes kept per model
+HEALTH_WINDOW = 50
+DECISIONS_KEPT = 1000
+
+HARD_PROMPT_RE = re.compile(
+    r"\b(step by step|explain why|prove|derive|compare|analy[sz]e|trade-?offs?|"
+    r"debug|refactor|algorithm|paso a paso|compara|analiza)\b",
+    re.IGNORECASE,
+)
+HARD_PROMPT_LENGTH = 600
+
+Reason = Literal["primary", "escalated", "fallback", "hedged"]
+
+
+def is_hard_prompt(messages: list[ModelMessage]) -> bool:
+    """Cheap heuristic flagging prompts worth a stronger model.
+
+    Looks at the latest user prompt only: long prompts, several questions at
+    once, or reasoning-heavy wording.
+    """
+    for message in reversed(messages):
+        if not isinstance(message, ModelRequest):
+            continue
+        for part in message.parts:
+            if isinstance(part, UserPromptPart) and isinstance(part.content, str):
+                text = part.content
+                return (
+                    len(text) > HARD_PROMPT_LENGTH
+                    or text.count("?") >= 3
+                    or HARD_PROMPT_RE.search(text) is not None
+                )
+    return False
+
+
+@dataclass
+class ModelHealth:
+    """Recent latency and error statistics of a model."""
+
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=HEALTH_WINDOW))
+    outcomes: deque[bool] = field(default_factory=lambda: deque(maxlen=HEALTH_WINDOW))
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        """Fraction of recent requests that failed."""
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    @property
+    def p95(self) -> float:
+        """Recent p95 latency of successful requests, in seconds."""
+        if len(self.latencies) < 2:
+            return self.latencies[0] if self.latencies else 0.0
+        return statistics.quantiles(self.latencies, n=20, method="inclusive")[-1]
+
+    def record_success(self, latency: float) -> None:
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+
+    def record_failure(self, cooldown: float) -> None:
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        # Back off exponentially on repeated failures
+        backoff = cooldown * 2 ** min(self.consecutive_failures - 1, 4)
+        self.cooldown_until = time.monotonic() + backoff
+
+    def available(self) -> bool:
+        """Whether the model is out of cooldown."""
+        return time.monotonic() >= self.cooldown_until
+
+
+@dataclass
+class RoutingDecision:
+    """How a request was routed."""
+
+    model: str
+    """Model that produced the response."""
+
+    reason: Reason
+    latency: float
+    """Seconds until the response, including failed attempts."""
+
+    tried: list[str]
+    """Models started, in order."""
+
+    errors: list[str] = field(default_factory=list)
+    timestamp: datetime = field(default_factory=lambda: datetime.now(UTC))
+
+
+class RoutedModel(Model):
+    """Model routing requests across a primary model and its fallbacks.
+
+    Args:
+        primary: Preferred model
+        fallbacks: Models tried, in order, if the primary fails or is slow
+        escalate: Optional stronger model for prompts flagged as hard
+        classifier: Flags hard prompts (defaults to `is_hard_prompt`)
+        hedge_after: Seconds to wait for a response before racing the next
+            model. None disables hedging.
+        max_latency: Demote models whose recent p95 exceeds this many seconds
+        cooldown: Base seconds a failing model is skipped
+    """
+
+    def __init__(
+        self,
+        primary: Model,
+        *fallbacks: Model,
+        escalate: Model | None = None,
+        classifier: Callable[[list[ModelMessage]], bool] = is_hard_prompt,
+        hedge_after: float | None = None,
+        max_latency: float | None = None,
+        cooldown: float = 30.0,
+    ):
+        super().__init__()
+        self.models = [primary, *fallbacks]
+        self.escalate = escalate
+        self.classifier = classifier
+        self.hedge_after = hedge_after
+        self.max_latency = max_latency
+        self.cooldown = cooldown
+        self.health: dict[str, ModelHealth] = {}
+        self.decisions: deque[RoutingDecision] = deque(maxlen=DECISIONS_KEPT)
+
+    @property
+    def model_name(self) -> str:
+        names = [m.model_name for m in self.models]
+        if self.escalate is not None:
+            names.append(f"escalate={self.escalate.model_name}")
+        return f"routed:{','.join(names)}"
+
+    @property
+    def system(self) -> str:
+        return self.models[0].system
+
+    @property
+    def base_url(self) -> str | None:
+        return self.models[0].base_url
+
+    @cached_property
+    def profile(self) -> ModelProfile:
+        # Agents build tool and output schemas once, for the primary model
+        return self.models[0].profile
+
+    def customize_request_parameters(
+        self, model_request_parameters: ModelRequestParameters
+    ) -> ModelRequestParameters:
+        return model_request_parameters  # pragma: no cover
+
+    def prepare_request(
+        self,
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> tuple[ModelSettings | None, ModelRequestParameters]:
+        return model_settings, model_request_parameters
+
+    def health_of(self, model: Model) -> ModelHealth:
+        """Live statistics of a model."""
+        return self.health.setdefault(model.model_name, ModelHealth())
+
+    def route(self, messages: list[ModelMessage]) -> tuple[list[Model], bool]:
+        """Order in which models should be tried.
+
+        Returns:
+            Candidate models and whether the request was escalated
+        """
+        chain = list(self.models)
+        escalated = self.escalate is not None and self.classifier(messages)
+        if self.escalate is not None and escalated:
+            chain.insert(0, self.escalate)
+
+        def rank(item: tuple[int, Model]) -> tuple[bool, bool, int]:
+            position, model = item
+            health = self.health_of(model)
+            slow = self.max_latency is not None and health.p95 > self.max_latency
+            return (not health.available(), slow, position)
+
+        return [m for _, m in sorted(enumerate(chain), key=rank)], escalated
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        candidates, escalated = self.route(messages)
+        start = time.monotonic()
+        pending: dict[asyncio.Task[ModelResponse], Model] = {}
+        tried: list[str] = []
+        errors: list[Exception] = []
+        hedged = False
+
+        def launch(model: Model) -> None:
+            tried.append(model.model_name)
+            task = asyncio.create_task(
+                self._timed(model, messages, model_settings, model_request_parameters)
+            )
+            pending[task] = model
+
+        try:
+            while pending or len(tried) < len(candidates):
+                if not pending:
+                    launch(candidates[len(tried)])
+                can_hedge = self.hedge_after is not None and len(tried) < len(
+                    candidates
+                )
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_after if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    hedged = True
+                    launch(candidates[len(tried)])
+                    continue
+
+                for task in done:
+                    model = pending.pop(task)
+                    if (error := task.exception()) is None:
+                        self._decide(
+                            model, candidates, tried, errors, escalated, hedged, start
+                        )
+                        return task.result()
+                    if not isinstance(error, FALLBACK_ON):
+                        raise error
+                    errors.append(error)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise FallbackExceptionGroup("All routed models failed", errors)
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context: RunContext[Any] | None = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        """Stream from the first model that accepts the request (no hedging)."""
+        candidates, escalated = self.route(messages)
+        start = time.monotonic()
+        tried: list[str] = []
+        errors: list[Exception] = []
+
+        for model in candidates:
+            tried.append(model.model_name)
+            async with AsyncExitStack() as stack:
+                try:
+                    response = await stack.enter_async_context(
+                        model.request_stream(
+                            messages,
+                            model_settings,
+                            model_request_parameters,
+                            run_context,
+                        )
+                    )
+                except FALLBACK_ON as e:
+                    self.health_of(model).record_failure(self.cooldown)
+                    errors.append(e)
+                    continue
+
+                self.health_of(model).record_success(time.monotonic() - start)
+                self._decide(model, candidates, tried, errors, escalated, False, start)
+                yield response
+                return
+
+        raise FallbackExceptionGroup("All routed models failed", errors)
+
+    async def _timed(
+        self,
+        model: Model,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        start = time.monotonic()
+        try:
+            response = await model.request(
+                messages, model_settings, model_request_parameters
+            )
+        except FALLBACK_ON:
+            self.health_of(model).record_failure(self.cooldown)
+            raise
+        self.health_of(model).record_success(time.monotonic() - start)
+        return response
+
+    def _decide(
+        self,
+        model: Model,
+        candidates: list[Model],
+        tried: list[str],
+        errors: list[Exception],
+        escalated: bool,
+        hedged: bool,
+        start: float,
+    ) -> None:
+        reason: Reason
+        if hedged and model.model_name != tried[0]:
+            reason = "hedged"
+        elif model is not candidates[0] or errors:
+            reason = "fallback"
+        elif escalated:
+            reason = "escalated"
+        else:
+            reason = "primary"
+
+        decision = RoutingDecision(
+            model=model.model_name,
+            reason=reason,
+            latency=time.monotonic() - start,
+            tried=list(tried),
+            errors=[repr(e) for e in errors],
+        )
+        self.decisions.append(decision)
+        record_route(f"{decision.model}:{decision.reason}")
+        if reason != "primary":
+            logger.info(
+                "Routed to %s (%s) after trying %s",
+                decision.model,
+                reason,
+                ", ".join(tried),
+            )
@@ -0,0 +1,422 @@
+"""Rate-limit-aware scheduling of model requests.
+
+A `RequestScheduler` is shared by every agent talking to the same provider
+account. It enforces requests-per-minute and tokens-per-minute budgets with
+token buckets, serves interactive traffic before batch traffic, queues fairly
+across sessions and pauses dispatch when the provider answers with a 429.
+Scheduled models retry failed requests themselves, so the SDK's retries
+can't bypass the budgets.
+"""
+
+import asyncio
+import logging
+import statistics
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Any
+
+from pydantic_ai import RunContext
+from pydantic_ai.exceptions import ModelAPIError, ModelHTTPError
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter, ModelResponse
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+
+from .. import metrics
+from ..tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Backoff in seconds before retrying a failed request, doubled per attempt;
+# 429s with a usable retry-after header wait for that instead
+DEFAULT_BACKOFF = 1.0
+# Statuses retried besides 429 and 5xx, as the OpenAI SDK does
+RETRIED_STATUSES = frozenset({408, 409})
+# Number of recent queue waits kept for percentiles
+WAIT_SAMPLES = 1024
+
+
+class Priority(IntEnum):
+    """Scheduling priority classes. Lower values are served first."""
+
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+@dataclass(frozen=True)
+class Scheduling:
+    """Scheduling attributes of the current request."""
+
+    priority: Priority = Priority.INTERACTIVE
+    session: str = "default"
+
+
+_scheduling: ContextVar[Scheduling] = ContextVar("scheduling", default=Scheduling())
+
+
+@contextmanager
+def scheduling(
+    *, priority: Priority = Priority.INTERACTIVE, session: str = "default"
+) -> Iterator[Scheduling]:
+    """Set priority and session for model requests made in this context.
+
+    Example:
+        >>> with scheduling(priority=Priority.BATCH, session="digest"):
+        ...     await agent.run(prompt, deps=deps)
+    """
+    value = Scheduling(priority=priority, session=session)
+    token = _scheduling.set(value)
+    try:
+        yield value
+    finally:
+        _scheduling.reset(token)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate.
+
+    The level may go negative when usage is settled above the estimate; the
+    debt is paid back before further requests are admitted.
+    """
+
+    def __init__(self, per_minute: float, capacity: float | None = None):
+        self.rate = per_minute / 60
+        self.capacity = capacity or per_minute
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def level(self) -> float:
+        """Currently available amount."""
+        now = time.monotonic()
+        self._level = min(
+            self.capacity, self._level + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        return self._level
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` is available. Zero if available now."""
+        # Requests larger than the bucket wait for a full bucket, not forever
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float) -> None:
+        """Take `amount` from the bucket, possibly going into debt."""
+        self._level = self.level - amount
+
+
+@dataclass
+class SchedulerStats:
+    """Scheduler counters and recent queue waits."""
+
+    granted: int = 0
+    """Requests admitted."""
+
+    rate_limited: int = 0
+    """429 responses received."""
+
+    waits: deque[float] = field(default_factory=lambda: deque(maxlen=WAIT_SAMPLES))
+    """Recent queue waits in seconds."""
+
+    def wait_percentile(self, p: float) -> float:
+        """Recent queue wait percentile in seconds (e.g. p=95)."""
+        if len(self.waits) < 2:
+            return self.waits[0] if self.waits else 0.0
+        return statistics.quantiles(self.waits, n=100, method="inclusive")[round(p) - 1]
+
+
+@dataclass
+class _Waiter:
+    tokens: int
+    future: asyncio.Future[None]
+
+
+class RequestScheduler:
+    """Admission control for model requests sharing provider rate limits.
+
+    Args:
+        rpm: Requests per minute, or None for no limit
+        tpm: Estimated tokens per minute, or None for no limit
+        bucket: Creates the bucket for a limit, given its name and per-minute
+            rate. Defaults to in-process buckets; see `shared` for buckets
+            shared across processes.
+    """
+
+    def __init__(
+        self,
+        *,
+        rpm: int | None = None,
+        tpm: int | None = None,
+        bucket: Callable[[str, float], TokenBucket] | None = None,
+    ):
+        bucket = bucket or (lambda name, per_minute: TokenBucket(per_minute))
+        self.requests = bucket("model-requests", rpm) if rpm else None
+        self.tokens = bucket("model-tokens", tpm) if tpm else None
+        self.stats = SchedulerStats()
+        self._queues: dict[Priority, OrderedDict[str, deque[_Waiter]]] = {
+            priority: OrderedDict() for priority in Priority
+        }
+        self._paused_until = 0.0
+        self._wakeup: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task[None] | None = None
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for admission."""
+        return sum(
+            len(waiters)
+            for sessions in self._queues.values()
+            for waiters in sessions.values()
+        )
+
+    async def acquire(
+        self,
+        tokens: int = 0,
+        *,
+        priority: Priority = Priority.INTERACTIVE,
+        session: str = "default",
+    ) -> float:
+        """Wait until a request may be sent.
+
+        Args:
+            tokens: Estimated tokens of the request
+            priority: Priority class
+            session: Session the request belongs to, for fair queueing
+
+        Returns:
+            Seconds spent waiting in the queue
+        """
+        start = time.monotonic()
+
+        if not self.queued and self._delay(tokens) == 0:
+            self._grant(tokens)
+        else:
+            waiter = _Waiter(tokens, asyncio.get_running_loop().create_future())
+            self._queues[priority].setdefault(session, deque()).append(waiter)
+            self._ensure_dispatcher()
+            await waiter.future
+
+        waited = time.monotonic() - start
+        self.stats.waits.append(waited)
+        metrics.scheduler_queue_seconds.labels().observe(waited)
+        if waited > 0.001:
+            logger.debug("Model request queued for %.3fs (%s)", waited, session)
+        return waited
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Correct the token budget once actual usage is known."""
+        if self.tokens is not None:
+            self.tokens.consume(actual - estimated)
+
+    def backoff(self, seconds: float) -> None:
+        """Pause all dispatch, e.g. after the provider returned a 429."""
+        self.stats.rate_limited += 1
+        metrics.scheduler_rate_limited.labels().inc()
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning("Rate limited, pausing model requests for %.1fs", seconds)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _delay(self, tokens: int) -> float:
+        delays = [self._paused_until - time.monotonic()]
+        if self.requests is not None:
+            delays.append(self.requests.delay(1))
+        if self.tokens is not None:
+            delays.append(self.tokens.delay(tokens))
+        return max(0.0, *delays)
+
+    def _grant(self, tokens: int) -> None:
+        if self.requests is not None:
+            self.requests.consume(1)
+        if self.tokens is not None:
+            self.tokens.consume(tokens)
+        self.stats.granted += 1
+
+    def _peek(self) -> tuple[OrderedDict[str, deque[_Waiter]], str] | None:
+        """Next session to serve: highest priority, round-robin over sessions."""
+        for priority in Priority:
+            sessions = self._queues[priority]
+            while sessions:
+                session, waiters = next(iter(sessions.items()))
+                # Drop waiters whose callers gave up
+                while waiters and waiters[0].future.done():
+                    waiters.popleft()
+                if waiters:
+                    return sessions, session
+                del sessions[session]
+        return None
+
+    def _ensure_dispatcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if (
+            self._wakeup is None
+            or self._dispatcher is None
+            or self._dispatcher.done()
+            or self._dispatcher.get_loop() is not loop
+        ):
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+        else:
+            self._wakeup.set()
+
+    async def _dispatch(self) -> None:
+        assert self._wakeup is not None
+        while (next_up := self._peek()) is not None:
+            sessions, session = next_up
+            waiters = sessions[session]
+            delay = self._delay(waiters[0].tokens)
+            if delay > 0:
+                # Sleep until budget is available, or until something changes
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except TimeoutError:
+                    pass
+                continue
+
+            waiter = waiters.popleft()
+            # Serve other sessions of the same class before this one again
+            sessions.move_to_end(session)
+            if not waiters:
+                del sessions[session]
+            self._grant(waiter.tokens)
+            waiter.future.set_result(None)
+
+
+def retry_after(error: ModelHTTPError) -> float | None:
+    """Seconds to wait according to the provider's response headers."""
+    response = getattr(error.__cause__, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    if ms := headers.get("retry-after-ms"):
+        try:
+            return float(ms) / 1000
+        except ValueError:
+            pass
+
+    if value := headers.get("retry-after"):
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except ValueError:
+                pass
+
+    return None
+
+
+def estimate_request_tokens(
+    messages: list[ModelMessage], model_request_parameters: ModelRequestParameters
+) -> int:
+    """Estimate the input tokens of a model request, including tool schemas."""
+    tokens = estimate_tokens(ModelMessagesTypeAdapter.dump_json(messages))
+    for tool in model_request_parameters.function_tools:
+        tokens += estimate_tokens(tool.name + (tool.description or ""))
+        tokens += estimate_tokens(str(tool.parameters_json_schema))
+    return tokens
+
+
+class ScheduledModel(WrapperModel):
+    """Model whose requests go through a shared `RequestScheduler`.
+
+    Rate-limited (429) requests are re-queued after the provider's
+    retry-after delay instead of being retried immediately. Connection
+    errors, timeouts and server errors are retried after an exponential
+    backoff, and re-queued too. Streams are retried until they open.
+    """
+
+    def __init__(
+        self,
+        wrapped: Model,
+        scheduler: RequestScheduler,
+        *,
+        max_retries: int = 3,
+    ):
+        super().__init__(wrapped)
+        self.scheduler = scheduler
+        self.max_retries = max_retries
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        tokens = estimate_request_tokens(messages, model_request_parameters)
+        current = _scheduling.get()
+
+        for attempt in range(self.max_retries + 1):
+            await self.scheduler.acquire(
+                tokens, priority=current.priority, session=current.session
+            )
+            try:
+                response = await super().request(
+                    messages, model_settings, model_request_parameters
+                )
+            except ModelAPIError as e:
+                if not await self._back_off(e, attempt):
+                    raise
+                continue
+
+            self.scheduler.settle(tokens, response.usage.total_tokens)
+            return response
+
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context: RunContext[Any] | None = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        tokens = estimate_request_tokens(messages, model_request_parameters)
+        current = _scheduling.get()
+        async with AsyncExitStack() as stack:
+            for attempt in range(self.max_retries + 1):
+                await self.scheduler.acquire(
+                    tokens, priority=current.priority, session=current.session
+                )
+                try:
+                    stream = await stack.enter_async_context(
+                        super().request_stream(
+                            messages,
+                            model_settings,
+                            model_request_parameters,
+                            run_context,
+                        )
+                    )
+                except ModelAPIError as e:
+                    if not await self._back_off(e, attempt):
+                        raise
+                    continue
+                break
+            yield stream
+        self.scheduler.settle(tokens, stream.usage().total_tokens)
+
+    async def _back_off(self, error: ModelAPIError, attempt: int) -> bool:
+        """Wait before retrying a failed request. False if it shouldn't be."""
+        if attempt == self.max_retries:
+            return False
+        backoff = DEFAULT_BACKOFF * 2**attempt
+        if isinstance(error, ModelHTTPError):
+            if error.status_code == 429:
+                # Pauses every request, as they share the provider's limits
+                self.scheduler.backoff(retry_after(error) or backoff)
+                return True
+            if error.status_code < 500 and error.status_code not in RETRIED_STATUSES:
+                return False
+        logger.warning("Model request failed, retrying in %.1fs: %r", backoff, error)
+        await asyncio.sleep(backoff)
+        return True
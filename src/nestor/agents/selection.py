@@ -0,0 +1,216 @@
+"""Per-run tool selection.
+
+Tool schemas are sent with every model request, and most prompts need few
+of them: "what time is it?" doesn't need web search. A `ToolSelector` is a
+`prepare_tools` function exposing only the tool groups a run is likely to
+need, guessed from the prompt with local pattern matching.
+
+A missing tool costs an answer, an extra one only tokens, so selection errs
+on the side of more tools:
+
+- When no group matches, all tools are exposed.
+- A catch-all group (search) is exposed whenever the prompt says more than
+  the matched patterns explain: "what time does the Prado open?" matches
+  the time group, but needs search.
+- Within a conversation, the exposed groups only grow: each run keeps the
+  groups of earlier prompts and of tools called, so follow-ups ("and
+  tomorrow?") keep their tools.
+
+Tool schemas precede the message history, so a changed selection sends the
+history uncached. Growing only, a conversation changes its prefix at most
+once per group. The selection depends on the run's prompt and history
+only, so it stays the same for every request of a run. Requests of all
+combinations share the agent's prompt cache key, so they're routed to the
+same cache, where each combination's prefix is cached.
+"""
+
+import logging
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic_ai import RunContext
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    ToolCallPart,
+    UserPromptPart,
+)
+from pydantic_ai.tools import ToolDefinition
+
+logger = logging.getLogger(__name__)
+
+TIME_PATTERN = re.compile(
+    r"\b(what time|time is it|the time|time in|what day|which day|what date|"
+    r"the date|today's date|date today|current (time|date)|time ?zones?|o'clock)\b",
+    re.IGNORECASE,
+)
+WEATHER_PATTERN = re.compile(
+    r"\b(weather|forecast|rain\w*|drizzle|snow\w*|sunny|sunshine|cloud\w*|"
+    r"wind\w*|storm\w*|thunder\w*|temperature|degrees|umbrella|jacket|"
+    r"hot|cold|warm|freezing)\b",
+    re.IGNORECASE,
+)
+SEARCH_PATTERN = re.compile(
+    r"https?://|\bwww\.|\b(search|look up|google|web|online|news|latest|"
+    r"recent(ly)?|headlines|who won|score|price|stock|release[ds]?)\b",
+    re.IGNORECASE,
+)
+# Places, as in "time in Tokyo": explained by the tools of any matched group,
+# or of an earlier turn ("and in Tokyo?")
+LOCATION_PATTERN = re.compile(r"\b(?:in|at|for|near) (?:[A-Z][\w'-]*\s*)+")
+# Words that say nothing a tool would be needed for
+FILLER_WORDS = frozenset(
+    """
+    a about again also an and any are at be been bring but can could d did
+    do does evening for from get give go going hello hey hi how i in is it
+    its know like ll m me morning much my need next night no not now of ok
+    okay on or our out outside please re right s say should show so some t
+    take tell thank thanks that the then there these this to today tomorrow
+    tonight us ve very was we wear week weekend were what when where which
+    will with would yes yesterday you your
+    """.split()
+)
+
+
+@dataclass(frozen=True)
+class ToolGroup:
+    """Tools that are exposed together."""
+
+    name: str
+    tools: frozenset[str]
+    """Tool names."""
+
+    pattern: re.Pattern[str] | None = None
+    """Prompts needing the group."""
+
+    always: bool = False
+    """Exposed along with any other group, e.g. small tools others rely on."""
+
+    catch_all: bool = False
+    """Exposed along with other groups when the prompt says more than their
+    patterns explain, e.g. search, which can answer anything."""
+
+
+class ToolSelector:
+    """`prepare_tools` function exposing the tool groups a run needs.
+
+    Args:
+        groups: Tool groups. Tools in no group are always exposed.
+    """
+
+    def __init__(self, groups: Sequence[ToolGroup]):
+        self.groups = list(groups)
+
+    def select(
+        self, prompt: str, history: Sequence[ModelMessage] = ()
+    ) -> list[ToolGroup] | None:
+        """Groups to expose for a prompt, or None for all tools.
+
+        Args:
+            prompt: User prompt of the run
+            history: Previous turns, whose groups stay exposed
+        """
+        called = _tool_calls(history)
+        wanted = {group.name for group in self.groups if group.tools & called}
+        for text in [*_prompts(history), prompt]:
+            groups = self._wanted(text, follow_up=bool(wanted))
+            if groups is None:
+                return None
+            wanted |= groups
+        if not wanted:
+            return None
+        return [group for group in self.groups if group.always or group.name in wanted]
+
+    def _wanted(self, prompt: str | None, follow_up: bool) -> set[str] | None:
+        """Names of the groups one prompt needs, or None for all tools.
+
+        Args:
+            prompt: User prompt
+            follow_up: Whether earlier turns already exposed groups
+        """
+        if prompt is None:  # Not text, e.g. images
+            return None
+        matched = [
+            group
+            for group in self.groups
+            if group.pattern is not None and group.pattern.search(prompt)
+        ]
+        rest = prompt
+        for group in matched:
+            assert group.pattern is not None
+            rest = group.pattern.sub(" ", rest)
+        if matched or follow_up:
+            rest = LOCATION_PATTERN.sub(" ", rest)
+        unexplained = any(
+            word not in FILLER_WORDS
+            for word in re.findall(r"[^\W\d_]+", rest.casefold())
+        )
+        if not matched:
+            return None if unexplained else set()
+        return {
+            group.name
+            for group in self.groups
+            if group in matched or (unexplained and group.catch_all)
+        }
+
+    async def __call__(
+        self, ctx: RunContext[Any], tool_defs: list[ToolDefinition]
+    ) -> list[ToolDefinition]:
+        if not isinstance(ctx.prompt, str):
+            return tool_defs
+        groups = self.select(ctx.prompt, _history(ctx.messages))
+        if groups is None:
+            return tool_defs
+        grouped = {name for group in self.groups for name in group.tools}
+        exposed = {name for group in groups for name in group.tools}
+        selected = [
+            tool
+            for tool in tool_defs
+            if tool.name in exposed or tool.name not in grouped
+        ]
+        logger.debug(
+            "Exposing tool groups %s (%d/%d tools)",
+            [group.name for group in groups],
+            len(selected),
+            len(tool_defs),
+        )
+        return selected
+
+
+def _is_prompt(message: ModelMessage) -> bool:
+    return isinstance(message, ModelRequest) and any(
+        isinstance(part, UserPromptPart) for part in message.parts
+    )
+
+
+def _history(messages: Sequence[ModelMessage]) -> Sequence[ModelMessage]:
+    """Messages before the current run's prompt."""
+    for i in range(len(messages) - 1, -1, -1):
+        if _is_prompt(messages[i]):
+            return messages[:i]
+    return messages
+
+
+def _prompts(history: Sequence[ModelMessage]) -> list[str | None]:
+    """User prompts of a conversation, None for those that aren't text."""
+    return [
+        part.content if isinstance(part.content, str) else None
+        for message in history
+        if isinstance(message, ModelRequest)
+        for part in message.parts
+        if isinstance(part, UserPromptPart)
+    ]
+
+
+def _tool_calls(history: Sequence[ModelMessage]) -> set[str]:
+    """Names of tools called in a conversation."""
+    return {
+        part.tool_name
+        for message in history
+        if isinstance(message, ModelResponse)
+        for part in message.parts
+        if isinstance(part, ToolCallPart)
+    }
@@ -0,0 +1,260 @@
+"""Cache of final answers to repeated prompts.
+
+Bots see the same questions over and over. An `AnswerCache` sits in front
+of `agent.run` and answers repeats without any model or tool round trip.
+Entries are keyed by the normalized prompt, the run's deps and the last
+turns of history, and expire according to the tools the original run used:
+answers involving the clock are never cached, weather answers live as long
+as a forecast, and static-knowledge answers for a day.
+
+An optional near-duplicate matcher also serves prompts that differ only in
+a few words (word-set Jaccard similarity; no embeddings).
+
+Example:
+    >>> cache = AnswerCache(near_duplicates=True)
+    >>> if (hit := cache.lookup(prompt, deps, history)) is None:
+    ...     result = await agent.run(prompt, deps=deps, message_history=history)
+    ...     cache.store(prompt, deps, history, result)
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic_ai.agent import AgentRunResult
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    UserPromptPart,
+)
+
+from .cache import CacheInfo, TTLCache
+from .dependencies import AssistantDeps
+from .tools.weather import FORECAST_TTL
+from .tools.websearch import SEARCH_TTL
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_SIZE = 1024
+# Answers from the model's own knowledge or general web search
+STATIC_TTL = 24 * 3600.0
+# Seconds each tool allows its answers to be reused. Unknown tools: never.
+TOOL_TTLS: dict[str, float] = {
+    "get_current_time": 0.0,
+    "get_current_times": 0.0,
+    "get_current_date": 0.0,
+    "get_weather": FORECAST_TTL,
+    "get_hourly_forecast": FORECAST_TTL,
+    "web_search": STATIC_TTL,
+    # Pages may be news; as fresh as search results
+    "fetch_page": SEARCH_TTL,
+}
+# Previous turns that must match for an answer to be reused
+HISTORY_TURNS = 2
+NEAR_DUPLICATE_SIMILARITY = 0.8
+
+_WORD_RE = re.compile(r"\w+")
+
+AnswerKey = tuple[str, AssistantDeps, str]
+"""Normalized prompt, deps (without deadline) and history fingerprint."""
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase words of a prompt, without punctuation or extra spacing."""
+    return " ".join(_WORD_RE.findall(prompt.casefold()))
+
+
+def history_fingerprint(
+    messages: list[ModelMessage] | None, turns: int = HISTORY_TURNS
+) -> str:
+    """Digest of the text of the last `turns` conversation turns."""
+    texts = [
+        part.content
+        for message in (messages or [])
+        for part in message.parts
+        if isinstance(part, UserPromptPart | TextPart) and isinstance(part.content, str)
+    ]
+    recent = texts[-2 * turns :] if turns else []
+    return hashlib.blake2b(json.dumps(recent).encode(), digest_size=8).hexdigest()
+
+
+def tool_ttl(call: ToolCallPart) -> float:
+    """Seconds an answer using this tool call stays valid."""
+    if call.tool_name == "web_search" and call.args_as_dict().get("timelimit"):
+        # Searches for recent news go stale as fast as search results
+        return SEARCH_TTL
+    return TOOL_TTLS.get(call.tool_name, 0.0)
+
+
+def answer_ttl(messages: list[ModelMessage]) -> float:
+    """Seconds the answer of a run stays valid, from the tools it called."""
+    calls = [
+        part
+        for message in messages
+        if isinstance(message, ModelResponse)
+        for part in message.parts
+        if isinstance(part, ToolCallPart)
+    ]
+    return min((tool_ttl(call) for call in calls), default=STATIC_TTL)
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    """A reusable answer."""
+
+    output: str
+    model: str
+    """Model that produced the original answer."""
+
+    created: float
+    """When the answer was produced (`time.monotonic`)."""
+
+    def messages(self, prompt: str) -> list[ModelMessage]:
+        """New messages of a run answering `prompt` from cache."""
+        return [
+            ModelRequest(parts=[UserPromptPart(prompt)]),
+            ModelResponse(parts=[TextPart(self.output)], model_name=self.model),
+        ]
+
+    @property
+    def age(self) -> float:
+        """Seconds since the answer was produced."""
+        return time.monotonic() - self.created
+
+
+class AnswerCache:
+    """In-memory cache of final answers.
+
+    Args:
+        maxsize: Maximum number of answers
+        near_duplicates: Also serve prompts similar to a cached one
+        similarity: Minimum word-set Jaccard similarity of near duplicates
+        history_turns: Previous turns that must match
+    """
+
+    def __init__(
+        self,
+        maxsize: int = ANSWER_CACHE_SIZE,
+        *,
+        near_duplicates: bool = False,
+        similarity: float = NEAR_DUPLICATE_SIMILARITY,
+        history_turns: int = HISTORY_TURNS,
+    ):
+        self.near_duplicates = near_duplicates
+        self.similarity = similarity
+        self.history_turns = history_turns
+        self._answers: TTLCache[AnswerKey, CachedAnswer] = TTLCache(maxsize, STATIC_TTL)
+        # Words of cached prompts, for near-duplicate matching
+        self._words: OrderedDict[AnswerKey, frozenset[str]] = OrderedDict()
+        self.near_hits = 0
+        """Lookups served by a near duplicate."""
+
+    def lookup(
+        self,
+        prompt: str,
+        deps: AssistantDeps,
+        history: list[ModelMessage] | None = None,
+    ) -> CachedAnswer | None:
+        """Cached answer for a prompt, or None."""
+        key = self._key(prompt, deps, history)
+        if (answer := self._answers.get(key)) is not None:
+            return answer
+        if self.near_duplicates:
+            return self._nearest(key)
+        return None
+
+    def store(
+        self,
+        prompt: str,
+        deps: AssistantDeps,
+        history: list[ModelMessage] | None,
+        result: AgentRunResult[Any],
+    ) -> bool:
+        """Cache the answer of a run, if its tools allow reuse.
+
+        Returns:
+            Whether the answer was cached
+        """
+        new_messages = result.new_messages()
+        ttl = answer_ttl(new_messages)
+        if ttl <= 0 or not isinstance(result.output, str):
+            return False
+
+        models = [
+            m.model_name
+            for m in new_messages
+            if isinstance(m, ModelResponse) and m.model_name
+        ]
+        answer = CachedAnswer(
+            output=result.output,
+            model=models[-1] if models else "unknown",
+            created=time.monotonic(),
+        )
+        key = self._key(prompt, deps, history)
+        self._answers.set(key, answer, ttl=ttl)
+        if self.near_duplicates:
+            self._words[key] = frozenset(key[0].split())
+            self._words.move_to_end(key)
+            if len(self._words) > self._answers.maxsize:
+                self._words.popitem(last=False)
+        logger.debug("Cached answer to %r for %.0fs", key[0], ttl)
+        return True
+
+    def clear(self) -> None:
+        """Remove all answers."""
+        self._answers.clear()
+        self._words.clear()
+        self.near_hits = 0
+
+    def cache_info(self) -> CacheInfo:
+        """Hit/miss statistics. Near-duplicate hits count a miss, then a hit."""
+        return self._answers.cache_info()
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    def _key(
+        self,
+        prompt: str,
+        deps: AssistantDeps,
+        history: list[ModelMessage] | None,
+    ) -> AnswerKey:
+        return (
+            normalize_prompt(prompt),
+            dataclasses.replace(deps, deadline=None),
+            history_fingerprint(history, self.history_turns),
+        )
+
+    def _nearest(self, key: AnswerKey) -> CachedAnswer | None:
+        words = frozenset(key[0].split())
+        if not words:
+            return None
+        # Numbers (dates, hours, postal codes) must match exactly
+        numbers = {w for w in words if any(c.isdigit() for c in w)}
+        best: tuple[float, AnswerKey] | None = None
+        for candidate, candidate_words in self._words.items():
+            if candidate[1:] != key[1:]:
+                continue
+            if numbers != {w for w in candidate_words if any(c.isdigit() for c in w)}:
+                continue
+            similarity = len(words & candidate_words) / len(words | candidate_words)
+            if similarity >= self.similarity and (best is None or similarity > best[0]):
+                best = (similarity, candidate)
+
+        if best is None:
+            return None
+        answer = self._answers.get(best[1])
+        if answer is None:
+            del self._words[best[1]]
+        else:
+            self.near_hits += 1
+        return answer
@@ -0,0 +1,167 @@
+"""Batch mode: large prompt sets across worker processes.
+
+With many runs in flight, one event loop becomes CPU-bound on pydantic
+validation, JSON encoding and message handling. `run_batch` shards prompts
+across worker processes, each with its own event loop, warm agent and
+pooled HTTP clients, kept for the whole job. Workers share a SQLite store
+(see `shared`) for tool caches and for rate limits: model RPM/TPM and
+upstream APIs are enforced globally, so adding workers never multiplies
+upstream load. Results are yielded in input order.
+
+Example:
+    >>> for result in run_batch(prompts, store_path=Path("batch.db")):
+    ...     print(result.model_dump_json())
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pydantic import BaseModel
+from pydantic_ai import Agent
+from pydantic_ai.models import Model
+
+from . import defaults, shared
+from .agents.assistant import assistant_from_settings
+from .agents.scheduler import Priority, RequestScheduler, scheduling
+from .config import settings
+from .dependencies import AssistantDeps
+from .tenants import deps_from_settings
+from .upstream import DDGS, OPEN_METEO
+
+logger = logging.getLogger(__name__)
+
+
+class BatchResult(BaseModel):
+    """Outcome of one prompt."""
+
+    index: int
+    """Position of the prompt in the input."""
+
+    prompt: str
+    output: str | None = None
+    error: str | None = None
+    latency: float = 0.0
+    """Seconds the run took, queueing included."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class _Worker:
+    """Per-process state, kept across chunks."""
+
+    def __init__(
+        self, store_path: Path, concurrency: int, model: Callable[[], Model] | None
+    ):
+        self.loop = asyncio.new_event_loop()
+        store = shared.open_store(store_path)
+        for upstream in (OPEN_METEO, DDGS):
+            upstream.bucket = store.bucket(
+                upstream.name, upstream.per_minute, upstream.burst
+            )
+        scheduler = None
+        if settings.rate_limit_rpm or settings.rate_limit_tpm:
+            scheduler = RequestScheduler(
+                rpm=settings.rate_limit_rpm,
+                tpm=settings.rate_limit_tpm,
+                bucket=store.bucket,
+            )
+        self.agent: Agent[AssistantDeps, str] = assistant_from_settings(
+            settings, scheduler=scheduler
+        )
+        self.model = model() if model is not None else None
+        self.deps = deps_from_settings(settings)
+        self.concurrency = concurrency
+
+    async def run_chunk(self, start: int, prompts: list[str]) -> list[BatchResult]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(index: int, prompt: str) -> BatchResult:
+            result = BatchResult(index=index, prompt=prompt)
+            started = time.perf_counter()
+            async with semaphore:
+                try:
+                    answer = await self.agent.run(
+                        prompt, deps=self.deps, model=self.model
+                    )
+                except Exception as e:
+                    logger.warning("Batch prompt %d failed: %r", index, e)
+                    result.error = repr(e)
+                else:
+                    usage = answer.usage()
+                    result.output = answer.output
+                    result.input_tokens = usage.input_tokens
+                    result.output_tokens = usage.output_tokens
+            result.latency = time.perf_counter() - started
+            return result
+
+        session = f"batch-{os.getpid()}"
+        with scheduling(priority=Priority.BATCH, session=session):
+            return await asyncio.gather(
+                *(run(start + i, prompt) for i, prompt in enumerate(prompts))
+            )
+
+
+_worker: _Worker | None = None
+
+
+def _init_worker(
+    store_path: Path, concurrency: int, model: Callable[[], Model] | None
+) -> None:
+    global _worker
+    _worker = _Worker(store_path, concurrency, model)
+
+
+def _run_chunk(chunk: tuple[int, list[str]]) -> list[BatchResult]:
+    assert _worker is not None, "worker not initialized"
+    return _worker.loop.run_until_complete(_worker.run_chunk(*chunk))
+
+
+def run_batch(
+    prompts: Sequence[str],
+    *,
+    store_path: Path = defaults.BATCH_STORE_PATH,
+    workers: int | None = None,
+    concurrency: int = defaults.BATCH_CONCURRENCY,
+    chunk_size: int = defaults.BATCH_CHUNK_SIZE,
+    model: Callable[[], Model] | None = None,
+) -> Iterator[BatchResult]:
+    """Run the assistant on every prompt, across worker processes.
+
+    Args:
+        prompts: Prompts, answered independently (no shared history)
+        store_path: Shared tool cache and rate limit store, reused across jobs
+        workers: Worker processes. Defaults to the number of CPUs.
+        concurrency: Runs in flight per worker
+        chunk_size: Prompts sent to a worker at a time. Smaller chunks
+            balance load better; larger ones cost less inter-process traffic.
+        model: Creates the model in each worker instead of the configured
+            one (must be picklable, e.g. a module-level function)
+
+    Yields:
+        One result per prompt, in input order. Failed runs carry an error.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = [
+        (start, list(prompts[start : start + chunk_size]))
+        for start in range(0, len(prompts), chunk_size)
+    ]
+    logger.info(
+        "Batch of %d prompts: %d chunks, %d workers", len(prompts), len(chunks), workers
+    )
+    # Spawn, so workers don't inherit the parent's threads and event loop
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(store_path, concurrency, model),
+    ) as pool:
+        for results in pool.map(_run_chunk, chunks):
+            yield from results
@@ -0,0 +1,75 @@
+"""In-memory caches shared by tools and agents."""
+
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class CacheInfo:
+    """Cache statistics."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class TTLCache(Generic[K, V]):
+    """Bounded LRU cache whose entries expire after a time-to-live.
+
+    Unlike `alru_cache`, values are set explicitly, so the cache key can
+    leave out arguments that don't affect the result (e.g. timeouts).
+
+    Args:
+        maxsize: Maximum number of entries
+        ttl: Default seconds until an entry expires
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: K) -> V | None:
+        """Cached value for `key`, or None if missing or expired."""
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self._misses += 1
+            return None
+        self._data.move_to_end(key)
+        self._hits += 1
+        return item[1]
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """Cache `value` for `key`, evicting the least recently used entry."""
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: K) -> bool:
+        """Remove `key`. Returns whether it was cached."""
+        return self._data.pop(key, None) is not None
+
+    def clear(self) -> None:
+        """Remove all entries and reset statistics."""
+        self._data.clear()
+        self._hits = self._misses = 0
+
+    def cache_info(self) -> CacheInfo:
+        """Hit/miss statistics, like `functools.lru_cache`."""
+        return CacheInfo(self._hits, self._misses, self.maxsize, len(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,15 +1,47 @@
 """Command-line interface for Néstor."""
 
 import asyncio
+import functools
 import logging
 import sys
-from typing import Any
+import threading
+import time
+from contextlib import AbstractAsyncContextManager, nullcontext
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, get_args
 
 import click
+from pydantic import SecretStr
+from pydantic_ai import Agent
 from pydantic_ai.exceptions import UnexpectedModelBehavior
+from pydantic_ai.usage import RunUsage
 
-from . import AssistantDeps, create_assistant_agent
+from . import AssistantDeps, defaults, metrics
+from .agents import create_agent
+from .agents.assistant import (
+    INSTRUCTIONS,
+    TOOL_GROUPS,
+    assistant_from_settings,
+    create_assistant_toolset,
+)
+from .agents.backends import ModelBackend, backend_from_settings
+from .agents.benchmark import PROMPTS, benchmark
+from .agents.digest import digest_agent_from_settings
+from .agents.prefix import tool_schema_tokens
+from .agents.scheduler import RequestScheduler
+from .agents.selection import ToolSelector
+from .answers import AnswerCache
+from .batch import run_batch
 from .config import settings
+from .deadline import run_with_deadline
+from .digest import TEMPLATE, Subscriber, build_digests
+from .history import trim_history
+from .ledger import GroupBy, Ledger, RunRecord, recording, summarize
+from .speculation import Speculation, SpeculationReport
+from .tenants import deps_from_settings
+from .tokens import estimate_tokens
+from .warmup import Warmer, warm_up
 
 logger = logging.getLogger("nestor")
 
@@ -17,11 +49,19 @@ logger = logging.getLogger("nestor")
 @click.group()
 @click.option("--debug", "-d", is_flag=True, help="Enable debug logging")
 @click.option("--usage", "-u", is_flag=True, help="Show token usage")
+@click.option(
+    "--timeout",
+    "-t",
+    type=float,
+    default=settings.run_timeout,
+    help="Seconds each answer may take, tools included",
+)
 @click.pass_context
-def cli(ctx, debug: bool, usage: bool):
+def cli(ctx, debug: bool, usage: bool, timeout: float | None):
     """Néstor - Your AI assistant."""
     ctx.ensure_object(dict)
     ctx.obj["usage"] = usage
+    ctx.obj["timeout"] = timeout
     logging.basicConfig(level=logging.DEBUG if debug else logging.WARN)
 
 
@@ -49,65 +89,165 @@ def ask(ctx, prompt: str | None, multiline: bool):
         click.echo("No prompt provided", err=True)
         sys.exit(1)
 
-    asyncio.run(_run_assistant(prompt, show_usage=ctx.obj["usage"]))
+    asyncio.run(
+        _run_assistant(prompt, show_usage=ctx.obj["usage"], timeout=ctx.obj["timeout"])
+    )
 
 
 @cli.command()
+@click.option(
+    "--no-warm",
+    is_flag=True,
+    help="Don't prefetch forecasts for warm locations",
+)
 @click.pass_context
-def interactive(ctx):
+def interactive(ctx, no_warm: bool):
     """Start interactive chat session."""
     click.secho("Néstor Interactive Mode", bold=True)
     click.echo("Type 'exit' or 'quit' to end the session\n")
 
-    messages = []  # Conversation history
+    asyncio.run(
+        _interactive_session(
+            show_usage=ctx.obj["usage"], timeout=ctx.obj["timeout"], warm=not no_warm
+        )
+    )
 
-    while True:
-        prompt = click.prompt(">>>", type=str, prompt_suffix=" ")
-        if prompt.lower() in ("exit", "quit"):
-            click.echo("Goodbye!")
-            break
 
-        messages = asyncio.run(
-            _run_assistant(prompt, messages, show_usage=ctx.obj["usage"])
-        )
+async def _interactive_session(
+    show_usage: bool = False, timeout: float | None = None, warm: bool = True
+):
+    """Run an interactive session on a single event loop.
+
+    Keeping one loop alive lets tool caches, the background warmer and the
+    metrics endpoint persist across turns.
+    """
+    messages: list[Any] = []  # Conversation history
+    session_usage = RunUsage()
+
+    warmer = Warmer(_warm_locations(), interval=settings.warm_interval)
+    if warm:
+        warmer.start()
+    server = None
+    if settings.metrics_port is not None:
+        server = await metrics.serve(port=settings.metrics_port)
+
+    try:
+        while True:
+            prompt = await _prompt(">>>")
+            if prompt.lower() in ("exit", "quit"):
+                if show_usage:
+                    click.echo(f"Session {_format_usage(session_usage)}")
+                click.echo("Goodbye!")
+                break
+
+            messages = await _run_assistant(
+                prompt,
+                messages,
+                show_usage=show_usage,
+                session_usage=session_usage,
+                timeout=timeout,
+            )
+            messages = trim_history(messages, settings.max_history_turns)
+    finally:
+        await warmer.stop()
+        if server is not None:
+            server.close()
+
+
+async def _prompt(text: str) -> str:
+    """Read user input without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    future: asyncio.Future[str] = loop.create_future()
+
+    def resolve(value: str | None, error: BaseException | None) -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value or "")
+
+    def read() -> None:
+        try:
+            value = click.prompt(text, type=str, prompt_suffix=" ")
+        except BaseException as e:  # click.Abort on Ctrl+D, etc.
+            loop.call_soon_threadsafe(resolve, None, e)
+        else:
+            loop.call_soon_threadsafe(resolve, value, None)
+
+    # Daemon thread, so a pending read never blocks interpreter exit
+    threading.Thread(target=read, daemon=True).start()
+    return await future
 
 
 async def _run_assistant(
     prompt: str,
     message_history: list[Any] | None = None,
     show_usage: bool = False,
+    session_usage: RunUsage | None = None,
+    timeout: float | None = None,
 ):
     """Run the assistant with a prompt."""
     logger.info("Running assistant with prompt: %r", prompt)
+    prefetch: SpeculationReport | None = None
 
     try:
-        agent = create_assistant_agent(
-            api_key=settings.openai_api_key,
-            model_name=settings.default_model,
-            max_retries=settings.max_retries,
-        )
+        agent = _agent()
+        deps = deps_from_settings(settings)
 
-        deps = AssistantDeps(
-            search_backend=settings.search_backend,
-            safesearch=settings.safesearch,
-            default_location=settings.default_location,
-        )
+        cache = _answer_cache()
 
-        result = await agent.run(
-            prompt,
-            message_history=message_history,
-            deps=deps,
-        )
+        with recording() as recorder:
+            hit = (
+                cache.lookup(prompt, deps, message_history)
+                if cache is not None
+                else None
+            )
+            if hit is not None:
+                click.echo(f"\n{hit.output}\n")
+                _record(recorder.finish_cached(hit.model))
+                if show_usage:
+                    click.echo(f"Cached answer ({hit.age:.0f}s old)")
+                return [*(message_history or []), *hit.messages(prompt)]
+
+            async with _speculation(prompt, deps.default_location) as speculation:
+                if timeout is None:
+                    result = await agent.run(
+                        prompt,
+                        message_history=message_history,
+                        deps=deps,
+                    )
+                else:
+                    result = await run_with_deadline(
+                        agent,
+                        prompt,
+                        message_history=message_history,
+                        deps=deps,
+                        timeout=timeout,
+                    )
+                if speculation is not None:
+                    prefetch = await speculation.settle(result.new_messages())
 
         click.echo(f"\n{result.output}\n")
 
+        _record(recorder.finish(result))
+        if cache is not None:
+            cache.store(prompt, deps, message_history, result)
+        if session_usage is not None:
+            session_usage.incr(result.usage())
+
         if show_usage:
-            usage = result.usage()
-            click.echo(
-                f"Tokens: {usage.total_tokens} "
-                f"(↓ {usage.input_tokens} ↑ {usage.output_tokens}) "
-                f"• {usage.requests} request(s)"
-            )
+            click.echo(_format_usage(result.usage()))
+            if scheduler := _scheduler():
+                click.echo(
+                    f"Queue wait: p50 {scheduler.stats.wait_percentile(50):.2f}s "
+                    f"• p95 {scheduler.stats.wait_percentile(95):.2f}s "
+                    f"• {scheduler.stats.rate_limited} rate limited"
+                )
+            if prefetch is not None and prefetch.requests:
+                click.echo(
+                    f"Prefetch: {prefetch.hits}/{prefetch.requests} request(s) used"
+                )
 
         return result.all_messages()
 
@@ -116,13 +256,410 @@ async def _run_assistant(
         click.echo(f"Error: {e}", err=True)
         sys.exit(1)
 
+    except TimeoutError:
+        logger.exception("Agent run timed out")
+        click.echo(f"Error: no answer within {timeout}s", err=True)
+        sys.exit(1)
+
+
+def _speculation(
+    prompt: str, default_location: str
+) -> AbstractAsyncContextManager[Speculation | None]:
+    """Speculative weather prefetch for a run, if enabled."""
+    if not settings.speculate:
+        return nullcontext()
+    return Speculation(prompt, default_location)
+
+
+def _format_usage(usage: RunUsage) -> str:
+    cached = f", {usage.cache_read_tokens} cached" if usage.cache_read_tokens else ""
+    return (
+        f"Tokens: {usage.total_tokens} "
+        f"(↓ {usage.input_tokens}{cached} ↑ {usage.output_tokens}) "
+        f"• {usage.requests} request(s)"
+    )
+
+
+def _record(record: RunRecord) -> None:
+    """Append a run to the ledger, if enabled. Never fails the run."""
+    if settings.ledger_path is None:
+        return
+    try:
+        Ledger(settings.ledger_path).append(record)
+    except OSError:
+        logger.exception("Failed to write ledger %s", settings.ledger_path)
+
+
+@functools.cache
+def _agent() -> Agent[AssistantDeps, str]:
+    """Process-wide assistant agent, shared by all runs."""
+    return assistant_from_settings(settings, scheduler=_scheduler())
+
+
+@functools.cache
+def _answer_cache() -> AnswerCache | None:
+    """Process-wide answer cache, if enabled."""
+    if not settings.answer_cache:
+        return None
+    cache = AnswerCache(near_duplicates=settings.answer_cache_near_duplicates)
+    metrics.registry.cache("answers", cache.cache_info)
+    return cache
+
+
+@functools.cache
+def _scheduler() -> RequestScheduler | None:
+    """Process-wide model request scheduler, if rate limits are configured."""
+    if not (settings.rate_limit_rpm or settings.rate_limit_tpm):
+        return None
+    return RequestScheduler(rpm=settings.rate_limit_rpm, tpm=settings.rate_limit_tpm)
+
+
+@cli.command()
+@click.argument("locations", nargs=-1)
+def warm(locations: tuple[str, ...]):
+    """Pre-resolve locations and prefetch their forecasts.
+
+    Defaults to the configured warm locations, or the default location.
+    Reports how long each location took, which is useful to check that
+    Open-Meteo is reachable and how cold requests perform.
+
+    Examples:
+        nestor warm
+        nestor warm Madrid Segovia 28001
+    """
+    results = asyncio.run(warm_up(locations or _warm_locations()))
+
+    for result in results:
+        elapsed = f"{result.elapsed * 1000:.0f} ms"
+        if result.error:
+            click.echo(f"✗ {result.location}: {result.error} ({elapsed})", err=True)
+        else:
+            assert result.geo is not None
+            click.echo(
+                f"✓ {result.location} → {result.geo.name}, "
+                f"{result.geo.country} ({elapsed})"
+            )
+
+    if any(result.error for result in results):
+        sys.exit(1)
+
+
+def _warm_locations() -> list[str]:
+    """Configured warm locations, falling back to the default location."""
+    return settings.warm_locations or [settings.default_location]
+
+
+@cli.command()
+@click.option(
+    "--by",
+    type=click.Choice(get_args(GroupBy)),
+    default="day",
+    show_default=True,
+    help="Group runs by day, model, tool or route",
+)
+@click.option(
+    "--days",
+    type=int,
+    default=30,
+    show_default=True,
+    help="Only include runs from the last N days",
+)
+def stats(by: GroupBy, days: int):
+    """Show usage and latency statistics from the ledger.
+
+    The prefix column is the share of input tokens served from the
+    provider's prompt cache, and the prefetch column the share of
+    speculative weather requests a tool used. Grouped by tool, the queue
+    column is the time calls waited for a concurrency slot or worker thread.
+
+    Examples:
+        nestor stats
+        nestor stats --by tool --days 7
+    """
+    if settings.ledger_path is None:
+        click.echo("Ledger is disabled", err=True)
+        sys.exit(1)
+
+    since = datetime.now(UTC) - timedelta(days=days)
+    rows = summarize(Ledger(settings.ledger_path).read(since=since), by=by)
+    if not rows:
+        click.echo("No runs recorded")
+        return
+
+    count = "calls" if by == "tool" else "runs"
+    queue = f" {'queue p95':>10}" if by == "tool" else ""
+    click.echo(
+        f"{by:<24} {count:>6} {'↓ tokens':>10} {'prefix':>7} {'↑ tokens':>10} "
+        f"{'cached':>7} {'answers':>8} {'prefetch':>9} {'p50':>8} {'p95':>8}{queue}"
+    )
+    for row in rows:
+        queue = f" {row.queue_p95:>9.3f}s" if by == "tool" else ""
+        prefetch = (
+            f"{row.prefetch_hit_rate:>9.0%}"
+            if row.prefetch_hits or row.prefetch_wasted
+            else f"{'-':>9}"
+        )
+        click.echo(
+            f"{row.key:<24} {row.runs:>6} {row.input_tokens:>10} "
+            f"{row.prompt_cache_ratio:>7.0%} "
+            f"{row.output_tokens:>10} {row.cache_hits:>7} {row.cached_answers:>8} "
+            f"{prefetch} {row.p50:>7.2f}s {row.p95:>7.2f}s{queue}"
+        )
+
+
+@cli.command()
+@click.argument("prompt", required=False)
+def tokens(prompt: str | None):
+    """Show the prompt tokens of the instructions and each tool schema.
+
+    Every model request starts with these. Given a prompt, also shows the
+    tool groups its runs would see (see NESTOR_SELECT_TOOLS).
+
+    Examples:
+        nestor tokens
+        nestor tokens "Will it rain in Segovia?"
+    """
+    tool_defs = sorted(
+        (tool.tool_def for tool in create_assistant_toolset().tools.values()),
+        key=lambda tool: tool.name,
+    )
+    costs = {tool.name: tool_schema_tokens(tool) for tool in tool_defs}
+    instructions = estimate_tokens(INSTRUCTIONS)
+    total = instructions + sum(costs.values())
+
+    click.echo(f"{'instructions':<28} {instructions:>7}")
+    for name, cost in costs.items():
+        click.echo(f"{'tool ' + name:<28} {cost:>7}")
+    click.echo(f"{'total':<28} {total:>7}")
+    click.echo()
+    for group in TOOL_GROUPS:
+        cost = sum(costs.get(name, 0) for name in group.tools)
+        click.echo(f"{'group ' + group.name:<28} {cost:>7}")
+
+    if prompt is None:
+        return
+    groups = ToolSelector(TOOL_GROUPS).select(prompt)
+    if groups is None:
+        click.echo(f"\nPrompt sees all tools: {total} tokens")
+        return
+    exposed = {name for group in groups for name in group.tools}
+    selected = instructions + sum(
+        cost for name, cost in costs.items() if name in exposed
+    )
+    click.echo(
+        f"\nPrompt sees {', '.join(group.name for group in groups)}: "
+        f"{selected} tokens ({total - selected} saved per request)"
+    )
+
+
+@cli.command()
+@click.option(
+    "--backend",
+    "-b",
+    "backends",
+    multiple=True,
+    help="MODEL for OpenAI, or MODEL@URL for an OpenAI-compatible server",
+)
+@click.option(
+    "--prompts",
+    type=click.File(),
+    help="File with one prompt per line (default: a built-in set)",
+)
+@click.option("--repeat", type=int, default=1, show_default=True)
+@click.option("--concurrency", "-c", type=int, default=1, show_default=True)
+def bench(backends: tuple[str, ...], prompts, repeat: int, concurrency: int):
+    """Compare time to first token and throughput of model backends.
+
+    Streams the same prompts through each backend, without tools. Defaults
+    to the configured backend and model. MODEL@URL servers aren't sent the
+    OpenAI API key.
+
+    Examples:
+        nestor bench
+        nestor bench -b gpt-5-nano -b qwen3-8b@http://localhost:8080/v1 -c 4
+    """
+    prompt_set = (
+        [line.strip() for line in prompts if line.strip()] if prompts else PROMPTS
+    )
+    targets = [_bench_target(spec) for spec in backends] or [
+        (
+            settings.default_model,
+            settings.default_model,
+            backend_from_settings(settings),
+            settings.openai_api_key,
+        )
+    ]
+
+    async def run() -> None:
+        click.echo(
+            f"{'backend':<40} {'ok':>4} {'err':>4} {'TTFT p50':>9} {'p95':>8} "
+            f"{'tok/s':>7} {'total tok/s':>12}"
+        )
+        for spec, model_name, backend, api_key in targets:
+            agent: Agent[None, str] = create_agent(
+                str, api_key=api_key, model_name=model_name, backend=backend
+            )
+            result = await benchmark(
+                agent, prompt_set, repeat=repeat, concurrency=concurrency
+            )
+            click.echo(
+                f"{spec:<40} {len(result.timings):>4} {result.errors:>4} "
+                f"{result.ttft_p50:>8.2f}s {result.ttft_p95:>7.2f}s "
+                f"{result.decode_rate:>7.1f} {result.throughput:>12.1f}"
+            )
+
+    asyncio.run(run())
+
+
+def _bench_target(spec: str) -> tuple[str, str, ModelBackend, SecretStr | None]:
+    """Spec, model name, backend and API key of a `bench --backend` value."""
+    model_name, _, base_url = spec.partition("@")
+    if base_url:
+        # Never send the OpenAI key to a server the user typed in
+        backend = ModelBackend(provider="openai-compatible", base_url=base_url)
+        return spec, model_name, backend, None
+    if settings.openai_api_key is None:
+        raise click.UsageError(f"NESTOR_OPENAI_API_KEY is required for {spec!r}")
+    return spec, model_name, ModelBackend(), settings.openai_api_key
+
+
+@cli.command()
+@click.argument("prompts", type=click.File())
+@click.option(
+    "--output", "-o", type=click.File("w"), default="-", help="JSON Lines results"
+)
+@click.option(
+    "--workers", "-w", type=int, help="Worker processes (default: number of CPUs)"
+)
+@click.option(
+    "--concurrency",
+    "-c",
+    type=int,
+    default=defaults.BATCH_CONCURRENCY,
+    show_default=True,
+    help="Runs in flight per worker",
+)
+@click.option(
+    "--store",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=defaults.BATCH_STORE_PATH,
+    show_default=True,
+    help="Tool cache and rate limits shared by workers",
+)
+def batch(prompts, output, workers: int | None, concurrency: int, store: Path):
+    """Answer many prompts using all CPU cores.
+
+    Reads one prompt per line ("-" for stdin) and writes one JSON result per
+    line, in input order. Blank lines are skipped; each result's index is
+    its prompt's line number, counting from 0. Workers share tool caches and
+    the configured rate limits.
+
+    Examples:
+        nestor batch prompts.txt -o results.jsonl
+        nestor batch prompts.txt -w 4 -c 16
+    """
+    lines = [line.strip() for line in prompts]
+    numbers = [number for number, line in enumerate(lines) if line]
+    prompt_set = [lines[number] for number in numbers]
+
+    start = time.perf_counter()
+    errors = 0
+    for result in run_batch(
+        prompt_set, store_path=store, workers=workers, concurrency=concurrency
+    ):
+        result.index = numbers[result.index]
+        errors += result.error is not None
+        output.write(result.model_dump_json() + "\n")
+    elapsed = time.perf_counter() - start
+
+    click.echo(
+        f"{len(prompt_set)} prompts in {elapsed:.1f}s "
+        f"({len(prompt_set) / elapsed:.1f}/s), {errors} failed",
+        err=True,
+    )
+    if errors:
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument("subscribers", type=click.File())
+@click.option(
+    "--output", "-o", type=click.File("w"), default="-", help="JSON Lines digests"
+)
+@click.option(
+    "--template", "-t", default=TEMPLATE, show_default=True, help="Message template"
+)
+@click.option(
+    "--summarize", is_flag=True, help="Write summaries with one model call per location"
+)
+def digest(subscribers, output, template: str, summarize: bool):
+    """Build today's weather digest of many subscribers.
+
+    Reads one JSON subscriber per line ("-" for stdin), with "id",
+    "location" and an optional "name", and writes one JSON digest per line,
+    in input order. Subscribers in the same location share geocoding, a
+    forecast and a summary.
+
+    Examples:
+        nestor digest subscribers.jsonl -o digests.jsonl
+        nestor digest subscribers.jsonl --summarize -t "Hi {name}! {summary}"
+    """
+    subscriber_set = [
+        Subscriber.model_validate_json(line) for line in subscribers if line.strip()
+    ]
+    agent = digest_agent_from_settings(settings, _scheduler()) if summarize else None
+
+    try:
+        digests, report = asyncio.run(
+            build_digests(subscriber_set, template=template, agent=agent)
+        )
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--template") from e
+    for result in digests:
+        output.write(result.model_dump_json() + "\n")
+
+    click.echo(
+        f"{report.subscribers} digests in {report.elapsed:.1f}s "
+        f"({report.throughput:.1f}/s), {report.failed} failed",
+        err=True,
+    )
+    click.echo(
+        f"{report.queries} queries, {report.locations} locations "
+        f"({report.dedup_ratio:.1f} digests per forecast), "
+        f"{report.forecast_requests} forecast requests, "
+        f"{report.model_calls} model calls",
+        err=True,
+    )
+    if report.failed:
+        sys.exit(1)
+
 
 @cli.command()
 def info():
     """Show Néstor configuration."""
     click.echo("Néstor Configuration:")
     click.echo(f"  Model: {settings.default_model}")
+    if settings.llm_base_url:
+        click.echo(f"  Server: {settings.llm_base_url} ({settings.llm_provider})")
+    if settings.fallback_models:
+        click.echo(f"  Fallbacks: {', '.join(settings.fallback_models)}")
+    if settings.escalate_model:
+        click.echo(f"  Escalate to: {settings.escalate_model}")
+    if settings.hedge_after:
+        click.echo(f"  Hedge after: {settings.hedge_after}s")
     click.echo(f"  Max retries: {settings.max_retries}")
+    click.echo(f"  Tool selection: {'on' if settings.select_tools else 'off'}")
+    click.echo(f"  Run timeout: {settings.run_timeout or 'none'}")
+    click.echo(
+        f"  Rate limits: {settings.rate_limit_rpm or '∞'} RPM, "
+        f"{settings.rate_limit_tpm or '∞'} TPM"
+    )
+    click.echo(f"  Warm locations: {', '.join(_warm_locations())}")
+    click.echo(f"  Answer cache: {'on' if settings.answer_cache else 'off'}")
+    click.echo(f"  Speculative prefetch: {'on' if settings.speculate else 'off'}")
+    click.echo(f"  Ledger: {settings.ledger_path or 'disabled'}")
+    if settings.metrics_port is not None:
+        click.echo(f"  Metrics: http://127.0.0.1:{settings.metrics_port}/metrics")
 
 
 if __name__ == "__main__":
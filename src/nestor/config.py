@@ -3,7 +3,9 @@
 Loads settings from environment variables and .env file.
 """
 
-from pydantic import Field, SecretStr
+from pathlib import Path
+
+from pydantic import Field, SecretStr, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from . import defaults
@@ -17,9 +19,98 @@ class Settings(BaseSettings):
     )
 
     # LLM
-    openai_api_key: SecretStr
+    openai_api_key: SecretStr | None = Field(
+        default=None,
+        description="API key. Required for OpenAI, optional for compatible servers.",
+    )
     default_model: str = defaults.MODEL
+    llm_provider: defaults.ModelProvider = Field(
+        default=defaults.MODEL_PROVIDER,
+        description="'openai', or 'openai-compatible' for llama.cpp, vLLM, Ollama, etc.",
+    )
+    llm_base_url: str | None = Field(
+        default=None,
+        description="API base URL, e.g. 'http://localhost:8080/v1'. None for OpenAI.",
+    )
+    llm_max_connections: int = Field(
+        default=defaults.MODEL_MAX_CONNECTIONS,
+        description="Concurrent connections to the model server.",
+    )
+    llm_max_keepalive_connections: int = Field(
+        default=defaults.MODEL_MAX_KEEPALIVE_CONNECTIONS,
+        description="Idle connections kept open for reuse.",
+    )
+    llm_keepalive_expiry: float = Field(
+        default=defaults.MODEL_KEEPALIVE_EXPIRY,
+        description="Seconds an idle connection is kept open.",
+    )
+    llm_timeout: float = Field(
+        default=defaults.MODEL_TIMEOUT,
+        description="Seconds to wait for each read from the model server.",
+    )
+    llm_connect_timeout: float = Field(
+        default=defaults.MODEL_CONNECT_TIMEOUT,
+        description="Seconds to wait for a connection to the model server.",
+    )
     max_retries: int = defaults.MAX_RETRIES
+    select_tools: bool = Field(
+        default=True,
+        description="Only send the schemas of the tool groups a prompt likely needs.",
+    )
+    run_timeout: float | None = Field(
+        default=None,
+        description="Seconds each agent run may take, tools included. None for no limit.",
+    )
+    max_history_turns: int = Field(
+        default=defaults.MAX_HISTORY_TURNS,
+        description="Conversation turns kept in interactive sessions.",
+    )
+    fallback_models: list[str] = Field(
+        default_factory=list,
+        description="Models tried, in order, when the default model fails or is slow.",
+    )
+    escalate_model: str | None = Field(
+        default=None,
+        description="Stronger model for prompts classified as hard. None to disable.",
+    )
+    hedge_after: float | None = Field(
+        default=None,
+        description="Seconds before racing a slow model request against the next fallback.",
+    )
+    route_max_latency: float | None = Field(
+        default=None,
+        description="Demote models whose recent p95 latency exceeds this many seconds.",
+    )
+    rate_limit_rpm: int | None = Field(
+        default=None,
+        description="Model requests per minute shared by all agents. None for no limit.",
+    )
+    rate_limit_tpm: int | None = Field(
+        default=None,
+        description="Estimated model tokens per minute shared by all agents. None for no limit.",
+    )
+
+    # Answer cache
+    answer_cache: bool = Field(
+        default=False,
+        description="Reuse answers to repeated prompts while their tool data is fresh.",
+    )
+    answer_cache_near_duplicates: bool = Field(
+        default=False,
+        description="Also reuse answers to prompts differing in a few words.",
+    )
+
+    # Metrics
+    metrics_port: int | None = Field(
+        default=None,
+        description="Serve Prometheus metrics on this port during interactive sessions. None to disable.",
+    )
+
+    # Ledger
+    ledger_path: Path | None = Field(
+        default=defaults.LEDGER_PATH,
+        description="Append-only usage ledger (JSON Lines). Empty to disable.",
+    )
 
     # Search
     search_backend: str = Field(
@@ -30,12 +121,37 @@ class Settings(BaseSettings):
         default=defaults.SAFESEARCH,
         description="Safe search level: 'on', 'moderate', or 'off'",
     )
+    search_token_budget: int = Field(
+        default=defaults.SEARCH_TOKEN_BUDGET,
+        description="Approximate prompt tokens all results of one search may use.",
+    )
+    page_token_budget: int = Field(
+        default=defaults.PAGE_TOKEN_BUDGET,
+        description="Approximate prompt tokens the text of one fetched page may use.",
+    )
 
     # Weather
     default_location: str = Field(
         default=defaults.DEFAULT_LOCATION,
         description="Default location for weather queries. Location name, city or postal code.",
     )
+    warm_locations: list[str] = Field(
+        default_factory=list,
+        description="Locations whose forecasts are kept warm. Defaults to default_location.",
+    )
+    warm_interval: float = Field(
+        default=defaults.WARM_INTERVAL,
+        description="Seconds between forecast refreshes for warm locations.",
+    )
+    speculate: bool = Field(
+        default=False,
+        description="Prefetch weather data guessed from the prompt during the first model request.",
+    )
+
+    @field_validator("ledger_path", mode="before")
+    @classmethod
+    def _empty_path_disables(cls, value: object) -> object:
+        return value or None
 
 
 # Global settings instance
@@ -0,0 +1,122 @@
+"""End-to-end deadlines for agent runs.
+
+A `Deadline` travels with `AssistantDeps` so every tool can derive its
+remaining time budget. Tools stop a little before the run deadline, keeping
+a reserve for the final model request, so the agent can still answer with
+whatever data it has instead of hanging.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic_ai import Agent
+from pydantic_ai.agent import AgentRunResult
+from pydantic_ai.settings import ModelSettings
+
+from . import defaults
+from .dependencies import AssistantDeps
+
+
+@dataclass(frozen=True)
+class Deadline:
+    """Absolute point in time (monotonic clock) by which a run must finish."""
+
+    at: float
+    """Deadline on the `time.monotonic` clock."""
+
+    reserve: float = 0.0
+    """Seconds kept free at the end for the final model request."""
+
+    @classmethod
+    def after(cls, seconds: float, reserve: float | None = None) -> Deadline:
+        """Deadline `seconds` from now.
+
+        Args:
+            seconds: Total time budget
+            reserve: Seconds reserved for the final answer. Defaults to a
+                quarter of the budget, capped at `defaults.DEADLINE_RESERVE`.
+        """
+        if reserve is None:
+            reserve = min(defaults.DEADLINE_RESERVE, seconds / 4)
+        return cls(at=time.monotonic() + seconds, reserve=reserve)
+
+    def remaining(self) -> float:
+        """Seconds left until the deadline (never negative)."""
+        return max(0.0, self.at - time.monotonic())
+
+    def tool_remaining(self) -> float:
+        """Seconds left for tool work, excluding the reserve."""
+        return max(0.0, self.at - self.reserve - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.remaining() == 0
+
+
+def tool_timeout(deadline: Deadline | None, cap: float) -> float:
+    """Timeout for a single tool operation.
+
+    Args:
+        deadline: Run deadline, if any
+        cap: The operation's own maximum timeout
+
+    Returns:
+        The smaller of `cap` and the time left for tools
+    """
+    if deadline is None:
+        return cap
+    return min(cap, deadline.tool_remaining())
+
+
+def within(deadline: Deadline | None) -> asyncio.Timeout:
+    """Async context cancelling tool work when the deadline is reached.
+
+    Raises `TimeoutError` on expiry. A no-op without deadline.
+
+    Example:
+        >>> async with within(ctx.deps.deadline):
+        ...     data = await fetch(...)
+    """
+    return asyncio.timeout(None if deadline is None else deadline.tool_remaining())
+
+
+async def run_with_deadline(
+    agent: Agent[AssistantDeps, Any],
+    prompt: str,
+    *,
+    deps: AssistantDeps,
+    timeout: float,
+    model_settings: ModelSettings | None = None,
+    **kwargs: Any,
+) -> AgentRunResult[Any]:
+    """Run an agent with an overall time budget.
+
+    The deadline is attached to `deps` for tools, caps the timeout of every
+    model request, and finally cancels the run if it is still going.
+
+    Args:
+        agent: Assistant agent
+        prompt: User prompt
+        deps: Run dependencies (not modified)
+        timeout: Total seconds for the run
+        model_settings: Optional model settings for the run
+        **kwargs: Other `Agent.run` arguments, e.g. `message_history`
+
+    Returns:
+        The run result
+
+    Raises:
+        TimeoutError: If the run didn't finish in time
+    """
+    deadline = Deadline.after(timeout)
+    deps = dataclasses.replace(deps, deadline=deadline)
+    settings: ModelSettings = {**(model_settings or {}), "timeout": timeout}
+
+    async with asyncio.timeout(timeout):
+        return await agent.run(prompt, deps=deps, model_settings=settings, **kwargs)
@@ -1,11 +1,45 @@
 """Default configuration values."""
 
+import os
+from pathlib import Path
 from typing import Literal
 
 SafeSearchLevel = Literal["on", "moderate", "off"]
+ModelProvider = Literal["openai", "openai-compatible"]
 
 MODEL = "gpt-5-nano"
+MODEL_PROVIDER: ModelProvider = "openai"
 MAX_RETRIES = 2
+# Model HTTP connection pool. Idle connections are kept long enough to be
+# reused across interactive turns, saving a TCP/TLS handshake per answer.
+MODEL_MAX_CONNECTIONS = 100
+MODEL_MAX_KEEPALIVE_CONNECTIONS = 20
+MODEL_KEEPALIVE_EXPIRY = 60.0
+# Seconds to connect, and to wait for each read (the OpenAI SDK's defaults)
+MODEL_CONNECT_TIMEOUT = 5.0
+MODEL_TIMEOUT = 600.0
+# Maximum seconds of a run deadline reserved for the final model answer
+DEADLINE_RESERVE = 5.0
 SEARCH_BACKEND = "auto"
 SAFESEARCH: SafeSearchLevel = "moderate"
 DEFAULT_LOCATION = "Madrid"
+# Approximate prompt tokens all search results of a single call may use
+SEARCH_TOKEN_BUDGET = 600
+# Conversation turns kept by interactive sessions
+MAX_HISTORY_TURNS = 50
+# Approximate prompt tokens the text of a fetched page may use
+PAGE_TOKEN_BUDGET = 2000
+# Seconds between forecast refreshes for warm locations. Slightly shorter than
+# the forecast cache TTL so hot entries are replaced before they expire.
+WARM_INTERVAL = 50 * 60.0
+
+DATA_DIR = (
+    Path(os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share") / "nestor"
+)
+LEDGER_PATH = DATA_DIR / "ledger.jsonl"
+# Batch mode: runs in flight per worker process, and prompts per work unit
+BATCH_CONCURRENCY = 8
+BATCH_CHUNK_SIZE = 32
+BATCH_STORE_PATH = DATA_DIR / "batch.sqlite"
+# Digests: geocoding requests and model calls in flight
+DIGEST_CONCURRENCY = 16
@@ -1,14 +1,25 @@
 """Shared dependencies for Néstor."""
 
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 from . import defaults
 
+if TYPE_CHECKING:
+    from .deadline import Deadline
 
-@dataclass
+
+@dataclass(frozen=True)
 class AssistantDeps:
-    """Dependencies for assistant agent."""
+    """Dependencies for assistant agent.
+
+    Immutable, so a single instance can be shared by any number of runs and
+    users. Use `dataclasses.replace` to derive variants.
+    """
 
     search_backend: str
     safesearch: defaults.SafeSearchLevel
     default_location: str
+    search_token_budget: int = defaults.SEARCH_TOKEN_BUDGET
+    page_token_budget: int = defaults.PAGE_TOKEN_BUDGET
+    deadline: "Deadline | None" = None
@@ -0,0 +1,209 @@
+"""Memory diagnostics for long-running embedders.
+
+Néstor keeps process-wide caches and pooled clients, and embedders keep
+conversation histories. `memory_report()` is a cheap hook to see what they
+hold at runtime; `AllocationTracker` diffs `tracemalloc` snapshots and
+attributes growth to subsystems (Néstor modules and third-party packages).
+
+Example:
+    >>> logger.info("%s", memory_report().format())
+
+    >>> tracker = AllocationTracker()
+    >>> tracker.start()
+    >>> ...  # Run some turns
+    >>> for growth in tracker.growth(limit=5):
+    ...     print(growth)
+"""
+
+import gc
+import logging
+import sys
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import PurePath
+
+from . import http
+from .tools import weather, webpage, websearch
+
+logger = logging.getLogger(__name__)
+
+# Types whose live instances are counted, by qualified name
+TRACKED_TYPES = (
+    "nestor.dependencies.AssistantDeps",
+    "pydantic_ai.messages.ModelRequest",
+    "pydantic_ai.messages.ModelResponse",
+    "pydantic_ai.agent.AgentRunResult",
+    "httpx.AsyncClient",
+    "ddgs.ddgs.DDGS",
+)
+TRACEBACK_FRAMES = 10
+
+_sizers: dict[str, Callable[[], int]] = {}
+
+
+def register(name: str, size: Callable[[], int]) -> None:
+    """Include an embedder's structure in memory reports.
+
+    Args:
+        name: Report label, e.g. "tenancy"
+        size: Returns the current number of entries
+
+    Example:
+        >>> register("answers", lambda: len(answer_cache))
+    """
+    _sizers[name] = size
+
+
+@dataclass
+class MemoryReport:
+    """Cache sizes and live object counts."""
+
+    caches: dict[str, int] = field(default_factory=dict)
+    """Entries per cache or pool."""
+
+    objects: dict[str, int] = field(default_factory=dict)
+    """Live instances per tracked type."""
+
+    traced: int | None = None
+    """Bytes allocated by Python, if tracemalloc is tracing."""
+
+    def format(self) -> str:
+        """Human-readable report."""
+        lines = ["Caches:"]
+        lines += [f"  {name}: {size}" for name, size in self.caches.items()]
+        lines.append("Live objects:")
+        lines += [f"  {name}: {count}" for name, count in self.objects.items()]
+        if self.traced is not None:
+            lines.append(f"Traced memory: {self.traced / 1024 / 1024:.1f} MiB")
+        return "\n".join(lines)
+
+
+def memory_report() -> MemoryReport:
+    """Snapshot of Néstor's caches and live objects.
+
+    Counting objects walks every object tracked by the garbage collector,
+    which takes a fraction of a second on large heaps; fine for periodic
+    dumps, not for every request.
+    """
+    report = MemoryReport()
+    for name, cached in (
+        ("geocode", weather.geocode),
+        ("request_daily", weather.request_daily),
+        ("request_hourly", weather.request_hourly),
+    ):
+        report.caches[name] = cached.cache_info().currsize
+    report.caches["search"] = len(websearch.search_cache)
+    report.caches["pages"] = len(webpage.page_cache)
+    report.caches["ddgs_clients"] = len(websearch.ddgs_pool)
+    report.caches["http_clients"] = http.client_count()
+    for name, size in _sizers.items():
+        report.caches[name] = size()
+
+    report.objects = count_objects(TRACKED_TYPES)
+    if tracemalloc.is_tracing():
+        report.traced = tracemalloc.get_traced_memory()[0]
+    return report
+
+
+def count_objects(qualnames: tuple[str, ...]) -> dict[str, int]:
+    """Live instances of types given by qualified name (subclasses included)."""
+    types = {}
+    for qualname in qualnames:
+        module, _, name = qualname.rpartition(".")
+        if (cls := getattr(sys.modules.get(module), name, None)) is not None:
+            types[qualname] = cls
+    counts = dict.fromkeys(qualnames, 0)
+    for obj in gc.get_objects():
+        for qualname, cls in types.items():
+            if isinstance(obj, cls):
+                counts[qualname] += 1
+    return counts
+
+
+@dataclass(frozen=True)
+class Growth:
+    """Allocation growth of a subsystem between two snapshots."""
+
+    subsystem: str
+    size: int
+    """Bytes allocated (negative if freed)."""
+
+    count: int
+    """Allocated blocks."""
+
+    def __str__(self) -> str:
+        return f"{self.subsystem:<28} {self.size / 1024:>+10.1f} KiB {self.count:>+8}"
+
+
+def subsystem(filename: str) -> str:
+    """Subsystem of a source file: a Néstor module, a package or "other"."""
+    parts = PurePath(filename).parts
+    if "nestor" in parts:
+        module = parts[len(parts) - 1 - parts[::-1].index("nestor") :]
+        return ".".join(module).removesuffix(".py")
+    if "site-packages" in parts:
+        i = parts.index("site-packages")
+        if i + 1 < len(parts):
+            return parts[i + 1].removesuffix(".py")
+    if "<" in filename:  # <frozen ...>, <string>
+        return "other"
+    return "stdlib" if filename.startswith(sys.prefix) else "other"
+
+
+class AllocationTracker:
+    """Diffs tracemalloc snapshots by subsystem.
+
+    Allocations are attributed to the innermost frame outside the standard
+    library, so dicts created by `json` for a tool count towards the tool.
+    """
+
+    def __init__(self, frames: int = TRACEBACK_FRAMES):
+        self.frames = frames
+        self.baseline: tracemalloc.Snapshot | None = None
+
+    def start(self) -> None:
+        """Start tracing (if needed) and take the baseline snapshot."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.baseline = self.snapshot()
+
+    def stop(self) -> None:
+        """Stop tracing."""
+        tracemalloc.stop()
+        self.baseline = None
+
+    @staticmethod
+    def snapshot() -> tracemalloc.Snapshot:
+        """Snapshot after a full collection, excluding tracemalloc itself."""
+        gc.collect()
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+
+    def growth(self, limit: int | None = None) -> list[Growth]:
+        """Growth per subsystem since the baseline, largest first."""
+        if self.baseline is None:
+            raise RuntimeError("AllocationTracker not started")
+        current = self.snapshot()
+
+        sizes: Counter[str] = Counter()
+        counts: Counter[str] = Counter()
+        for stat in current.compare_to(self.baseline, "traceback"):
+            key = self._attribute(stat.traceback)
+            sizes[key] += stat.size_diff
+            counts[key] += stat.count_diff
+
+        growth = [Growth(key, sizes[key], counts[key]) for key in sizes]
+        growth.sort(key=lambda g: g.size, reverse=True)
+        return growth[:limit]
+
+    @staticmethod
+    def _attribute(traceback: tracemalloc.Traceback) -> str:
+        # Frames are oldest first
+        for frame in reversed(traceback):
+            name = subsystem(frame.filename)
+            if name not in ("stdlib", "other"):
+                return name
+        return subsystem(traceback[-1].filename) if len(traceback) else "other"
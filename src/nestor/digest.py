@@ -0,0 +1,290 @@
+"""Weather digests for many subscribers.
+
+Running one agent turn per subscriber repeats the same geocoding, forecast
+fetches and model calls for everyone in the same city. `build_digests`
+instead resolves each distinct location query once, groups subscribers by
+resolved location, fetches every group's forecast at once (batched into
+multi-location Open-Meteo requests, see `DailyBatcher`), and renders each
+subscriber's message from a template, with at most one model call per
+group. Run it on a schedule, e.g. from cron every morning.
+
+Example:
+    >>> digests, report = await build_digests(subscribers)
+    >>> print(f"{report.dedup_ratio:.1f} subscribers per forecast")
+"""
+
+import asyncio
+import logging
+import string
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic import BaseModel
+from pydantic_ai import Agent
+
+from . import defaults
+from .ledger import recording
+from .tools.weather import (
+    GeoLocation,
+    WeatherForecast,
+    daily_batcher,
+    daily_forecast,
+    fetch_daily,
+    geocode,
+)
+
+logger = logging.getLogger(__name__)
+
+SUMMARY = (
+    "{description}, {temp_min:.0f} to {temp_max:.0f} °C, "
+    "{precipitation_probability}% chance of precipitation"
+)
+"""Summary of a location's day without a model."""
+
+TEMPLATE = "Good morning, {name}! Today in {location}: {summary}."
+"""Default message."""
+
+FIELDS = frozenset(
+    {
+        "name",
+        "location",
+        "country",
+        "date",
+        "description",
+        "temp_min",
+        "temp_max",
+        "precipitation_probability",
+        "precipitation_sum",
+        "wind_gusts_max",
+        "summary",
+    }
+)
+"""Fields available to message templates."""
+
+
+class Subscriber(BaseModel):
+    """Recipient of a digest."""
+
+    id: str
+    location: str
+    """Location name, city, or postal code."""
+
+    name: str | None = None
+    """Name to greet. Defaults to the id."""
+
+
+class Digest(BaseModel):
+    """Rendered digest of one subscriber."""
+
+    subscriber: str
+    """Subscriber id."""
+
+    location: str | None = None
+    """Resolved location name."""
+
+    message: str | None = None
+    error: str | None = None
+
+
+@dataclass
+class DigestReport:
+    """Work done for a set of digests."""
+
+    subscribers: int = 0
+    queries: int = 0
+    """Distinct location queries geocoded."""
+
+    locations: int = 0
+    """Distinct resolved locations, one forecast each."""
+
+    forecasts_fetched: int = 0
+    """Forecasts not already cached."""
+
+    forecast_requests: int = 0
+    """Upstream forecast requests, several locations each."""
+
+    model_calls: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    """Seconds to build all digests."""
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Delivered digests per forecast location (1.0 without sharing)."""
+        delivered = self.subscribers - self.failed
+        return delivered / self.locations if self.locations else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Digests built per second."""
+        return self.subscribers / self.elapsed if self.elapsed else 0.0
+
+
+@dataclass
+class _Group:
+    geo: GeoLocation
+    forecast: WeatherForecast | None = None
+    summary: str | None = None
+    error: str | None = None
+
+
+async def build_digests(
+    subscribers: Sequence[Subscriber],
+    *,
+    template: str = TEMPLATE,
+    agent: Agent[None, str] | None = None,
+    concurrency: int = defaults.DIGEST_CONCURRENCY,
+) -> tuple[list[Digest], DigestReport]:
+    """Build today's weather digest of every subscriber.
+
+    Args:
+        subscribers: Digest recipients
+        template: Message template, using any of `FIELDS`
+        agent: Writes each location's summary from its forecast, once per
+            location (see `agents.digest`). Without it, summaries
+            come from `SUMMARY`.
+        concurrency: Geocoding requests and model calls in flight
+
+    Returns:
+        One digest per subscriber, in input order, and the work it took.
+        Failed digests carry an error.
+
+    Raises:
+        ValueError: If the template uses unknown fields
+    """
+    unknown = _template_fields(template) - FIELDS
+    if unknown:
+        raise ValueError(f"Unknown template fields: {', '.join(sorted(unknown))}")
+
+    start = time.perf_counter()
+    report = DigestReport(subscribers=len(subscribers))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    # Same place, different spelling: "madrid" and "Madrid " share a lookup
+    queries: dict[str, str] = {}
+    for subscriber in subscribers:
+        query = " ".join(subscriber.location.split())
+        queries.setdefault(_query_key(query), query)
+    report.queries = len(queries)
+
+    async def resolve(query: str) -> GeoLocation | str:
+        async with semaphore:
+            try:
+                return await geocode(query) or "location not found"
+            except Exception as e:
+                logger.warning("Digest geocoding failed for %r: %r", query, e)
+                return repr(e)
+
+    resolved = dict(
+        zip(queries, await asyncio.gather(*(resolve(q) for q in queries.values())))
+    )
+
+    groups: dict[tuple[float, float], _Group] = {}
+    for geo in resolved.values():
+        if isinstance(geo, GeoLocation):
+            groups.setdefault((geo.latitude, geo.longitude), _Group(geo))
+    report.locations = len(groups)
+
+    await _fetch_forecasts(list(groups.values()), report)
+
+    if agent is not None:
+
+        async def summarize(group: _Group) -> None:
+            assert group.forecast is not None
+            async with semaphore:
+                report.model_calls += 1
+                try:
+                    result = await agent.run(group.forecast.model_dump_json())
+                    group.summary = result.output.strip()
+                except Exception as e:
+                    logger.warning("Digest summary failed for %s: %r", group.geo, e)
+                    group.error = repr(e)
+
+        await asyncio.gather(
+            *(summarize(g) for g in groups.values() if g.forecast is not None)
+        )
+
+    digests = []
+    for subscriber in subscribers:
+        geo = resolved[_query_key(subscriber.location)]
+        if isinstance(geo, GeoLocation):
+            group = groups[geo.latitude, geo.longitude]
+            digest = _render(subscriber, group, template)
+        else:
+            digest = Digest(subscriber=subscriber.id, error=geo)
+        digests.append(digest)
+        report.failed += digest.error is not None
+
+    report.elapsed = time.perf_counter() - start
+    logger.info(
+        "Built %d digests for %d locations in %.2fs (%d forecast requests)",
+        report.subscribers,
+        report.locations,
+        report.elapsed,
+        report.forecast_requests,
+    )
+    return digests, report
+
+
+async def _fetch_forecasts(groups: list[_Group], report: DigestReport) -> None:
+    """Fetch the forecast of every group at once, so requests are batched."""
+
+    async def fetch(group: _Group) -> None:
+        try:
+            data = await fetch_daily(group.geo.latitude, group.geo.longitude)
+        except Exception as e:
+            logger.warning("Digest forecast failed for %s: %r", group.geo, e)
+            group.error = repr(e)
+        else:
+            group.forecast = daily_forecast(group.geo, data, forecast_days=1)
+
+    requests = daily_batcher.requests
+    with recording() as recorder:
+        await asyncio.gather(*(fetch(group) for group in groups))
+    report.forecasts_fetched = recorder.cache_misses
+    report.forecast_requests = daily_batcher.requests - requests
+
+
+def _query_key(location: str) -> str:
+    return " ".join(location.split()).casefold()
+
+
+def _template_fields(template: str) -> set[str]:
+    return {
+        field.split(".")[0].split("[")[0]
+        for _, field, _, _ in string.Formatter().parse(template)
+        if field is not None
+    }
+
+
+def _render(subscriber: Subscriber, group: _Group, template: str) -> Digest:
+    digest = Digest(subscriber=subscriber.id, location=group.geo.name)
+    if group.error is not None or group.forecast is None:
+        digest.error = group.error or "no forecast"
+        return digest
+    if not group.forecast.days:
+        digest.error = "no forecast for today"
+        return digest
+    today = group.forecast.days[0]
+    fields: dict[str, Any] = {
+        "name": subscriber.name or subscriber.id,
+        "location": group.geo.name,
+        "country": group.geo.country,
+        "date": today.date,
+        "description": today.weather_description,
+        "temp_min": today.temp_min,
+        "temp_max": today.temp_max,
+        "precipitation_probability": today.precipitation_probability_max,
+        "precipitation_sum": today.precipitation_sum,
+        "wind_gusts_max": today.wind_gusts_max,
+    }
+    # Fields may be missing or None, e.g. for variables a model lacks
+    try:
+        fields["summary"] = group.summary or SUMMARY.format(**fields)
+        digest.message = template.format(**fields)
+    except (TypeError, ValueError, KeyError) as e:
+        logger.warning("Digest rendering failed for %s: %r", subscriber.id, e)
+        digest.error = repr(e)
+    return digest
@@ -0,0 +1,28 @@
+"""Conversation history helpers."""
+
+from pydantic_ai.messages import ModelMessage, ModelRequest, UserPromptPart
+
+
+def trim_history(messages: list[ModelMessage], max_turns: int) -> list[ModelMessage]:
+    """Keep the last `max_turns` turns of a conversation.
+
+    A turn starts with a user prompt, so tool calls and their returns are
+    never split. Long-running sessions would otherwise grow memory and
+    prompt tokens without bound.
+
+    Args:
+        messages: Conversation history, oldest first
+        max_turns: Turns to keep
+
+    Returns:
+        The trimmed history (`messages` itself if nothing was dropped)
+    """
+    starts = [
+        i
+        for i, message in enumerate(messages)
+        if isinstance(message, ModelRequest)
+        and any(isinstance(part, UserPromptPart) for part in message.parts)
+    ]
+    if len(starts) <= max_turns:
+        return messages
+    return messages[starts[-max_turns] :] if max_turns > 0 else []
@@ -0,0 +1,115 @@
+"""Pooled HTTP clients shared by tools.
+
+Creating an `httpx.AsyncClient` per call throws away its connection pool,
+so every request pays DNS, TCP and TLS setup again. Tools get a shared
+client instead, one per event loop (clients can't be shared across loops).
+Their requests are metered per upstream host (see `metrics`).
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from importlib.metadata import version
+
+import httpx
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Default timeout in seconds; tools pass tighter per-request timeouts
+HTTP_TIMEOUT = 30.0
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 30.0
+# Hosts metered by name; fetched pages could otherwise add a series per site
+MAX_METERED_HOSTS = 64
+USER_AGENT = f"nestor/{version('nestor')} (+https://github.com/elatomo/nestor)"
+
+transport: httpx.AsyncBaseTransport | None = None
+"""Transport for new clients. None for the network (tests set a mock)."""
+
+_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+class MeteredTransport(httpx.AsyncBaseTransport):
+    """Transport recording latency, outcome and concurrency per host."""
+
+    def __init__(self, wrapped: httpx.AsyncBaseTransport):
+        self.wrapped = wrapped
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = _host_label(request.url.host)
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with metrics.upstream_in_flight.labels(host).track():
+                response = await self.wrapped.handle_async_request(request)
+            outcome = f"{response.status_code // 100}xx"
+            return response
+        finally:
+            metrics.upstream_seconds.labels(host).observe(time.perf_counter() - start)
+            metrics.upstream_requests.labels(host, outcome).inc()
+
+    async def aclose(self) -> None:
+        await self.wrapped.aclose()
+
+
+_metered_hosts: set[str] = set()
+
+
+def _host_label(host: str) -> str:
+    """Host as metrics label; "other" once `MAX_METERED_HOSTS` are known."""
+    if host in _metered_hosts:
+        return host
+    if len(_metered_hosts) >= MAX_METERED_HOSTS:
+        return "other"
+    _metered_hosts.add(host)
+    return host
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared HTTP client of the running event loop.
+
+    Don't close it or use it as a context manager; see `aclose`.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        # A client given a transport ignores its own limits
+        wrapped = transport or httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            )
+        )
+        client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+            transport=MeteredTransport(wrapped),
+        )
+        _clients[loop] = client
+        logger.debug("Created HTTP client for loop %r", loop)
+    return client
+
+
+async def aclose() -> None:
+    """Close the shared client of the running event loop, if any."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def client_count() -> int:
+    """Number of shared clients alive (one per event loop)."""
+    return len(_clients)
+
+
+def reset() -> None:
+    """Forget all shared clients, e.g. after changing `transport`."""
+    _clients.clear()
@@ -0,0 +1,330 @@
+"""Persistent usage and latency ledger.
+
+Every agent run can be recorded as one JSON line in an append-only file:
+token usage, model requests, tool calls with durations, total latency and
+tool cache hits. The ledger is aggregated by `nestor stats`.
+"""
+
+import logging
+import statistics
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field, ValidationError
+from pydantic_ai import RunContext
+from pydantic_ai.agent import AgentRunResult
+from pydantic_ai.messages import ModelResponse
+from pydantic_ai.toolsets import AbstractToolset
+from pydantic_ai.toolsets.abstract import ToolsetTool
+from pydantic_ai.toolsets.wrapper import WrapperToolset
+
+logger = logging.getLogger(__name__)
+
+GroupBy = Literal["day", "model", "tool", "route"]
+
+
+class ToolCall(BaseModel):
+    """A single tool execution."""
+
+    name: str
+    duration: float
+    """Seconds spent executing the tool, queue time included."""
+
+    queued: float = 0.0
+    """Seconds spent waiting for a concurrency slot or worker."""
+
+
+class RunRecord(BaseModel):
+    """Usage and latency of a single agent run."""
+
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    model: str
+    input_tokens: int = 0
+    cache_read_tokens: int = 0
+    """Input tokens served from the provider's prompt cache."""
+
+    output_tokens: int = 0
+    requests: int = 0
+    tool_calls: list[ToolCall] = []
+    latency: float = 0.0
+    """Seconds from start to final output."""
+
+    cache_hits: int = 0
+    """Tool cache lookups served from cache."""
+
+    cache_misses: int = 0
+    """Tool cache lookups that went upstream."""
+
+    routes: list[str] = []
+    """Routing decisions of model requests, as `model:reason`."""
+
+    answer_cached: bool = False
+    """Whether the answer was served from the answer cache."""
+
+    prefetch_hits: int = 0
+    """Speculative upstream requests whose data a tool used."""
+
+    prefetch_wasted: int = 0
+    """Speculative upstream requests no tool used."""
+
+
+@dataclass
+class RunRecorder:
+    """Collects tool calls and cache activity during a run."""
+
+    started: float = field(default_factory=time.perf_counter)
+    tool_calls: list[ToolCall] = field(default_factory=list)
+    cache_lookups: int = 0
+    cache_misses: int = 0
+    routes: list[str] = field(default_factory=list)
+    prefetch_hits: int = 0
+    prefetch_wasted: int = 0
+
+    def finish(self, result: AgentRunResult[Any]) -> RunRecord:
+        """Build the run record from the agent result."""
+        usage = result.usage()
+        models = [
+            m.model_name
+            for m in result.new_messages()
+            if isinstance(m, ModelResponse) and m.model_name
+        ]
+        return RunRecord(
+            model=models[-1] if models else "unknown",
+            input_tokens=usage.input_tokens,
+            cache_read_tokens=usage.cache_read_tokens,
+            output_tokens=usage.output_tokens,
+            requests=usage.requests,
+            tool_calls=self.tool_calls,
+            latency=time.perf_counter() - self.started,
+            cache_hits=self.cache_lookups - self.cache_misses,
+            cache_misses=self.cache_misses,
+            routes=self.routes,
+            prefetch_hits=self.prefetch_hits,
+            prefetch_wasted=self.prefetch_wasted,
+        )
+
+    def finish_cached(self, model: str) -> RunRecord:
+        """Build the record of a run answered from the answer cache."""
+        return RunRecord(
+            model=model,
+            latency=time.perf_counter() - self.started,
+            answer_cached=True,
+        )
+
+
+_recorder: ContextVar[RunRecorder | None] = ContextVar("recorder", default=None)
+_tool_call: ContextVar[ToolCall | None] = ContextVar("tool_call", default=None)
+
+
+@contextmanager
+def recording() -> Iterator[RunRecorder]:
+    """Record tool calls and cache activity for runs in this context."""
+    recorder = RunRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+def record_cache_lookup() -> None:
+    """Note a tool cache lookup in the current run, if recording."""
+    if recorder := _recorder.get():
+        recorder.cache_lookups += 1
+
+
+def record_cache_miss() -> None:
+    """Note a tool cache miss in the current run, if recording.
+
+    Call from the body of a cached function, which only runs on misses.
+    """
+    if recorder := _recorder.get():
+        recorder.cache_misses += 1
+
+
+def record_route(route: str) -> None:
+    """Note a model routing decision in the current run, if recording."""
+    if recorder := _recorder.get():
+        recorder.routes.append(route)
+
+
+def record_prefetch(hits: int, wasted: int) -> None:
+    """Note speculative prefetch outcomes in the current run, if recording."""
+    if recorder := _recorder.get():
+        recorder.prefetch_hits += hits
+        recorder.prefetch_wasted += wasted
+
+
+def record_tool_queue(seconds: float) -> None:
+    """Note the queue time of the current tool call, if recording."""
+    if call := _tool_call.get():
+        call.queued = seconds
+
+
+class RecordingToolset(WrapperToolset[Any]):
+    """Toolset recording the duration of every tool call."""
+
+    async def call_tool(
+        self,
+        name: str,
+        tool_args: dict[str, Any],
+        ctx: RunContext[Any],
+        tool: ToolsetTool[Any],
+    ) -> Any:
+        recorder = _recorder.get()
+        if recorder is None:
+            return await super().call_tool(name, tool_args, ctx, tool)
+
+        call = ToolCall(name=name, duration=0.0)
+        token = _tool_call.set(call)
+        start = time.perf_counter()
+        try:
+            return await super().call_tool(name, tool_args, ctx, tool)
+        finally:
+            call.duration = time.perf_counter() - start
+            _tool_call.reset(token)
+            recorder.tool_calls.append(call)
+
+
+def recorded(toolset: AbstractToolset[Any]) -> RecordingToolset:
+    """Wrap a toolset so its tool calls are recorded."""
+    return RecordingToolset(toolset)
+
+
+class Ledger:
+    """Append-only JSON Lines file of run records."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def append(self, record: RunRecord) -> None:
+        """Append a record to the ledger."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = record.model_dump_json() + "\n"
+        # Single write in append mode, so concurrent writers don't interleave
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+    def read(self, since: datetime | None = None) -> Iterator[RunRecord]:
+        """Read records, oldest first, skipping malformed lines.
+
+        Args:
+            since: Only records at or after this time
+        """
+        if not self.path.exists():
+            return
+        with self.path.open(encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                try:
+                    record = RunRecord.model_validate_json(line)
+                except ValidationError:
+                    logger.warning("Skipping malformed ledger line %d", n)
+                    continue
+                if since is None or record.timestamp >= since:
+                    yield record
+
+
+@dataclass
+class StatsRow:
+    """Aggregated usage for one group."""
+
+    key: str
+    runs: int = 0
+    input_tokens: int = 0
+    cache_read_tokens: int = 0
+    output_tokens: int = 0
+    cache_hits: int = 0
+    cached_answers: int = 0
+    prefetch_hits: int = 0
+    prefetch_wasted: int = 0
+    latencies: list[float] = field(default_factory=list)
+    queue_times: list[float] = field(default_factory=list)
+
+    @property
+    def prompt_cache_ratio(self) -> float:
+        """Fraction of input tokens served from the prompt cache."""
+        return self.cache_read_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    @property
+    def prefetch_hit_rate(self) -> float:
+        """Fraction of speculative upstream requests a tool used."""
+        requests = self.prefetch_hits + self.prefetch_wasted
+        return self.prefetch_hits / requests if requests else 0.0
+
+    @property
+    def p50(self) -> float:
+        """Median latency in seconds."""
+        return percentile(self.latencies, 50)
+
+    @property
+    def p95(self) -> float:
+        """95th percentile latency in seconds."""
+        return percentile(self.latencies, 95)
+
+    @property
+    def queue_p95(self) -> float:
+        """95th percentile tool queue time in seconds."""
+        return percentile(self.queue_times, 95)
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Percentile of `values` (0 if empty)."""
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[round(p) - 1]
+
+
+def summarize(records: Iterable[RunRecord], by: GroupBy = "day") -> list[StatsRow]:
+    """Aggregate run records.
+
+    Grouping by day or model aggregates whole runs. Grouping by tool
+    aggregates tool calls, so latencies are tool durations and `runs` counts
+    calls; tokens are those of the runs in which the tool was called, and
+    queue times are collected.
+    Grouping by route aggregates runs by their routing decisions (e.g.
+    `gpt-5-mini:hedged`); runs without routing are left out.
+
+    Args:
+        records: Run records
+        by: Grouping key
+
+    Returns:
+        One row per group, sorted by key
+    """
+    rows: dict[str, StatsRow] = defaultdict(lambda: StatsRow(key=""))
+
+    for record in records:
+        latencies: dict[str, list[float]] = defaultdict(list)
+        if by == "tool":
+            for call in record.tool_calls:
+                latencies[call.name].append(call.duration)
+                rows[call.name].queue_times.append(call.queued)
+        elif by == "route":
+            for route in dict.fromkeys(record.routes):
+                latencies[route].append(record.latency)
+        elif by == "model":
+            latencies[record.model].append(record.latency)
+        else:
+            latencies[record.timestamp.date().isoformat()].append(record.latency)
+
+        for key, values in latencies.items():
+            row = rows[key]
+            row.key = key
+            row.runs += len(values)
+            row.input_tokens += record.input_tokens
+            row.cache_read_tokens += record.cache_read_tokens
+            row.output_tokens += record.output_tokens
+            row.cache_hits += record.cache_hits
+            row.cached_answers += record.answer_cached
+            row.prefetch_hits += record.prefetch_hits
+            row.prefetch_wasted += record.prefetch_wasted
+            row.latencies.extend(values)
+
+    return sorted(rows.values(), key=lambda row: row.key)
@@ -0,0 +1,456 @@
+"""In-process metrics with Prometheus text exposition.
+
+Ledger records describe single runs; long-running embedders also need
+continuous metrics. This module has a small registry of counters, gauges
+and histograms, updated by tools, the HTTP client and model wrappers, and
+of collectors that read existing statistics (e.g. cache hit counts) only
+when metrics are exposed.
+
+Updating a metric is a dict lookup and a locked addition, cheap enough to
+leave on (see `benchmarks/bench_metrics.py`). Hot paths bind label values
+once with `labels()` and keep the child.
+
+Example:
+    >>> print(metrics.expose())  # Prometheus text format
+    >>> server = await metrics.serve(port=9464)  # GET /metrics
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field
+from typing import Any, Generic, Literal, Protocol, TypeVar
+
+logger = logging.getLogger(__name__)
+
+MetricType = Literal["counter", "gauge", "histogram"]
+
+# Seconds; from cached tool calls to slow model answers
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_PATH = "/metrics"
+# Seconds a scrape may take to send its request line and headers
+READ_TIMEOUT = 5.0
+
+
+@dataclass
+class Family:
+    """A metric and its samples, as exposed."""
+
+    name: str
+    type: MetricType
+    help: str
+    samples: list[tuple[str, dict[str, str], float]] = field(default_factory=list)
+    """Sample name suffix (e.g. "_bucket"), labels and value."""
+
+
+class _Child:
+    """Value of a metric for one combination of label values."""
+
+    __slots__ = ("_lock", "value")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+
+class CounterChild(_Child):
+    __slots__ = ()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Add `amount` (non-negative)."""
+        with self._lock:
+            self.value += amount
+
+
+class GaugeChild(_Child):
+    __slots__ = ()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Count the block as in flight while it runs."""
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class HistogramChild(_Child):
+    __slots__ = ("bounds", "counts", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        super().__init__()
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        """Observations per bucket, not cumulative; the last one is +Inf."""
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Record an observation, e.g. a duration in seconds."""
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.value += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of the block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+C = TypeVar("C", bound=_Child)
+M = TypeVar("M", bound="_Metric[Any]")
+
+
+class _Metric(ABC, Generic[C]):
+    type: MetricType
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], C] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> C:
+        """Child for the given label values, in `labelnames` order."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def clear(self) -> None:
+        """Forget all children."""
+        with self._lock:
+            self._children.clear()
+
+    @abstractmethod
+    def _child(self) -> C: ...
+
+    def collect(self) -> Family:
+        family = Family(self.name, self.type, self.help)
+        for values, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, values, strict=True))
+            self._samples(family, labels, child)
+        return family
+
+    def _samples(self, family: Family, labels: dict[str, str], child: C) -> None:
+        family.samples.append(("", labels, child.value))
+
+
+class Counter(_Metric[CounterChild]):
+    """Monotonically increasing count, e.g. requests or errors."""
+
+    type = "counter"
+
+    def _child(self) -> CounterChild:
+        return CounterChild()
+
+
+class Gauge(_Metric[GaugeChild]):
+    """Value that goes up and down, e.g. requests in flight."""
+
+    type = "gauge"
+
+    def _child(self) -> GaugeChild:
+        return GaugeChild()
+
+
+class Histogram(_Metric[HistogramChild]):
+    """Distribution of observations in cumulative buckets, e.g. latencies."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def _samples(
+        self, family: Family, labels: dict[str, str], child: HistogramChild
+    ) -> None:
+        with child._lock:
+            counts, total, count = list(child.counts), child.value, child.count
+        cumulative = 0
+        for bound, n in zip((*self.buckets, math.inf), counts, strict=True):
+            cumulative += n
+            family.samples.append(
+                ("_bucket", {**labels, "le": _format(bound)}, cumulative)
+            )
+        family.samples.append(("_sum", labels, total))
+        family.samples.append(("_count", labels, count))
+
+
+class CacheInfo(Protocol):
+    """Cache statistics, like those of `functools.lru_cache`."""
+
+    @property
+    def hits(self) -> int: ...
+    @property
+    def misses(self) -> int: ...
+    @property
+    def currsize(self) -> int: ...
+
+
+class Registry:
+    """Metrics and collectors exposed together."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric[Any]] = {}
+        self._collectors: list[Callable[[], Iterable[Family]]] = []
+        self._caches: dict[str, Callable[[], CacheInfo]] = {}
+
+    def counter(
+        self, name: str, help: str, labelnames: tuple[str, ...] = ()
+    ) -> Counter:
+        """Register a counter. Names of counters should end in `_total`."""
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        """Register a gauge."""
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Register a histogram."""
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, collect: Callable[[], Iterable[Family]]) -> None:
+        """Register a function producing families each time metrics are exposed."""
+        self._collectors.append(collect)
+
+    def cache(self, name: str, info: Callable[[], CacheInfo]) -> None:
+        """Expose hits, misses and size of a cache.
+
+        Args:
+            name: Cache label, e.g. "geocode"
+            info: Statistics, e.g. the `cache_info` method of an
+                `alru_cache` function or a `TTLCache`
+        """
+        self._caches[name] = info
+
+    def collect(self) -> list[Family]:
+        """All families, metrics first."""
+        families = [metric.collect() for metric in self._metrics.values()]
+        if self._caches:
+            families += self._collect_caches()
+        for collect in self._collectors:
+            try:
+                families.extend(collect())
+            except Exception:
+                logger.exception("Metrics collector %r failed", collect)
+        return families
+
+    def expose(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {_escape_help(family.help)}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            for suffix, labels, value in family.samples:
+                lines.append(
+                    f"{family.name}{suffix}{_format_labels(labels)} {_format(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def _collect_caches(self) -> list[Family]:
+        hits = Family("nestor_cache_hits_total", "counter", "Cache lookups served.")
+        misses = Family(
+            "nestor_cache_misses_total", "counter", "Cache lookups not served."
+        )
+        entries = Family("nestor_cache_entries", "gauge", "Entries in cache.")
+        for name, info in self._caches.items():
+            stats = info()
+            labels = {"cache": name}
+            hits.samples.append(("", labels, stats.hits))
+            misses.samples.append(("", labels, stats.misses))
+            entries.samples.append(("", labels, stats.currsize))
+        return [hits, misses, entries]
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = (f'{name}="{_escape_label(value)}"' for name, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", r"\\").replace("\n", r"\n")
+
+
+registry = Registry()
+"""Process-wide registry used by Néstor."""
+
+
+def expose() -> str:
+    """Néstor's metrics in the Prometheus text exposition format."""
+    return registry.expose()
+
+
+async def serve(
+    host: str = "127.0.0.1", port: int = 9464, registry: Registry = registry
+) -> asyncio.Server:
+    """Serve metrics over HTTP at `/metrics`, for Prometheus to scrape.
+
+    A minimal HTTP/1.0 responder on the running event loop, so no web
+    framework is needed. Close the returned server to stop.
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on (0 for any free port)
+        registry: Registry to expose
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            # Idle clients would otherwise hold the handler open forever
+            async with asyncio.timeout(READ_TIMEOUT):
+                request = await reader.readline()
+                while (await reader.readline()).strip():  # Skip headers
+                    pass
+            method, path, *_ = request.decode("latin-1").split() or ["", ""]
+            if method == "GET" and path.split("?")[0] == METRICS_PATH:
+                status, body = "200 OK", registry.expose().encode()
+            else:
+                status, body = "404 Not Found", b"Not found\n"
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: {CONTENT_TYPE}\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (ConnectionError, TimeoutError, ValueError) as e:
+            logger.debug("Metrics request failed: %r", e)
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info("Serving metrics on http://%s:%d%s", host, port, METRICS_PATH)
+    return server
+
+
+# Néstor's metrics
+
+tool_seconds = registry.histogram(
+    "nestor_tool_duration_seconds",
+    "Tool call duration, queue time included.",
+    ("tool",),
+)
+tool_queue_seconds = registry.histogram(
+    "nestor_tool_queue_seconds",
+    "Time tool calls waited for a slot or worker.",
+    ("tool",),
+)
+tool_errors = registry.counter(
+    "nestor_tool_errors_total", "Tool calls that raised.", ("tool",)
+)
+tools_in_flight = registry.gauge(
+    "nestor_tool_calls_in_flight", "Tool calls running.", ("tool",)
+)
+
+upstream_seconds = registry.histogram(
+    "nestor_upstream_request_duration_seconds",
+    "Upstream request duration, until response headers.",
+    ("host",),
+)
+upstream_requests = registry.counter(
+    "nestor_upstream_requests_total",
+    "Upstream requests by outcome: HTTP status class (2xx...), ok or error.",
+    ("host", "outcome"),
+)
+upstream_in_flight = registry.gauge(
+    "nestor_upstream_requests_in_flight", "Upstream requests pending.", ("host",)
+)
+
+model_seconds = registry.histogram(
+    "nestor_model_request_duration_seconds",
+    "Model request duration, scheduler queue excluded.",
+    ("model",),
+)
+model_requests = registry.counter(
+    "nestor_model_requests_total",
+    "Model requests by outcome: ok, or the error type.",
+    ("model", "outcome"),
+)
+model_tokens = registry.counter(
+    "nestor_model_tokens_total",
+    "Model tokens by kind: input, cached (input read from cache) or output.",
+    ("model", "kind"),
+)
+models_in_flight = registry.gauge(
+    "nestor_model_requests_in_flight", "Model requests pending.", ("model",)
+)
+scheduler_queue_seconds = registry.histogram(
+    "nestor_scheduler_queue_seconds", "Time model requests waited for admission."
+)
+scheduler_rate_limited = registry.counter(
+    "nestor_scheduler_rate_limited_total", "Model responses rate limited (429)."
+)
+
+prefetches = registry.counter(
+    "nestor_prefetch_requests_total",
+    "Speculative upstream requests by outcome: hit (used by a tool) or wasted.",
+    ("outcome",),
+)
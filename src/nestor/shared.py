@@ -0,0 +1,230 @@
+"""State shared by processes through a SQLite file.
+
+Batch workers run in separate processes, so in-memory tool caches and rate
+limits are per process. A `SharedStore` adds a second, on-disk cache tier
+that tools consult on a memory miss, and token buckets whose level lives in
+the file, so a rate limit holds across all workers. SQLite in WAL mode
+handles concurrent readers and serializes writers.
+
+Tools use the module-level `store`, set with `open_store` (batch workers do
+this on start-up); without it, `shared_get` and `shared_set` do nothing.
+"""
+
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from .agents.scheduler import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for another process's write lock
+BUSY_TIMEOUT = 30.0
+# Same for bucket updates, which run on the event loop (see `SharedTokenBucket`)
+BUCKET_BUSY_TIMEOUT = 0.05
+# Expired entries are purged every this many writes
+PURGE_EVERY = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    level REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+class SharedStore:
+    """Tool cache and rate limit state in a SQLite file.
+
+    Values are pickled, so only open stores you trust. Expiry uses wall
+    clock time, which all processes share.
+
+    Args:
+        path: Database file, created if missing
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._writes = 0
+        # Own connection, so bucket updates never queue behind cache writes
+        self._buckets = sqlite3.connect(
+            path,
+            timeout=BUCKET_BUSY_TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._buckets.execute("PRAGMA synchronous=NORMAL")
+        self._buckets_lock = threading.Lock()
+        self.purge()
+
+    def get(self, namespace: str, key: object) -> Any | None:
+        """Cached value, or None if missing or expired."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires > ?",
+                (f"{namespace}:{key!r}", time.time()),
+            ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def set(self, namespace: str, key: object, value: Any, ttl: float) -> None:
+        """Cache `value` for `ttl` seconds."""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                (f"{namespace}:{key!r}", blob, time.time() + ttl),
+            )
+            self._writes += 1
+            purge = self._writes % PURGE_EVERY == 0
+        if purge:
+            self.purge()
+
+    def purge(self) -> int:
+        """Delete expired entries. Returns how many were deleted."""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM cache WHERE expires <= ?", (time.time(),)
+            )
+        return cursor.rowcount
+
+    def bucket(
+        self, name: str, per_minute: float, capacity: float | None = None
+    ) -> "SharedTokenBucket":
+        """Token bucket shared by every process using this store."""
+        return SharedTokenBucket(self, name, per_minute, capacity)
+
+    def _read_bucket(self, name: str) -> tuple[float, float] | None:
+        """Level and update time of a bucket, without refill."""
+        with self._buckets_lock:
+            return self._buckets.execute(
+                "SELECT level, updated FROM buckets WHERE name = ?", (name,)
+            ).fetchone()
+
+    def _update_bucket(
+        self, name: str, rate: float, capacity: float, amount: float
+    ) -> None:
+        """Refill a bucket and take `amount`, in one atomic statement.
+
+        Raises:
+            sqlite3.OperationalError: If another process holds the write
+                lock for longer than `BUCKET_BUSY_TIMEOUT`
+        """
+        with self._buckets_lock:
+            self._buckets.execute(
+                """
+                INSERT INTO buckets VALUES (:name, :capacity - :amount, :now)
+                ON CONFLICT (name) DO UPDATE SET
+                    level = min(:capacity, level + max(0.0, :now - updated) * :rate)
+                        - :amount,
+                    updated = max(updated, :now)
+                """,
+                {
+                    "name": name,
+                    "rate": rate,
+                    "capacity": capacity,
+                    "amount": amount,
+                    "now": time.time(),
+                },
+            )
+
+    def close(self) -> None:
+        """Close the database connections."""
+        self._db.close()
+        self._buckets.close()
+
+
+class SharedTokenBucket(TokenBucket):
+    """Token bucket whose level is kept in a `SharedStore`.
+
+    Checking and consuming are separate statements, so processes may
+    briefly overshoot together; the bucket then goes into debt, which
+    everyone pays back before further admissions.
+
+    Both run on the event loop. Checks are plain reads, which WAL never
+    blocks, refilled in Python. Updates wait at most `BUCKET_BUSY_TIMEOUT`
+    for the write lock; past that, the amount is kept here and written with
+    the next update.
+    """
+
+    def __init__(
+        self,
+        store: SharedStore,
+        name: str,
+        per_minute: float,
+        capacity: float | None = None,
+    ):
+        super().__init__(per_minute, capacity)
+        self.store = store
+        self.name = name
+        self._unwritten = 0.0
+        """Amount consumed while the store was locked."""
+
+    @property
+    def level(self) -> float:
+        row = self.store._read_bucket(self.name)
+        level = self.capacity
+        if row is not None:
+            refill = max(0.0, time.time() - row[1]) * self.rate
+            level = min(self.capacity, row[0] + refill)
+        return level - self._unwritten
+
+    def consume(self, amount: float) -> None:
+        amount += self._unwritten
+        try:
+            self.store._update_bucket(self.name, self.rate, self.capacity, amount)
+        except sqlite3.OperationalError as e:
+            logger.debug("Deferred update of bucket %s: %r", self.name, e)
+            self._unwritten = amount
+        else:
+            self._unwritten = 0.0
+
+
+store: SharedStore | None = None
+"""Store consulted by tools, if any."""
+
+
+def open_store(path: Path) -> SharedStore:
+    """Open a store and make tools use it."""
+    global store
+    store = SharedStore(path)
+    logger.info("Using shared store %s", path)
+    return store
+
+
+def shared_get(namespace: str, key: object) -> Any | None:
+    """Value from the shared store, if one is open and has it."""
+    if store is None:
+        return None
+    try:
+        return store.get(namespace, key)
+    except (sqlite3.Error, pickle.UnpicklingError) as e:
+        logger.warning("Shared cache read failed for %s: %r", namespace, e)
+        return None
+
+
+def shared_set(namespace: str, key: object, value: Any, ttl: float) -> None:
+    """Put a value in the shared store, if one is open. Never fails the call."""
+    if store is None:
+        return
+    try:
+        store.set(namespace, key, value, ttl)
+    except sqlite3.Error as e:
+        logger.warning("Shared cache write failed for %s: %r", namespace, e)
@@ -0,0 +1,283 @@
+"""Speculative weather prefetch from the user prompt.
+
+A weather answer is a strictly sequential chain: model request, tool call,
+geocoding, forecast, then a second model request. A `Speculation` guesses
+from the prompt, with cheap local pattern matching, which locations and
+forecasts the tools will ask for, and fetches them while the first model
+request is in flight. The tool calls then find their data cached, or join
+the request already under way.
+
+Guesses can be wrong. Prefetches still running when the run ends are
+cancelled (unless a tool is waiting for them), and the upstream requests
+made are compared with the tool calls of the run: used ones are hits,
+others are waste. Both are recorded in the ledger.
+
+Example:
+    >>> async with Speculation(prompt, deps.default_location) as speculation:
+    ...     result = await agent.run(prompt, deps=deps)
+    ...     report = await speculation.settle(result.new_messages())
+"""
+
+import asyncio
+import logging
+import re
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any, Self
+
+from pydantic_ai.messages import ModelMessage, ModelResponse, ToolCallPart
+
+from . import metrics
+from .agents.selection import WEATHER_PATTERN
+from .ledger import record_prefetch, recording
+from .tools.weather import GeoLocation, fetch_daily, fetch_hourly, geocode
+
+logger = logging.getLogger(__name__)
+
+# Locations prefetched for a single prompt
+MAX_LOCATIONS = 3
+
+# Questions the hourly forecast answers better than the daily summary
+_HOURLY_RE = re.compile(
+    r"\b(hour\w*|tonight|this (morning|afternoon|evening)|at \d{1,2}|"
+    r"\d{1,2}\s*(am|pm)|laundry|run|running|walk|hike|hiking)\b",
+    re.IGNORECASE,
+)
+_TOMORROW_RE = re.compile(r"\btomorrow\b", re.IGNORECASE)
+
+# Capitalized names, possibly joined by lowercase particles ("Alcalá de
+# Henares"), after a preposition; several may be listed ("Madrid and Ávila")
+_NAME = r"[A-ZÁÉÍÓÚÑÜÀÈÌÒÙÇ][\w'-]*"
+_PLACE = rf"{_NAME}(?:\s+(?:(?:de|del|de la|la|el|of)\s+)?{_NAME})*"
+_PLACES_RE = re.compile(
+    rf"\b(?:in|at|for|near|around)\s+({_PLACE}(?:\s*(?:,|\band\b|\bor\b)\s*{_PLACE})*)"
+)
+_LIST_SEPARATOR_RE = re.compile(r"\s*(?:,|\band\b|\bor\b)\s*")
+# Capitalized words that follow prepositions but aren't places
+_NOT_PLACES = {
+    "I",
+    "Celsius",
+    "Fahrenheit",
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+}
+
+FetchKey = tuple[Hashable, ...]
+"""Kind of fetch ("geocode", "daily" or "hourly") and its arguments."""
+
+
+@dataclass(frozen=True)
+class Guess:
+    """Weather data a prompt will probably need."""
+
+    locations: tuple[str, ...]
+    """Location queries, as the tools would receive them."""
+
+    hourly_dates: tuple[str, ...] = ()
+    """ISO dates of hourly forecasts to fetch. Daily forecasts if empty."""
+
+
+def places(prompt: str) -> list[str]:
+    """Place names mentioned in a prompt, in order of appearance."""
+    found: list[str] = []
+    for match in _PLACES_RE.finditer(prompt):
+        for name in _LIST_SEPARATOR_RE.split(match.group(1)):
+            if name and name not in _NOT_PLACES and name not in found:
+                found.append(name)
+    return found
+
+
+def guess(prompt: str, default_location: str) -> Guess | None:
+    """Guess the weather data a prompt needs.
+
+    Args:
+        prompt: User prompt
+        default_location: Location the tools use when none is given
+
+    Returns:
+        The guess, or None if the prompt isn't about the weather
+    """
+    if not WEATHER_PATTERN.search(prompt):
+        return None
+    locations = tuple(places(prompt)[:MAX_LOCATIONS]) or (default_location,)
+    if not _HOURLY_RE.search(prompt):
+        return Guess(locations)
+    # Same default date as `get_hourly_forecast`, so keys match
+    date = datetime.now(UTC).date()
+    if _TOMORROW_RE.search(prompt):
+        date += timedelta(days=1)
+    return Guess(locations, hourly_dates=(date.isoformat(),))
+
+
+@dataclass
+class SpeculationReport:
+    """How speculative prefetches of a run turned out."""
+
+    hits: int = 0
+    """Upstream requests whose data a tool used."""
+
+    wasted: int = 0
+    """Upstream requests no tool used, cancelled ones included."""
+
+    @property
+    def requests(self) -> int:
+        """Upstream requests made by speculation."""
+        return self.hits + self.wasted
+
+
+class Speculation:
+    """Prefetches the weather data a prompt will probably need.
+
+    Prefetching starts on entering the context and is cancelled on exit.
+    Requests already cached cost nothing and aren't reported.
+
+    Args:
+        prompt: User prompt
+        default_location: Location the tools use when none is given
+    """
+
+    def __init__(self, prompt: str, default_location: str):
+        self.default_location = default_location
+        self.guess = guess(prompt, default_location)
+        self._tasks: list[asyncio.Task[None]] = []
+        self._upstream: dict[FetchKey, bool] = {}
+        """Whether each prefetch went upstream."""
+        self._resolved: dict[str, GeoLocation] = {}
+
+    def start(self) -> None:
+        """Start prefetching in the background. Requires a running event loop."""
+        if self.guess is None or self._tasks:
+            return
+        logger.debug("Speculating on %s", self.guess)
+        self._tasks = [
+            asyncio.create_task(self._prefetch(location), name="nestor-speculation")
+            for location in self.guess.locations
+        ]
+
+    async def cancel(self) -> None:
+        """Cancel prefetches still running. Tools waiting for them keep them."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def settle(self, messages: list[ModelMessage]) -> SpeculationReport:
+        """Stop prefetching and compare it with the tool calls of the run.
+
+        Records the outcome in the current run, if recording.
+
+        Args:
+            messages: Messages of the run, e.g. `result.new_messages()`
+
+        Returns:
+            Hits and waste of the upstream requests made
+        """
+        await self.cancel()
+        upstream = {key for key, went in self._upstream.items() if went}
+        used = await self._used(messages) if upstream else set()
+        report = SpeculationReport(
+            hits=len(upstream & used), wasted=len(upstream - used)
+        )
+        if report.requests:
+            logger.info(
+                "Speculation: %d of %d prefetch(es) used",
+                report.hits,
+                report.requests,
+            )
+        record_prefetch(report.hits, report.wasted)
+        metrics.prefetches.labels("hit").inc(report.hits)
+        metrics.prefetches.labels("wasted").inc(report.wasted)
+        return report
+
+    async def _prefetch(self, location: str) -> None:
+        assert self.guess is not None
+        geo = await self._fetch(("geocode", location), geocode, location)
+        if geo is None:
+            return
+        self._resolved[location] = geo
+        lat, lon = geo.latitude, geo.longitude
+        if not self.guess.hourly_dates:
+            await self._fetch(("daily", lat, lon), fetch_daily, lat, lon)
+            return
+        await asyncio.gather(
+            *(
+                self._fetch(("hourly", lat, lon, date), fetch_hourly, lat, lon, date)
+                for date in self.guess.hourly_dates
+            )
+        )
+
+    async def _fetch(
+        self, key: FetchKey, func: Callable[..., Awaitable[Any]], *args: Any
+    ) -> Any:
+        # Own recorder: prefetches aren't the run's cache lookups, and its
+        # misses tell whether the request went upstream
+        with recording() as recorder:
+            try:
+                return await func(*args)
+            except Exception as e:
+                logger.debug("Prefetch %s failed: %r", key, e)
+                return None
+            finally:
+                self._upstream[key] = recorder.cache_misses > 0
+
+    async def _used(self, messages: list[ModelMessage]) -> set[FetchKey]:
+        """Fetches the weather tool calls of a run needed."""
+        used: set[FetchKey] = set()
+        for call in _tool_calls(messages):
+            if call.tool_name not in ("get_weather", "get_hourly_forecast"):
+                continue
+            args = call.args_as_dict()
+            query = args.get("location") or self.default_location
+            used.add(("geocode", query))
+            geo = self._resolved.get(query) or await self._geocoded(query)
+            if geo is None:
+                continue
+            lat, lon = geo.latitude, geo.longitude
+            if call.tool_name == "get_weather":
+                used.add(("daily", lat, lon))
+            else:
+                date = args.get("date") or datetime.now(UTC).date().isoformat()
+                used.add(("hourly", lat, lon, date))
+        return used
+
+    async def _geocoded(self, query: str) -> GeoLocation | None:
+        # The tool resolved it already, so this is served from cache
+        with recording():
+            try:
+                return await geocode(query)
+            except Exception:
+                return None
+
+    async def __aenter__(self) -> Self:
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.cancel()
+
+
+def _tool_calls(messages: list[ModelMessage]) -> list[ToolCallPart]:
+    return [
+        part
+        for message in messages
+        if isinstance(message, ModelResponse)
+        for part in message.parts
+        if isinstance(part, ToolCallPart)
+    ]
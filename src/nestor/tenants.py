@@ -0,0 +1,162 @@
+"""Multi-tenant dependencies: one shared agent serving many users.
+
+Each user has a sparse `UserProfile` overriding a few settings. Profiles are
+resolved per run into `AssistantDeps` over a shared base. Resolved deps are
+interned, so users with the same effective settings share one instance and
+thousands of users cost about as much memory as their distinct settings.
+
+Example:
+    >>> tenancy = Tenancy(JsonProfileStore(Path("profiles.json")), base=deps)
+    >>> agent = create_assistant_agent(api_key=key)  # Shared by all users
+    >>> await agent.run(prompt, deps=tenancy.deps_for(user_id))
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import logging
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Protocol
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+
+from . import defaults
+from .dependencies import AssistantDeps
+
+if TYPE_CHECKING:
+    from .config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class UserProfile(BaseModel):
+    """Per-user overrides. Unset fields inherit the base deps."""
+
+    model_config = ConfigDict(frozen=True)
+
+    default_location: str | None = None
+    safesearch: defaults.SafeSearchLevel | None = None
+    search_backend: str | None = None
+    search_token_budget: int | None = None
+
+    def apply(self, base: AssistantDeps) -> AssistantDeps:
+        """Deps for this profile over `base`."""
+        overrides = self.model_dump(exclude_none=True)
+        return dataclasses.replace(base, **overrides) if overrides else base
+
+
+class ProfileStore(Protocol):
+    """Source of user profiles."""
+
+    def get(self, user_id: str) -> UserProfile | None:
+        """Profile for `user_id`, or None for users without one."""
+        ...
+
+
+class MemoryProfileStore:
+    """Profiles held in a dict."""
+
+    def __init__(self, profiles: dict[str, UserProfile] | None = None):
+        self.profiles = dict(profiles or {})
+
+    def get(self, user_id: str) -> UserProfile | None:
+        return self.profiles.get(user_id)
+
+    def set(self, user_id: str, profile: UserProfile) -> None:
+        """Add or replace a profile."""
+        self.profiles[user_id] = profile
+
+
+_profiles_adapter = TypeAdapter(dict[str, UserProfile])
+
+
+class JsonProfileStore(MemoryProfileStore):
+    """Profiles loaded from a JSON object mapping user IDs to profiles.
+
+    Example file:
+        {"@ana:matrix.org": {"default_location": "Segovia", "safesearch": "on"}}
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        super().__init__(self._load())
+
+    def reload(self) -> None:
+        """Re-read the file."""
+        self.profiles = self._load()
+
+    def _load(self) -> dict[str, UserProfile]:
+        if not self.path.exists():
+            logger.info("No profiles file at %s", self.path)
+            return {}
+        return _profiles_adapter.validate_python(json.loads(self.path.read_bytes()))
+
+
+class Tenancy:
+    """Resolves per-user `AssistantDeps` from a profile store.
+
+    Args:
+        store: Profile store
+        base: Deps for users without overrides
+        cache_size: Resolved users kept in memory
+    """
+
+    def __init__(
+        self,
+        store: ProfileStore,
+        base: AssistantDeps,
+        *,
+        cache_size: int = 4096,
+    ):
+        self.store = store
+        self.base = base
+        self.cache_size = cache_size
+        self._resolved: OrderedDict[str, AssistantDeps] = OrderedDict()
+        # Equal deps share one instance; unused ones are garbage collected
+        self._interned: weakref.WeakValueDictionary[AssistantDeps, AssistantDeps] = (
+            weakref.WeakValueDictionary()
+        )
+
+    def deps_for(self, user_id: str) -> AssistantDeps:
+        """Deps for a user's run."""
+        deps = self._resolved.get(user_id)
+        if deps is not None:
+            self._resolved.move_to_end(user_id)
+            return deps
+
+        profile = self.store.get(user_id)
+        deps = self._intern(profile.apply(self.base) if profile else self.base)
+
+        self._resolved[user_id] = deps
+        if len(self._resolved) > self.cache_size:
+            self._resolved.popitem(last=False)
+        return deps
+
+    def invalidate(self, user_id: str | None = None) -> None:
+        """Forget resolved deps for a user (or everyone) after profile changes."""
+        if user_id is None:
+            self._resolved.clear()
+        else:
+            self._resolved.pop(user_id, None)
+
+    @property
+    def distinct_deps(self) -> int:
+        """Number of distinct deps instances alive."""
+        return len(self._interned)
+
+    def _intern(self, deps: AssistantDeps) -> AssistantDeps:
+        return self._interned.setdefault(deps, deps)
+
+
+def deps_from_settings(settings: Settings) -> AssistantDeps:
+    """Base deps from application settings."""
+    return AssistantDeps(
+        search_backend=settings.search_backend,
+        safesearch=settings.safesearch,
+        default_location=settings.default_location,
+        search_token_budget=settings.search_token_budget,
+        page_token_budget=settings.page_token_budget,
+    )
@@ -0,0 +1,34 @@
+"""Cheap token estimates.
+
+Néstor doesn't ship a tokenizer. These heuristics are good enough for
+budgeting and rate limiting, where being off by ~10% is fine.
+"""
+
+# Average characters per token for English-ish text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str | bytes) -> int:
+    """Estimate the number of tokens in a text.
+
+    Args:
+        text: Text (or UTF-8 encoded JSON) to estimate
+
+    Returns:
+        Estimated token count, at least 1 for non-empty input
+    """
+    if not text:
+        return 0
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Trim text to about `max_tokens`, at a word boundary.
+
+    Trimmed text ends with an ellipsis.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[: cut if cut > 0 else max_chars].rstrip(" ,;:") + "…"
@@ -1,16 +1,75 @@
 """Date and time information tools."""
 
+import functools
 import logging
 from datetime import UTC, datetime
 from typing import TypeVar
-from zoneinfo import ZoneInfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
 
+from pydantic import BaseModel
 from pydantic_ai import RunContext
 
 logger = logging.getLogger(__name__)
 
 D = TypeVar("D")  # Generic dependency type
 
+# Resolved timezones kept; queries are few, but come from model output
+ZONE_CACHE_SIZE = 512
+
+
+class LocalTime(BaseModel):
+    """Current time in one timezone."""
+
+    query: str
+    """Timezone or city, as requested."""
+
+    timezone: str | None = None
+    """IANA timezone name."""
+
+    time: str | None = None
+    """Local time in ISO 8601 format."""
+
+    utc_offset: str | None = None
+    """Offset from UTC, e.g. '+09:00'."""
+
+    weekday: str | None = None
+    """Local day of the week."""
+
+    day_offset: int | None = None
+    """Local date minus the UTC date: -1, 0, or 1 if it's already tomorrow."""
+
+    error: str | None = None
+    """Why the timezone couldn't be resolved."""
+
+
+@functools.cache
+def _zone_names() -> dict[str, str]:
+    """IANA timezone names by lowercase name and city, e.g. 'new york'."""
+    names: dict[str, str] = {}
+    for key in sorted(available_timezones()):
+        names[key.casefold()] = key
+        names.setdefault(key.rsplit("/", 1)[-1].replace("_", " ").casefold(), key)
+    return names
+
+
+@functools.lru_cache(maxsize=ZONE_CACHE_SIZE)
+def zone(name: str) -> ZoneInfo:
+    """Timezone for an IANA name or a city in one ('Tokyo', 'new york').
+
+    Raises:
+        ZoneInfoNotFoundError: If the name matches no timezone
+    """
+    try:
+        return ZoneInfo(name)
+    except ZoneInfoNotFoundError:
+        pass
+    except ValueError:  # Malformed key, e.g. empty or a relative path
+        pass
+    key = _zone_names().get(" ".join(name.replace("_", " ").split()).casefold())
+    if key is None:
+        raise ZoneInfoNotFoundError(f"Unknown timezone: {name!r}")
+    return ZoneInfo(key)
+
 
 def get_current_time(ctx: RunContext[D], timezone: str = "UTC") -> str:
     """Get current time in the specified timezone.
@@ -23,7 +82,7 @@ def get_current_time(ctx: RunContext[D], timezone: str = "UTC") -> str:
         Current time formatted as ISO 8601 string
     """
     try:
-        tz = ZoneInfo(timezone)
+        tz = zone(timezone)
         now = datetime.now(tz)
         return now.isoformat()
     except Exception:
@@ -31,6 +90,45 @@ def get_current_time(ctx: RunContext[D], timezone: str = "UTC") -> str:
         raise
 
 
+def get_current_times(ctx: RunContext[D], timezones: list[str]) -> list[LocalTime]:
+    """Get the current time in several timezones at once.
+
+    Use a single call for questions about several places, e.g. "what time
+    is it in Tokyo, New York and London?".
+
+    Args:
+        ctx: Agent run context
+        timezones: IANA timezone names (e.g., 'Asia/Tokyo') or the cities
+            they're named after (e.g., 'New York')
+
+    Returns:
+        Local time of each timezone, in order, all from the same instant.
+            Unknown timezones carry an error instead.
+    """
+    now = datetime.now(UTC)
+    return [_local_time(query, now) for query in timezones]
+
+
+def _local_time(query: str, now: datetime) -> LocalTime:
+    try:
+        tz = zone(query)
+    except ZoneInfoNotFoundError:
+        logger.info("Unknown timezone %r", query)
+        return LocalTime(
+            query=query,
+            error="Unknown timezone. Use an IANA name, e.g. 'Europe/Madrid'.",
+        )
+    local = now.astimezone(tz)
+    return LocalTime(
+        query=query,
+        timezone=tz.key,
+        time=local.isoformat(timespec="seconds"),
+        utc_offset=local.strftime("%:z"),
+        weekday=local.strftime("%A"),
+        day_offset=(local.date() - now.date()).days,
+    )
+
+
 def get_current_date(ctx: RunContext[D]) -> str:
     """Get current date in ISO format (YYYY-MM-DD).
 
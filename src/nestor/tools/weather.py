@@ -1,22 +1,81 @@
 """Weather and location tools."""
 
+import asyncio
 import logging
-from datetime import UTC, datetime
+from bisect import bisect_left
+from collections.abc import Collection
+from datetime import UTC, datetime, timedelta
+from typing import Any, Literal, TypeVar
 
-import httpx
 from async_lru import alru_cache
-from pydantic import BaseModel
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    SerializerFunctionWrapHandler,
+    model_serializer,
+)
 from pydantic_ai import RunContext
 
+from .. import http, metrics
+from ..cache import TTLCache
+from ..deadline import within
 from ..dependencies import AssistantDeps
+from ..ledger import record_cache_lookup, record_cache_miss
+from ..shared import shared_get, shared_set
+from ..upstream import OPEN_METEO
 
 logger = logging.getLogger(__name__)
 
+K = TypeVar("K", bound=tuple[Any, ...])
 
 GEOCODING_API = "https://geocoding-api.open-meteo.com/v1/search"
 FORECAST_API = "https://api.open-meteo.com/v1/forecast"
 # Default timeout in seconds for Open-Meteo API calls
 HTTP_TIMEOUT = 30.0
+# Open-Meteo refreshes its forecasts roughly hourly, so cached forecasts are
+# never staler than the upstream data by more than one update cycle
+FORECAST_TTL = 3600.0
+FORECAST_CACHE_SIZE = 256
+# Locations don't move, but the set of queries is unbounded in long-running bots
+GEOCODE_CACHE_SIZE = 1024
+# Seconds geocoding results are kept in the shared store (see `shared`)
+GEOCODE_TTL = 7 * 24 * 3600.0
+MAX_FORECAST_DAYS = 16
+# Coordinates per multi-location forecast request, well within URL limits
+MAX_BATCH_LOCATIONS = 50
+
+WeatherField = Literal["temperature", "precipitation", "wind"]
+"""Aspects of a forecast the weather tools can be narrowed to."""
+
+# Model attributes of each field and their Open-Meteo variables. Weather
+# codes (and daylight) are always requested, so every answer can describe
+# the conditions.
+DAILY_FIELDS: dict[WeatherField, dict[str, str]] = {
+    "temperature": {"temp_min": "temperature_2m_min", "temp_max": "temperature_2m_max"},
+    "precipitation": {
+        "precipitation_sum": "precipitation_sum",
+        "precipitation_hours": "precipitation_hours",
+        "precipitation_probability_max": "precipitation_probability_max",
+    },
+    "wind": {
+        "wind_speed_max": "wind_speed_10m_max",
+        "wind_gusts_max": "wind_gusts_10m_max",
+    },
+}
+HOURLY_FIELDS: dict[WeatherField, dict[str, str]] = {
+    "temperature": {"temp": "temperature_2m"},
+    "precipitation": {
+        "precipitation_probability": "precipitation_probability",
+        "precipitation": "precipitation",
+    },
+    "wind": {"wind_speed": "wind_speed_10m", "wind_gusts": "wind_gusts_10m"},
+}
+DAILY_BASE = ["weather_code"]
+HOURLY_BASE = ["weather_code", "is_day"]
+
+# Fields returned when a forecast request names none
+DAILY_DEFAULT_FIELDS: list[WeatherField] = ["temperature", "precipitation", "wind"]
+HOURLY_DEFAULT_FIELDS: list[WeatherField] = ["temperature", "precipitation"]
 
 # Weather codes: https://open-meteo.com/en/docs#weather_variable_documentation
 WEATHER_CODES = {
@@ -54,6 +113,8 @@ WEATHER_CODES = {
 class GeoLocation(BaseModel):
     """Resolved geographic location."""
 
+    model_config = ConfigDict(frozen=True)
+
     name: str
     country: str
     latitude: float
@@ -66,31 +127,45 @@ class GeoLocation(BaseModel):
         return f"https://www.openstreetmap.org/?mlat={self.latitude}&mlon={self.longitude}&zoom=14"
 
 
-class DailyForecast(BaseModel):
-    """Single day forecast summary."""
+class Projected(BaseModel):
+    """Model whose unset (None) fields are left out when serialized.
+
+    Forecasts narrowed to some fields don't spend prompt tokens on nulls.
+    """
+
+    @model_serializer(mode="wrap")
+    def _drop_unset(self, handler: SerializerFunctionWrapHandler) -> dict[str, Any]:
+        return {k: v for k, v in handler(self).items() if v is not None}
+
+
+class DailyForecast(Projected):
+    """Single day forecast summary.
+
+    Only the fields requested are set (see `WeatherField`).
+    """
 
     date: str
     """ISO date (YYYY-MM-DD)."""
 
-    temp_min: float
+    temp_min: float | None = None
     """Minimum temperature in °C."""
 
-    temp_max: float
+    temp_max: float | None = None
     """Maximum temperature in °C."""
 
-    precipitation_sum: float
+    precipitation_sum: float | None = None
     """Total precipitation in mm (rain + snow)."""
 
-    precipitation_hours: float
+    precipitation_hours: float | None = None
     """Hours with precipitation."""
 
-    precipitation_probability_max: int
+    precipitation_probability_max: int | None = None
     """Maximum precipitation probability (0-100%)."""
 
-    wind_speed_max: float
+    wind_speed_max: float | None = None
     """Maximum wind speed in km/h."""
 
-    wind_gusts_max: float
+    wind_gusts_max: float | None = None
     """Maximum wind gusts in km/h."""
 
     weather_code: int
@@ -108,21 +183,30 @@ class WeatherForecast(BaseModel):
     days: list[DailyForecast]
 
 
-class HourData(BaseModel):
-    """Single hour conditions."""
+class HourData(Projected):
+    """Single hour conditions.
+
+    Only the fields requested are set (see `WeatherField`).
+    """
 
     time: str
     """Hour in HH:MM format (local time)."""
 
-    temp: float
+    temp: float | None = None
     """Temperature in °C."""
 
-    precipitation_probability: int
+    precipitation_probability: int | None = None
     """Probability of precipitation (0-100%)."""
 
-    precipitation: float
+    precipitation: float | None = None
     """Precipitation amount in mm."""
 
+    wind_speed: float | None = None
+    """Wind speed in km/h."""
+
+    wind_gusts: float | None = None
+    """Wind gusts in km/h."""
+
     weather_code: int
     """WMO weather code."""
 
@@ -146,7 +230,7 @@ class HourlyForecast(BaseModel):
     """24 hours of weather data."""
 
 
-@alru_cache
+@alru_cache(maxsize=GEOCODE_CACHE_SIZE)
 async def geocode(query: str) -> GeoLocation | None:
     """Resolve a location name to coordinates.
 
@@ -165,9 +249,15 @@ async def geocode(query: str) -> GeoLocation | None:
     Returns:
         GeoLocation with coordinates and elevation, or None if not found
     """
-    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
-        r = await client.get(GEOCODING_API, params={"name": query, "count": 1})
-        data = r.json()
+    if (shared := shared_get("geocode", query)) is not None:
+        return shared
+
+    record_cache_miss()
+    await OPEN_METEO.admit()
+    r = await http.get_client().get(
+        GEOCODING_API, params={"name": query, "count": 1}, timeout=HTTP_TIMEOUT
+    )
+    data = r.json()
 
     if not data.get("results"):
         logger.info("Geocoding failed: no results for %r", query)
@@ -186,13 +276,304 @@ async def geocode(query: str) -> GeoLocation | None:
         "Geocoded %r → %s, %s (%s)", query, result.name, result.country, result.osm_url
     )
 
+    shared_set("geocode", query, result, GEOCODE_TTL)
     return result
 
 
+_BatchKey = tuple[float, float, tuple[str, ...]]
+
+
+class DailyBatcher:
+    """Coalesces daily forecast requests into multi-location requests.
+
+    Open-Meteo accepts comma-separated coordinates and answers with one
+    forecast per location. Requests made in the same event loop iteration,
+    e.g. by `asyncio.gather`, share upstream requests of up to `max_size`
+    locations. A single request is sent as a plain one.
+    """
+
+    def __init__(self, max_size: int = MAX_BATCH_LOCATIONS):
+        self.max_size = max_size
+        self.requests = 0
+        """Upstream requests made."""
+
+        self._pending: dict[_BatchKey, asyncio.Future[dict[str, Any]]] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def fetch(
+        self, latitude: float, longitude: float, variables: tuple[str, ...]
+    ) -> dict[str, Any]:
+        """Fetch the raw daily forecast for coordinates, with others pending."""
+        key = (latitude, longitude, variables)
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if not self._pending:
+                loop.call_soon(self._flush)
+            future = self._pending[key] = loop.create_future()
+        # Shielded, so a cancelled caller doesn't fail others waiting
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        # Locations of a request share its variables
+        by_variables: dict[tuple[str, ...], list[_BatchKey]] = {}
+        for key in self._pending:
+            by_variables.setdefault(key[2], []).append(key)
+        pending, self._pending = self._pending, {}
+        for variables, keys in by_variables.items():
+            for i in range(0, len(keys), self.max_size):
+                batch = {key: pending[key] for key in keys[i : i + self.max_size]}
+                task = asyncio.create_task(self._request(variables, batch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _request(
+        self,
+        variables: tuple[str, ...],
+        batch: dict[_BatchKey, asyncio.Future[dict[str, Any]]],
+    ) -> None:
+        params: dict[str, str | int | float] = {
+            "latitude": ",".join(str(lat) for lat, _, _ in batch),
+            "longitude": ",".join(str(lon) for _, lon, _ in batch),
+            "daily": ",".join(variables),
+            "timezone": "auto",
+            "forecast_days": MAX_FORECAST_DAYS,
+        }
+        self.requests += 1
+        try:
+            await OPEN_METEO.admit()
+            r = await http.get_client().get(
+                FORECAST_API, params=params, timeout=HTTP_TIMEOUT
+            )
+            r.raise_for_status()  # Never cache error payloads
+            data = r.json()
+            # A single location is answered with an object, several with a list
+            forecasts = data if isinstance(data, list) else [data]
+            if len(forecasts) != len(batch):
+                raise ValueError(
+                    f"Expected {len(batch)} forecasts, got {len(forecasts)}"
+                )
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        if len(batch) > 1:
+            logger.info("Fetched daily forecasts for %d locations at once", len(batch))
+        for future, forecast in zip(batch.values(), forecasts):
+            if not future.done():
+                future.set_result(forecast)
+
+
+daily_batcher = DailyBatcher()
+
+
+daily_variables_seen: TTLCache[tuple[float, float], frozenset[str]] = TTLCache(
+    FORECAST_CACHE_SIZE, FORECAST_TTL
+)
+"""Widest daily variable set requested per location, while it's cached."""
+
+hourly_variables_seen: TTLCache[tuple[float, float, str], frozenset[str]] = TTLCache(
+    FORECAST_CACHE_SIZE, FORECAST_TTL
+)
+"""Widest hourly variable set requested per location and day."""
+
+
+def daily_variables(fields: Collection[WeatherField] | None = None) -> list[str]:
+    """Open-Meteo daily variables of forecast fields (all by default)."""
+    return _variables(DAILY_FIELDS, DAILY_BASE, fields or DAILY_DEFAULT_FIELDS)
+
+
+def hourly_variables(fields: Collection[WeatherField] | None = None) -> list[str]:
+    """Open-Meteo hourly variables of forecast fields (temperature and
+    precipitation by default)."""
+    return _variables(HOURLY_FIELDS, HOURLY_BASE, fields or HOURLY_DEFAULT_FIELDS)
+
+
+def _variables(
+    presets: dict[WeatherField, dict[str, str]],
+    base: list[str],
+    fields: Collection[WeatherField],
+) -> list[str]:
+    return [v for field in fields for v in presets[field].values()] + base
+
+
+def _projected(
+    series: dict[str, Any],
+    i: int,
+    presets: dict[WeatherField, dict[str, str]],
+    fields: Collection[WeatherField],
+) -> dict[str, Any]:
+    """Model attributes of the fields requested, from the i-th values."""
+    return {
+        attribute: series[variable][i]
+        for field in fields
+        for attribute, variable in presets[field].items()
+    }
+
+
+def _widest(
+    seen: TTLCache[K, frozenset[str]], key: K, variables: Collection[str]
+) -> tuple[str, ...]:
+    """Variables to request: a cached wider set, or the union with it.
+
+    A narrower projection is served by the wider response already cached,
+    and a wider one replaces it, so each location has one live entry.
+    """
+    widest = seen.get(key) or frozenset()
+    if not widest.issuperset(variables):
+        widest = widest.union(variables)
+        # Noted before fetching, so concurrent requests join this one
+        seen.set(key, widest)
+    return tuple(sorted(widest))
+
+
+def _renew(
+    seen: TTLCache[K, frozenset[str]], key: K, variables: tuple[str, ...]
+) -> None:
+    """Keep the widest set as long as its response, once (re)cached."""
+    widest = seen.get(key)
+    if widest is None or widest.issubset(variables):
+        seen.set(key, frozenset(variables))
+
+
+async def fetch_daily(
+    latitude: float,
+    longitude: float,
+    variables: Collection[str] | None = None,
+    *,
+    refresh: bool = False,
+) -> dict[str, Any]:
+    """Fetch the raw daily forecast for coordinates.
+
+    The response may include more variables than requested, when a wider
+    one is cached.
+
+    Args:
+        latitude: Location latitude
+        longitude: Location longitude
+        variables: Open-Meteo daily variables (see `daily_variables`).
+            Defaults to all of them.
+        refresh: Replace the cached response instead of reusing it
+
+    Returns:
+        Open-Meteo forecast response
+    """
+    key = (latitude, longitude)
+    resolved = _widest(daily_variables_seen, key, variables or daily_variables())
+    if refresh:
+        request_daily.cache_invalidate(latitude, longitude, resolved)
+    return await request_daily(latitude, longitude, resolved)
+
+
+async def fetch_hourly(
+    latitude: float,
+    longitude: float,
+    date: str,
+    variables: Collection[str] | None = None,
+    *,
+    refresh: bool = False,
+) -> dict[str, Any]:
+    """Fetch the raw hourly forecast for coordinates on a given day.
+
+    The response may include more variables than requested, when a wider
+    one is cached.
+
+    Args:
+        latitude: Location latitude
+        longitude: Location longitude
+        date: ISO date (YYYY-MM-DD)
+        variables: Open-Meteo hourly variables (see `hourly_variables`).
+            Defaults to temperature and precipitation.
+        refresh: Replace the cached response instead of reusing it
+
+    Returns:
+        Open-Meteo forecast response
+    """
+    key = (latitude, longitude, date)
+    resolved = _widest(hourly_variables_seen, key, variables or hourly_variables())
+    if refresh:
+        request_hourly.cache_invalidate(latitude, longitude, date, resolved)
+    return await request_hourly(latitude, longitude, date, resolved)
+
+
+@alru_cache(maxsize=FORECAST_CACHE_SIZE, ttl=FORECAST_TTL)
+async def request_daily(
+    latitude: float, longitude: float, variables: tuple[str, ...]
+) -> dict[str, Any]:
+    """Request a daily forecast with exactly these variables, cached.
+
+    Always requests `MAX_FORECAST_DAYS`, so any shorter range is served from
+    the same cache entry. Concurrent misses share upstream requests (see
+    `DailyBatcher`). Use `fetch_daily`, which reuses wider responses.
+    """
+    key = (latitude, longitude)
+    _renew(daily_variables_seen, key, variables)
+    if (shared := shared_get("daily", key)) is not None and _has(
+        shared["daily"], variables
+    ):
+        return shared
+
+    record_cache_miss()
+    data = await daily_batcher.fetch(latitude, longitude, variables)
+    shared_set("daily", key, data, FORECAST_TTL)
+    return data
+
+
+@alru_cache(maxsize=FORECAST_CACHE_SIZE, ttl=FORECAST_TTL)
+async def request_hourly(
+    latitude: float, longitude: float, date: str, variables: tuple[str, ...]
+) -> dict[str, Any]:
+    """Request an hourly forecast with exactly these variables, cached.
+
+    Use `fetch_hourly`, which reuses wider responses.
+    """
+    params: dict[str, str | float] = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "hourly": ",".join(variables),
+        "timezone": "auto",
+        "start_date": date,
+        "end_date": date,
+    }
+
+    key = (latitude, longitude, date)
+    _renew(hourly_variables_seen, key, variables)
+    if (shared := shared_get("hourly", key)) is not None and _has(
+        shared["hourly"], variables
+    ):
+        return shared
+
+    record_cache_miss()
+    await OPEN_METEO.admit()
+    r = await http.get_client().get(FORECAST_API, params=params, timeout=HTTP_TIMEOUT)
+    r.raise_for_status()
+    data = r.json()
+    shared_set("hourly", key, data, FORECAST_TTL)
+    return data
+
+
+def _has(series: dict[str, Any], variables: Collection[str]) -> bool:
+    """Whether a response from another process has all variables."""
+    return all(v in series for v in variables)
+
+
+metrics.registry.cache("geocode", geocode.cache_info)
+metrics.registry.cache("forecast_daily", request_daily.cache_info)
+metrics.registry.cache("forecast_hourly", request_hourly.cache_info)
+
+
+def _local_today(data: dict[str, Any]) -> str:
+    """Today's ISO date at the forecast location."""
+    offset = timedelta(seconds=data.get("utc_offset_seconds", 0))
+    return (datetime.now(UTC) + offset).date().isoformat()
+
+
 async def get_weather(
     ctx: RunContext[AssistantDeps],
     location: str | None = None,
     forecast_days: int | None = None,
+    fields: list[WeatherField] | None = None,
 ) -> WeatherForecast | None:
     """Get weather forecast for a location.
 
@@ -204,10 +585,12 @@ async def get_weather(
         location: Location name, city, or postal code. Uses default if not specified.
         forecast_days: Number of days (1-16). Defaults to 3. Use 1 for today,
             5-7 for "this week", etc.
+        fields: Only include these, e.g. ["precipitation"] for "will it
+            rain?". Defaults to all.
 
     Returns:
         Weather forecast with daily summaries starting today, or None in case
-            of errors or location not found.
+            of errors, location not found or out of time.
 
     Examples:
         >>> # Weather in the default location for today, tomorrow and the day after
@@ -217,53 +600,54 @@ async def get_weather(
         >>> await get_weather(ctx, location="Segovia", forecast_days=2)
     """
     location = location or ctx.deps.default_location
-    forecast_days = max(1, min(16, forecast_days or 3))
-    geo = await geocode(location)
-    if not geo:
+    forecast_days = max(1, min(MAX_FORECAST_DAYS, forecast_days or 3))
+    try:
+        async with within(ctx.deps.deadline):
+            record_cache_lookup()
+            geo = await geocode(location)
+            if not geo:
+                return None
+
+            record_cache_lookup()
+            data = await fetch_daily(
+                geo.latitude, geo.longitude, daily_variables(fields)
+            )
+    except TimeoutError:
+        logger.warning("Deadline reached fetching weather for %r", location)
         return None
 
-    params: dict[str, str | int | float] = {
-        "latitude": geo.latitude,
-        "longitude": geo.longitude,
-        "daily": ",".join(
-            [
-                "temperature_2m_max",
-                "temperature_2m_min",
-                "precipitation_sum",
-                "precipitation_hours",
-                "precipitation_probability_max",
-                "wind_speed_10m_max",
-                "wind_gusts_10m_max",
-                "weather_code",
-            ]
-        ),
-        "timezone": "auto",
-        "forecast_days": forecast_days,
-    }
+    result = daily_forecast(geo, data, forecast_days, fields)
+    logger.info("Fetched %d-day forecast for %s", len(result.days), geo.name)
+    return result
 
-    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
-        r = await client.get(FORECAST_API, params=params)
-        data = r.json()
 
+def daily_forecast(
+    geo: GeoLocation,
+    data: dict[str, Any],
+    forecast_days: int,
+    fields: Collection[WeatherField] | None = None,
+) -> WeatherForecast:
+    """Forecast of a location from a raw daily forecast, starting today.
+
+    Args:
+        geo: Resolved location
+        data: Open-Meteo daily forecast response (see `fetch_daily`)
+        forecast_days: Number of days
+        fields: Fields to include. Defaults to all.
+    """
+    fields = fields or DAILY_DEFAULT_FIELDS
     daily = data["daily"]
+    # Cached responses may start before the location's current day
+    start = bisect_left(daily["time"], _local_today(data))
     days = [
         DailyForecast(
             date=daily["time"][i],
-            temp_min=daily["temperature_2m_min"][i],
-            temp_max=daily["temperature_2m_max"][i],
-            precipitation_sum=daily["precipitation_sum"][i],
-            precipitation_hours=daily["precipitation_hours"][i],
-            precipitation_probability_max=daily["precipitation_probability_max"][i],
-            wind_speed_max=daily["wind_speed_10m_max"][i],
-            wind_gusts_max=daily["wind_gusts_10m_max"][i],
             weather_code=daily["weather_code"][i],
             weather_description=WEATHER_CODES.get(daily["weather_code"][i]),
+            **_projected(daily, i, DAILY_FIELDS, fields),
         )
-        for i in range(len(daily["time"]))
+        for i in range(start, min(start + forecast_days, len(daily["time"])))
     ]
-
-    logger.info("Fetched %d-day forecast for %s", len(days), geo.name)
-
     return WeatherForecast(
         location=geo.name,
         elevation=geo.elevation,
@@ -275,6 +659,7 @@ async def get_hourly_forecast(
     ctx: RunContext[AssistantDeps],
     location: str | None = None,
     date: str | None = None,
+    fields: list[WeatherField] | None = None,
 ) -> HourlyForecast | None:
     """Get hour-by-hour weather for a specific day.
 
@@ -287,47 +672,38 @@ async def get_hourly_forecast(
         location: Location name, city, or postal code. Uses default if not specified.
         date: ISO date (YYYY-MM-DD) to get forecast for. Defaults to today.
             Use get_current_date to determine today's date if needed.
+        fields: Only include these, e.g. ["precipitation"] for "when will it
+            rain?". Defaults to temperature and precipitation.
 
     Returns:
-        Hourly forecast or None if location not found.
+        Hourly forecast or None if location not found or out of time.
     """
     location = location or ctx.deps.default_location
     target_date = date or datetime.now(UTC).date().isoformat()
-    geo = await geocode(location)
-    if not geo:
+    fields = fields or HOURLY_DEFAULT_FIELDS
+    try:
+        async with within(ctx.deps.deadline):
+            record_cache_lookup()
+            geo = await geocode(location)
+            if not geo:
+                return None
+
+            record_cache_lookup()
+            data = await fetch_hourly(
+                geo.latitude, geo.longitude, target_date, hourly_variables(fields)
+            )
+    except TimeoutError:
+        logger.warning("Deadline reached fetching hourly weather for %r", location)
         return None
 
-    params: dict[str, str | float] = {
-        "latitude": geo.latitude,
-        "longitude": geo.longitude,
-        "hourly": ",".join(
-            [
-                "temperature_2m",
-                "precipitation_probability",
-                "precipitation",
-                "weather_code",
-                "is_day",
-            ]
-        ),
-        "timezone": "auto",
-        "start_date": target_date,
-        "end_date": target_date,
-    }
-
-    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
-        r = await client.get(FORECAST_API, params=params)
-        data = r.json()
-
     hourly = data["hourly"]
     hours = [
         HourData(
             time=hourly["time"][i].split("T")[1][:5],
-            temp=hourly["temperature_2m"][i],
-            precipitation_probability=hourly["precipitation_probability"][i],
-            precipitation=hourly["precipitation"][i],
             weather_code=hourly["weather_code"][i],
             weather_description=WEATHER_CODES.get(hourly["weather_code"][i]),
             is_day=bool(hourly["is_day"][i]),
+            **_projected(hourly, i, HOURLY_FIELDS, fields),
         )
         for i in range(len(hourly["time"]))
     ]
@@ -0,0 +1,409 @@
+"""Web page fetch tool.
+
+Lets the model read a page found by `web_search` instead of searching
+again. Pages are streamed with a byte cap, and text is extracted
+incrementally while streaming (no DOM), so downloads stop as soon as
+enough text is collected and memory per fetch stays bounded.
+
+URLs come from the model, and so possibly from a prompt-injected page.
+Hosts are resolved before connecting, and the redirect chain is followed
+by hand, so no hop reaches loopback, private, link-local or reserved
+addresses (e.g. cloud metadata at 169.254.169.254).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import ipaddress
+import logging
+import socket
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+import httpx
+from pydantic import BaseModel
+from pydantic_ai import RunContext
+
+from .. import http, metrics
+from ..cache import TTLCache
+from ..deadline import tool_timeout, within
+from ..dependencies import AssistantDeps
+from ..ledger import record_cache_lookup, record_cache_miss
+from ..shared import shared_get, shared_set
+from ..tokens import CHARS_PER_TOKEN, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+FETCH_TIMEOUT = 10.0
+# Bytes downloaded per page at most (after decompression)
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+PAGE_CACHE_SIZE = 256
+# Cached pages are served without revalidation for this long...
+PAGE_FRESH_TTL = 300.0
+# ...and kept for conditional requests (ETag/Last-Modified) for this long
+PAGE_TTL = 24 * 3600.0
+# Redirects followed per page, each checked like the original URL
+MAX_REDIRECTS = 5
+
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+TEXT_TYPES = ("text/plain", "text/markdown")
+
+# Elements whose content is never main text
+SKIPPED_TAGS = frozenset(
+    {
+        "script",
+        "style",
+        "noscript",
+        "template",
+        "svg",
+        "canvas",
+        "iframe",
+        "nav",
+        "header",
+        "footer",
+        "aside",
+        "form",
+        "button",
+        "select",
+    }
+)
+# Elements ending a line of text
+BLOCK_TAGS = frozenset(
+    {
+        "address",
+        "article",
+        "blockquote",
+        "br",
+        "dd",
+        "div",
+        "dl",
+        "dt",
+        "figcaption",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "hr",
+        "li",
+        "main",
+        "ol",
+        "p",
+        "pre",
+        "section",
+        "table",
+        "td",
+        "th",
+        "tr",
+        "ul",
+    }
+)
+
+
+class WebPage(BaseModel):
+    """Main text of a web page."""
+
+    url: str
+    """Final URL, after redirects."""
+
+    title: str
+    text: str
+    truncated: bool
+    """Whether the text was cut to the token budget or byte cap."""
+
+
+class TextExtractor(HTMLParser):
+    """Streaming HTML to text converter.
+
+    Feed HTML in chunks; text outside boilerplate elements accumulates in
+    lines. Never builds a tree, so memory is bounded by the kept text.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.length = 0
+        """Characters of text collected so far (approximate)."""
+
+        self._title: list[str] = []
+        self._lines: list[str] = []
+        # Raw data of the current line; may split words across chunks
+        self._line: list[str] = []
+        self._skip_depth = 0
+        self._in_title = False
+
+    @property
+    def title(self) -> str:
+        """Document title."""
+        return " ".join("".join(self._title).split())
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in BLOCK_TAGS:
+            self._end_line()
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in BLOCK_TAGS:
+            self._end_line()
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self._title.append(data)
+        elif not self._skip_depth:
+            self._line.append(data)
+            self.length += len(data.strip())
+
+    def text(self) -> str:
+        """Text collected so far, one line per block."""
+        self._end_line()
+        return "\n".join(self._lines)
+
+    def _end_line(self) -> None:
+        if line := " ".join("".join(self._line).split()):
+            self._lines.append(line)
+        self._line = []
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    """Extracted page with its validators."""
+
+    page: WebPage
+    max_chars: int
+    """Characters requested when the page was extracted."""
+
+    etag: str | None
+    last_modified: str | None
+    fetched: float
+    """When the page was fetched or revalidated (`time.monotonic`)."""
+
+
+page_cache: TTLCache[str, CachedPage] = TTLCache(maxsize=PAGE_CACHE_SIZE, ttl=PAGE_TTL)
+metrics.registry.cache("page", page_cache.cache_info)
+
+
+class UnsafeURLError(ValueError):
+    """URL of a host that pages must not be fetched from."""
+
+
+async def resolve_host(host: str, port: int) -> list[str]:
+    """IP addresses of a host, as the connection would use them."""
+    infos = await asyncio.get_running_loop().getaddrinfo(
+        host, port, type=socket.SOCK_STREAM
+    )
+    return [str(info[4][0]) for info in infos]
+
+
+async def check_url(url: httpx.URL) -> None:
+    """Refuse URLs that aren't HTTP, or whose host isn't a public address.
+
+    Raises:
+        UnsafeURLError: If the URL must not be fetched
+        httpx.ConnectError: If the host can't be resolved
+    """
+    if url.scheme not in ("http", "https"):
+        raise UnsafeURLError(f"Unsupported scheme {url.scheme!r}")
+    if not url.host:
+        raise UnsafeURLError("URL without host")
+    try:
+        addresses = [str(ipaddress.ip_address(url.host))]
+    except ValueError:
+        port = url.port or (443 if url.scheme == "https" else 80)
+        try:
+            addresses = await resolve_host(url.host, port)
+        except OSError as e:
+            raise httpx.ConnectError(f"Can't resolve {url.host!r}: {e}") from e
+    for address in addresses:
+        # Drop IPv6 zone ids ("fe80::1%eth0")
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise UnsafeURLError(f"Refusing non-public address {ip} of {url.host!r}")
+
+
+@asynccontextmanager
+async def _get(
+    url: str, headers: dict[str, str], timeout: float
+) -> AsyncIterator[httpx.Response]:
+    """Stream a GET response, following redirects only to checked URLs."""
+    client = http.get_client()
+    target = httpx.URL(url)
+    for _ in range(MAX_REDIRECTS + 1):
+        await check_url(target)
+        request = client.build_request("GET", target, headers=headers, timeout=timeout)
+        response = await client.send(request, stream=True, follow_redirects=False)
+        if not response.has_redirect_location:
+            try:
+                yield response
+            finally:
+                await response.aclose()
+            return
+        await response.aclose()
+        target = target.join(response.headers["location"])
+    raise httpx.TooManyRedirects(
+        f"More than {MAX_REDIRECTS} redirects", request=request
+    )
+
+
+async def _download(
+    url: str, max_chars: int, cached: CachedPage | None, timeout: float
+) -> CachedPage:
+    """Fetch and extract a page, revalidating `cached` if given."""
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+    async with _get(url, headers, timeout) as response:
+        if response.status_code == 304 and cached is not None:
+            logger.debug("Page not modified: %s", url)
+            return CachedPage(
+                cached.page,
+                cached.max_chars,
+                cached.etag,
+                cached.last_modified,
+                time.monotonic(),
+            )
+        response.raise_for_status()
+
+        content_type = response.headers.get("content-type", "").split(";")[0].strip()
+        if content_type not in HTML_TYPES + TEXT_TYPES:
+            raise ValueError(f"Unsupported content type {content_type!r}")
+
+        extractor = TextExtractor() if content_type in HTML_TYPES else None
+        plain: list[str] = []
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(
+            errors="replace"
+        )
+        received = length = 0
+        capped = False
+
+        async for chunk in response.aiter_bytes():
+            received += len(chunk)
+            if received > MAX_PAGE_BYTES:
+                chunk = chunk[: len(chunk) - (received - MAX_PAGE_BYTES)]
+                capped = True
+            text = decoder.decode(chunk, final=capped)
+            if extractor is not None:
+                extractor.feed(text)
+                length = extractor.length
+            else:
+                plain.append(text)
+                length = received
+            if capped or length > max_chars:
+                # Enough text (or bytes): stop downloading the rest
+                break
+
+        if extractor is not None:
+            extractor.close()
+            title, body = extractor.title, extractor.text()
+        else:
+            lines = "".join(plain).splitlines()
+            title, body = (
+                "",
+                "\n".join(" ".join(ln.split()) for ln in lines if ln.strip()),
+            )
+
+    logger.debug("Fetched %s: %d bytes, %d chars", url, received, len(body))
+    text = truncate_tokens(body, max_chars // CHARS_PER_TOKEN)
+    page = WebPage(
+        url=str(response.url),
+        title=title,
+        text=text,
+        truncated=capped or text != body or length > max_chars,
+    )
+    return CachedPage(
+        page,
+        max_chars,
+        response.headers.get("etag"),
+        response.headers.get("last-modified"),
+        time.monotonic(),
+    )
+
+
+async def fetch_page(ctx: RunContext[AssistantDeps], url: str) -> WebPage | None:
+    """Read the main text of a web page.
+
+    Use it to read a page found with `web_search` when its snippet isn't
+    enough, instead of searching again. Long pages are truncated.
+
+    Args:
+        ctx: Agent run context
+        url: Page URL (http or https)
+
+    Returns:
+        Page title and text, or None if it can't be fetched.
+    """
+    logger.info("Fetching page: %s", url)
+
+    if urlsplit(url).scheme not in ("http", "https"):
+        logger.warning("Refusing to fetch non-HTTP URL %r", url)
+        return None
+
+    deadline = ctx.deps.deadline
+    max_chars = ctx.deps.page_token_budget * CHARS_PER_TOKEN
+    try:
+        record_cache_lookup()
+        cached = page_cache.get(url)
+        # Pages extracted for a smaller budget may be missing text
+        if (
+            cached is not None
+            and cached.max_chars < max_chars
+            and cached.page.truncated
+        ):
+            cached = None
+        if cached is not None and time.monotonic() - cached.fetched < PAGE_FRESH_TTL:
+            return _fit(cached.page, max_chars)
+        if cached is None and (shared := _shared_page(url, max_chars)) is not None:
+            page_cache.set(url, shared)
+            return _fit(shared.page, max_chars)
+
+        record_cache_miss()
+        async with within(deadline):
+            fetched = await _download(
+                url, max_chars, cached, tool_timeout(deadline, FETCH_TIMEOUT)
+            )
+        page_cache.set(url, fetched)
+        shared_set("page", url, (fetched.page, fetched.max_chars), PAGE_FRESH_TTL)
+        return _fit(fetched.page, max_chars)
+    except TimeoutError:
+        logger.warning("Deadline reached fetching %s", url)
+        return None
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning("Failed to fetch %s: %s", url, e)
+        return None
+
+
+def _shared_page(url: str, max_chars: int) -> CachedPage | None:
+    """Fresh page fetched by another process, if extracted for enough text."""
+    shared = shared_get("page", url)
+    if shared is None:
+        return None
+    page, extracted = shared
+    if extracted < max_chars and page.truncated:
+        return None
+    # Validators aren't shared: once stale, the page is fetched in full
+    return CachedPage(page, extracted, None, None, time.monotonic())
+
+
+def _fit(page: WebPage, max_chars: int) -> WebPage:
+    """Page truncated to `max_chars`, if it was extracted for a larger budget."""
+    if len(page.text) <= max_chars:
+        return page
+    text = truncate_tokens(page.text, max_chars // CHARS_PER_TOKEN)
+    return page.model_copy(update={"text": text, "truncated": True})
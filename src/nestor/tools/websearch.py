@@ -2,9 +2,16 @@
 
 from __future__ import annotations
 
-import functools
 import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from typing import Literal
+from urllib.parse import parse_qsl, urlencode, urlsplit
 
 import anyio
 from ddgs import DDGS
@@ -12,10 +19,38 @@ from pydantic import TypeAdapter
 from pydantic_ai import RunContext
 from typing_extensions import TypedDict
 
+from .. import metrics, upstream
+from ..cache import TTLCache
+from ..deadline import tool_timeout, within
 from ..dependencies import AssistantDeps
+from ..ledger import record_cache_lookup, record_cache_miss
+from ..shared import shared_get, shared_set
+from ..tokens import estimate_tokens, truncate_tokens
 
 logger = logging.getLogger(__name__)
 
+# DDGS request timeout in seconds (the library's default)
+SEARCH_TIMEOUT = 5
+# Search results are shared across users with the same search settings
+SEARCH_CACHE_SIZE = 512
+SEARCH_TTL = 600.0
+# BM25 parameters (standard values)
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Reciprocal rank fusion constant, blending BM25 with the engine's own ranking
+RRF_K = 60
+# Results sharing this fraction of word shingles are near-duplicates
+DUPLICATE_SIMILARITY = 0.5
+SHINGLE_SIZE = 3
+# Snippets are never trimmed below this many tokens
+MIN_SNIPPET_TOKENS = 24
+# Idle DDGS clients kept per timeout
+MAX_IDLE_CLIENTS = 4
+# Upstream label of searches in metrics; DDGS picks the engines' hosts itself
+UPSTREAM_HOST = "ddgs"
+
+_WORD_RE = re.compile(r"\w+")
+
 
 class SearchResult(TypedDict):
     """A web search result."""
@@ -32,6 +67,208 @@ class SearchResult(TypedDict):
 
 _search_result_adapter = TypeAdapter(list[SearchResult])
 
+SearchKey = tuple[str, str, str | None, int, str, str]
+"""Query, region, timelimit, max results, safesearch and backend."""
+
+search_cache: TTLCache[SearchKey, list[SearchResult]] = TTLCache(
+    maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_TTL
+)
+metrics.registry.cache("search", search_cache.cache_info)
+
+
+class ClientPool:
+    """Reusable DDGS clients, keyed by timeout.
+
+    Each DDGS client keeps its own search engine instances and HTTP
+    sessions, so creating one per search churns memory and connections.
+    Clients are checked out by worker threads and returned after use.
+
+    Args:
+        max_idle: Idle clients kept per timeout
+        factory: Creates a client for a timeout. Defaults to `DDGS`.
+    """
+
+    def __init__(
+        self,
+        max_idle: int = MAX_IDLE_CLIENTS,
+        factory: Callable[[int], DDGS] | None = None,
+    ):
+        self.max_idle = max_idle
+        self.factory = factory
+        self._idle: defaultdict[int, list[DDGS]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def client(self, timeout: int) -> Iterator[DDGS]:
+        """Check out a client with the given timeout."""
+        with self._lock:
+            idle = self._idle[timeout]
+            client = idle.pop() if idle else None
+        if client is None:
+            client = (self.factory or _new_client)(timeout)
+        try:
+            yield client
+        finally:
+            with self._lock:
+                if len(idle) < self.max_idle:
+                    idle.append(client)
+
+    def clear(self) -> None:
+        """Drop all idle clients."""
+        with self._lock:
+            self._idle.clear()
+
+    def __len__(self) -> int:
+        return sum(len(idle) for idle in self._idle.values())
+
+
+@contextmanager
+def _metered_upstream() -> Iterator[None]:
+    """Meter a DDGS search like the HTTP requests of other tools."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        with metrics.upstream_in_flight.labels(UPSTREAM_HOST).track():
+            yield
+        outcome = "ok"
+    finally:
+        metrics.upstream_seconds.labels(UPSTREAM_HOST).observe(
+            time.perf_counter() - start
+        )
+        metrics.upstream_requests.labels(UPSTREAM_HOST, outcome).inc()
+
+
+def _new_client(timeout: int) -> DDGS:
+    return DDGS(timeout=timeout)
+
+
+ddgs_pool = ClientPool()
+
+
+def _terms(text: str) -> list[str]:
+    return _WORD_RE.findall(text.casefold())
+
+
+def bm25_scores(query: str, documents: list[list[str]]) -> list[float]:
+    """Score tokenized documents against a query with Okapi BM25.
+
+    Args:
+        query: Search query
+        documents: Documents as lists of terms
+
+    Returns:
+        One score per document
+    """
+    if not documents:
+        return []
+
+    n = len(documents)
+    avgdl = sum(len(d) for d in documents) / n or 1.0
+    df = Counter(term for d in documents for term in set(d))
+    query_terms = set(_terms(query))
+
+    scores = []
+    for doc in documents:
+        tf = Counter(doc)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / avgdl)
+        score = 0.0
+        for term in query_terms & tf.keys():
+            idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+            score += idf * tf[term] * (BM25_K1 + 1) / (tf[term] + norm)
+        scores.append(score)
+    return scores
+
+
+def _normalize_url(url: str) -> str:
+    """Canonical form of a URL for duplicate detection."""
+    parts = urlsplit(url)
+    host = parts.netloc.lower().removeprefix("www.").removeprefix("m.")
+    query = urlencode(
+        sorted(
+            (k, v)
+            for k, v in parse_qsl(parts.query)
+            if not k.startswith("utm_") and k not in ("ref", "fbclid", "gclid")
+        )
+    )
+    return f"{host}{parts.path.rstrip('/')}?{query}"
+
+
+def _shingles(terms: list[str]) -> set[tuple[str, ...]]:
+    if len(terms) < SHINGLE_SIZE:
+        return {tuple(terms)}
+    return {
+        tuple(terms[i : i + SHINGLE_SIZE]) for i in range(len(terms) - SHINGLE_SIZE + 1)
+    }
+
+
+def postprocess(
+    query: str, results: list[SearchResult], token_budget: int
+) -> list[SearchResult]:
+    """Rerank, deduplicate and trim search results to a token budget.
+
+    Results are ranked by reciprocal rank fusion of a local BM25 score and
+    the engine's order, with results matching no query term last.
+    Duplicates by canonical URL or by word shingles are dropped, keeping
+    the best-ranked copy. Snippets then share the token budget evenly;
+    results that don't fit are dropped, but the best one is always kept.
+
+    Args:
+        query: Search query
+        results: Validated search results, in engine order
+        token_budget: Approximate prompt tokens all results may use
+
+    Returns:
+        Fewer, better results
+    """
+    if not results:
+        return []
+
+    documents = [_terms(f"{r['title']} {r['body']}") for r in results]
+    scores = bm25_scores(query, documents)
+    by_score = sorted(range(len(results)), key=lambda i: -scores[i])
+    bm25_rank = {i: rank for rank, i in enumerate(by_score)}
+    # Results not matching any query term sink below all matching ones
+    ranked = sorted(
+        range(len(results)),
+        key=lambda i: (
+            scores[i] == 0,
+            -(1 / (RRF_K + bm25_rank[i]) + 1 / (RRF_K + i)),
+        ),
+    )
+
+    kept: list[int] = []
+    seen_urls: set[str] = set()
+    seen_shingles: list[set[tuple[str, ...]]] = []
+    for i in ranked:
+        url = _normalize_url(results[i]["href"])
+        shingles = _shingles(documents[i])
+        if url in seen_urls or any(
+            len(shingles & other) / len(shingles | other) >= DUPLICATE_SIMILARITY
+            for other in seen_shingles
+        ):
+            continue
+        seen_urls.add(url)
+        seen_shingles.append(shingles)
+        kept.append(i)
+
+    overhead = [
+        estimate_tokens(results[i]["title"]) + estimate_tokens(results[i]["href"])
+        for i in kept
+    ]
+    per_snippet = max(MIN_SNIPPET_TOKENS, (token_budget - sum(overhead)) // len(kept))
+
+    trimmed: list[SearchResult] = []
+    used = 0
+    for i, cost in zip(kept, overhead, strict=True):
+        body = truncate_tokens(results[i]["body"], per_snippet)
+        cost += estimate_tokens(body)
+        if trimmed and used + cost > token_budget:
+            break
+        trimmed.append({**results[i], "body": body})
+        used += cost
+
+    return trimmed
+
 
 async def web_search(
     ctx: RunContext[AssistantDeps],
@@ -77,23 +314,59 @@ async def web_search(
         timelimit,
     )
 
+    deadline = ctx.deps.deadline
+    # Partitioned only by what changes results, never by user
+    key: SearchKey = (
+        " ".join(query.casefold().split()),
+        region,
+        timelimit,
+        max_results,
+        ctx.deps.safesearch,
+        ctx.deps.search_backend,
+    )
     try:
-        client = DDGS()
-
-        search_func = functools.partial(
-            client.text,
-            query,
-            region=region,
-            safesearch=ctx.deps.safesearch,
-            timelimit=timelimit,
-            max_results=max_results,
-            backend=ctx.deps.search_backend,
-        )
+        record_cache_lookup()
+        validated = search_cache.get(key)
+        if validated is None:
+            # Another process may have searched it (see `shared`)
+            validated = shared_get("search", key)
+            if validated is not None:
+                search_cache.set(key, validated)
+        if validated is None:
+            record_cache_miss()
+            timeout = max(1, round(tool_timeout(deadline, SEARCH_TIMEOUT)))
 
-        # Run in thread pool (DDGS is sync)
-        results = await anyio.to_thread.run_sync(search_func)
+            def search() -> list[dict[str, str]]:
+                with _metered_upstream(), ddgs_pool.client(timeout) as client:
+                    return client.text(
+                        query,
+                        region=region,
+                        safesearch=ctx.deps.safesearch,
+                        timelimit=timelimit,
+                        max_results=max_results,
+                        backend=ctx.deps.search_backend,
+                    )
 
-        return _search_result_adapter.validate_python(results)
+            # Run in thread pool (DDGS is sync). The thread can't be cancelled,
+            # so on deadline it is abandoned and finishes on its own timeout.
+            async with within(deadline):
+                await upstream.DDGS.admit()
+                results = await anyio.to_thread.run_sync(search, abandon_on_cancel=True)
+
+            validated = _search_result_adapter.validate_python(results)
+            search_cache.set(key, validated)
+            shared_set("search", key, validated, search_cache.ttl)
+
+        processed = postprocess(query, validated, ctx.deps.search_token_budget)
+        logger.debug(
+            "Search results: %d → %d after rerank/dedup/trim",
+            len(validated),
+            len(processed),
+        )
+        return processed
+    except TimeoutError:
+        logger.warning("Deadline reached searching query=%r", query)
+        return []
     except Exception:
         logger.exception("Search failed for query=%r", query)
         return []  # Let the model handle empty results gracefully
@@ -0,0 +1,54 @@
+"""Request rates of the services tools call.
+
+Each service has one `Upstream`, shared by every tool, prefetch and digest
+that calls it. Requests are admitted where they're sent, so cached answers
+never wait and no caller bypasses the limit. Batch workers replace the
+buckets with shared ones (see `shared`), so the rate holds across processes.
+
+Example:
+    >>> await OPEN_METEO.admit()
+    >>> r = await http.get_client().get(FORECAST_API, params=params)
+"""
+
+import asyncio
+import logging
+
+from .agents.scheduler import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class Upstream:
+    """A rate-limited service, with its request rate.
+
+    Requests are admitted in order at `per_minute`, after an initial
+    `burst`. Only requests actually sent are admitted, so rates may be set
+    close to the service's own limit.
+    """
+
+    def __init__(self, name: str, per_minute: float, burst: float | None = None):
+        self.name = name
+        self.per_minute = per_minute
+        self.burst = burst
+        self.bucket = TokenBucket(per_minute, burst)
+        """Admission state; replaced by a shared bucket in batch workers."""
+
+    async def admit(self) -> None:
+        """Wait for this request's turn."""
+        # Reserve the slot before sleeping, so later callers queue behind it
+        delay = self.bucket.delay(1)
+        self.bucket.consume(1)
+        if delay > 0:
+            logger.debug("Rate limited by %s for %.3fs", self.name, delay)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # Never sent: give the slot back to the callers behind
+                self.bucket.consume(-1)
+                raise
+
+
+# Open-Meteo's free tier allows 600 calls a minute; DDGS engines start
+# answering with errors well before that.
+OPEN_METEO = Upstream("open-meteo", per_minute=600, burst=20)
+DDGS = Upstream("ddgs", per_minute=30, burst=5)
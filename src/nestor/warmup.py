@@ -0,0 +1,147 @@
+"""Cache warm-up for frequently queried locations.
+
+Pre-resolves locations and prefetches their daily and hourly forecasts, so
+weather questions about hot locations are answered from cache.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Self
+
+from . import defaults
+from .tools.weather import GeoLocation, fetch_daily, fetch_hourly, geocode
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmResult:
+    """Outcome of warming a single location."""
+
+    location: str
+    """Location as configured."""
+
+    geo: GeoLocation | None = None
+    """Resolved location, if found."""
+
+    elapsed: float = 0.0
+    """Seconds spent resolving and fetching."""
+
+    error: str | None = None
+    """Error description, if warming failed."""
+
+
+async def warm_location(location: str, *, refresh: bool = False) -> WarmResult:
+    """Resolve a location and prefetch its forecasts.
+
+    Args:
+        location: Location name, city, or postal code
+        refresh: Replace cached forecasts instead of reusing them
+
+    Returns:
+        Warm-up outcome. Errors are reported, never raised.
+    """
+    start = time.perf_counter()
+    result = WarmResult(location=location)
+
+    try:
+        result.geo = geo = await geocode(location)
+        if geo is None:
+            result.error = "location not found"
+        else:
+            # Same default date as `get_hourly_forecast`, so keys match
+            date = datetime.now(UTC).date().isoformat()
+            # On refresh, cached entries are invalidated and refetched without
+            # yielding, so concurrent tool calls share the new request
+            await asyncio.gather(
+                fetch_daily(geo.latitude, geo.longitude, refresh=refresh),
+                fetch_hourly(geo.latitude, geo.longitude, date, refresh=refresh),
+            )
+    except Exception as e:
+        logger.warning("Warm-up failed for %r: %r", location, e)
+        result.error = repr(e)
+
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+async def warm_up(
+    locations: Iterable[str], *, refresh: bool = False
+) -> list[WarmResult]:
+    """Warm several locations concurrently.
+
+    Args:
+        locations: Location names, cities, or postal codes
+        refresh: Replace cached forecasts instead of reusing them
+
+    Returns:
+        Warm-up outcomes, in the same order as `locations`
+    """
+    return await asyncio.gather(
+        *(warm_location(location, refresh=refresh) for location in locations)
+    )
+
+
+class Warmer:
+    """Keeps forecasts for a set of locations warm in the background.
+
+    Warms all locations on start, then refreshes them every `interval`
+    seconds. Intended as an on-start hook for long-running embedders:
+
+        async with Warmer(["Madrid", "Segovia"]):
+            ...  # Serve requests
+    """
+
+    def __init__(
+        self,
+        locations: Iterable[str],
+        *,
+        interval: float = defaults.WARM_INTERVAL,
+    ):
+        self.locations = list(dict.fromkeys(locations))
+        self.interval = interval
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the background task is active."""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start warming in the background. Requires a running event loop."""
+        if not self.running and self.locations:
+            self._task = asyncio.create_task(self._run(), name="nestor-warmer")
+
+    async def stop(self) -> None:
+        """Stop the background task."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        refresh = False
+        while True:
+            results = await warm_up(self.locations, refresh=refresh)
+            logger.info(
+                "Warmed %d/%d location(s)",
+                sum(r.error is None for r in results),
+                len(results),
+            )
+            refresh = True
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self) -> Self:
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.stop()
@@ -9,7 +9,7 @@ models.ALLOW_MODEL_REQUESTS = False
 
 
 @pytest.fixture
-def agent():
+def agent(open_meteo):
     """Agent with TestModel."""
     agent = create_assistant_agent(api_key=SecretStr("secret-api-key"))
     with agent.override(model=TestModel()):
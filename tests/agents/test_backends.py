@@ -0,0 +1,111 @@
+"""Tests for model backends and the backend benchmark."""
+
+import pytest
+from pydantic import SecretStr
+from pydantic_ai import models
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from nestor import cli
+from nestor.agents import create_agent
+from nestor.agents.assistant import create_assistant_agent
+from nestor.agents.backends import (
+    PLACEHOLDER_API_KEY,
+    ModelBackend,
+    backend_from_settings,
+)
+from nestor.agents.benchmark import benchmark
+from nestor.config import Settings
+
+models.ALLOW_MODEL_REQUESTS = False
+
+LOCAL = ModelBackend(
+    provider="openai-compatible",
+    base_url="http://localhost:8080/v1",
+    timeout=120.0,
+    connect_timeout=1.0,
+)
+
+
+class TestModelBackend:
+    """Tests for ModelBackend."""
+
+    def test_local_backend(self):
+        """Should target the server's URL with its timeouts, without a key."""
+        agent = create_agent(str, model_name="qwen3-8b", backend=LOCAL)
+
+        client = agent.model.client
+        assert str(client.base_url) == "http://localhost:8080/v1/"
+        assert client.api_key == PLACEHOLDER_API_KEY
+        assert client.timeout.read == 120.0
+        assert client.timeout.connect == 1.0
+
+    def test_openai_by_default(self):
+        """Should target OpenAI with the given key."""
+        agent = create_agent(str, api_key=SecretStr("secret-api-key"))
+
+        client = agent.model.client
+        assert client.base_url.host == "api.openai.com"
+        assert client.api_key == "secret-api-key"
+
+    def test_prompt_cache_key_only_for_openai(self):
+        """Should not send OpenAI's prompt_cache_key to other servers."""
+        cloud = create_assistant_agent(api_key=SecretStr("secret-api-key"))
+        local = create_assistant_agent(backend=LOCAL)
+
+        assert "openai_prompt_cache_key" in (cloud.model_settings or {})
+        assert local.model_settings is None
+
+    def test_settings_require_key_for_openai(self, monkeypatch):
+        """Should require an API key for OpenAI models, not for compatible servers."""
+        monkeypatch.delenv("NESTOR_OPENAI_API_KEY", raising=False)
+
+        settings = Settings(_env_file=None)  # Loading alone doesn't need one
+        with pytest.raises(ValueError, match="API_KEY"):
+            backend_from_settings(settings)
+        settings = Settings(_env_file=None, llm_provider="openai-compatible")
+        assert settings.openai_api_key is None
+        assert backend_from_settings(settings).base_url is None
+
+
+def test_bench_targets(monkeypatch):
+    """Should bench a bare MODEL on OpenAI and never send its key elsewhere."""
+    monkeypatch.setattr(
+        cli,
+        "settings",
+        Settings(
+            _env_file=None,
+            openai_api_key=SecretStr("secret-api-key"),
+            llm_provider="openai-compatible",
+            llm_base_url="http://localhost:8080/v1",
+        ),
+    )
+
+    _, _, cloud, cloud_key = cli._bench_target("gpt-5-nano")
+    _, model, local, local_key = cli._bench_target("qwen3-8b@http://gpu:8000/v1")
+
+    assert (cloud.provider, cloud.base_url) == ("openai", None)
+    assert cloud_key is not None
+    assert (model, local.base_url, local_key) == (
+        "qwen3-8b",
+        "http://gpu:8000/v1",
+        None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_benchmark():
+    """Should time first tokens and count output tokens per request."""
+
+    async def stream(messages, info: AgentInfo):
+        for word in ("Hola", " mundo", "!"):
+            yield word
+
+    agent = create_agent(str, api_key=SecretStr("secret-api-key"))
+    with agent.override(model=FunctionModel(stream_function=stream)):
+        result = await benchmark(agent, ["a", "b"], repeat=2, concurrency=2)
+
+    assert len(result.timings) == 4
+    assert result.errors == 0
+    assert all(t.ttft <= t.total for t in result.timings)
+    assert all(t.output_tokens > 0 for t in result.timings)
+    assert result.throughput > 0
@@ -0,0 +1,110 @@
+"""Tests for tool execution traits."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from pydantic_ai import RunContext
+from pydantic_ai.toolsets import FunctionToolset
+
+from nestor.agents.assistant import TOOLS
+from nestor.agents.execution import (
+    INLINE,
+    ToolTraits,
+    executed,
+    queue_stats,
+)
+from nestor.ledger import RecordingToolset, recording
+
+
+def loop_thread(ctx: RunContext[None]) -> int:
+    """Thread the tool runs on."""
+    return threading.get_ident()
+
+
+def worker_name() -> str:
+    """Name of the thread the tool runs on."""
+    time.sleep(0.02)
+    return threading.current_thread().name
+
+
+async def probe_async() -> None: ...
+
+
+class TestExecuted:
+    """Tests for executed tools."""
+
+    def test_keeps_tool_definitions(self):
+        """Should build the same tool definitions as the bare functions."""
+        bare = FunctionToolset([func for func, _ in TOOLS])
+        wrapped = FunctionToolset([executed(func, traits) for func, traits in TOOLS])
+
+        for name, tool in bare.tools.items():
+            assert wrapped.tools[name].tool_def == tool.tool_def
+            assert wrapped.tools[name].function_schema.is_async
+
+    @pytest.mark.asyncio
+    async def test_inline_runs_on_event_loop(self):
+        """Should call inline tools without a thread hop."""
+        tool = executed(loop_thread, INLINE)
+
+        assert await tool(None) == threading.get_ident()
+
+    @pytest.mark.asyncio
+    async def test_thread_pool(self):
+        """Should run thread-bound tools in their own pool, queueing extra calls."""
+        tool = executed(worker_name, ToolTraits(mode="thread", max_concurrency=1))
+        queue_stats.pop("worker_name", None)
+
+        names = await asyncio.gather(tool(), tool())
+
+        assert all(name.startswith("nestor-worker_name") for name in names)
+        assert queue_stats["worker_name"].wait_percentile(95) >= 0.01
+
+    @pytest.mark.asyncio
+    async def test_max_concurrency(self):
+        """Should run at most max_concurrency calls at once."""
+        running = peak = 0
+
+        async def probe() -> None:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        tool = executed(probe, ToolTraits(max_concurrency=2))
+        await asyncio.gather(*(tool() for _ in range(6)))
+
+        assert peak == 2
+
+    def test_rejects_mismatched_traits(self):
+        """Should refuse async tools in threads and sync tools as async."""
+        with pytest.raises(ValueError):
+            executed(probe_async, ToolTraits(mode="thread"))
+        with pytest.raises(ValueError):
+            executed(worker_name, ToolTraits())
+
+
+@pytest.mark.asyncio
+async def test_records_queue_time():
+    """Should record each call's queue time in the ledger."""
+
+    async def slow() -> None:
+        await asyncio.sleep(0.02)
+
+    toolset = RecordingToolset(
+        FunctionToolset([executed(slow, ToolTraits(max_concurrency=1))])
+    )
+    ctx = RunContext(deps=None, model=None, usage=None)  # type: ignore[arg-type]
+    tools = await toolset.get_tools(ctx)
+
+    with recording() as recorder:
+        await asyncio.gather(
+            *(toolset.call_tool("slow", {}, ctx, tools["slow"]) for _ in range(2))
+        )
+
+    queued = sorted(call.queued for call in recorder.tool_calls)
+    assert queued[0] < 0.01
+    assert queued[1] >= 0.015
@@ -0,0 +1,122 @@
+"""Tests for the prompt-cache-friendly request layout."""
+
+import pytest
+from pydantic import SecretStr
+from pydantic_ai import models
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from pydantic_ai.usage import RequestUsage
+
+from nestor.agents.assistant import INSTRUCTIONS, create_assistant_agent
+from nestor.agents.prefix import prefix_digest
+from nestor.ledger import recording
+
+models.ALLOW_MODEL_REQUESTS = False
+
+
+class PrefixSpy:
+    """Model recording the prefix of every request."""
+
+    def __init__(self):
+        self.prefixes: list[str] = []
+        self.tools: list[list[str]] = []
+        self.settings: list[dict] = []
+
+    def respond(self, messages, info: AgentInfo) -> ModelResponse:
+        self.prefixes.append(prefix_digest(info.instructions, info.function_tools))
+        self.tools.append([tool.name for tool in info.function_tools])
+        self.settings.append(dict(info.model_settings or {}))
+        usage = RequestUsage(input_tokens=2000, cache_read_tokens=1536, output_tokens=5)
+        if len(messages) == 1:
+            call = ToolCallPart("get_current_date", {})
+            return ModelResponse(parts=[call], usage=usage)
+        return ModelResponse(parts=[TextPart("ok")], usage=usage)
+
+
+@pytest.mark.asyncio
+async def test_prefix_is_stable_across_runs_and_agents(deps):
+    """Should send byte-identical instructions and tools on every request."""
+    spy = PrefixSpy()
+    for _ in range(2):
+        agent = create_assistant_agent(
+            api_key=SecretStr("secret-api-key"), select_tools=False
+        )
+        with agent.override(model=FunctionModel(spy.respond)):
+            await agent.run("What day is it?", deps=deps)
+            await agent.run("And tomorrow?", deps=deps)
+
+    assert len(spy.prefixes) == 8
+    assert len(set(spy.prefixes)) == 1
+    assert spy.tools[0] == sorted(spy.tools[0])
+
+
+@pytest.mark.asyncio
+async def test_prefix_is_stable_per_tool_selection(deps):
+    """Should send one stable prefix per combination of tool groups."""
+    prompts = ["What day is it?", "Will it rain?", "Search the news", "Hello"]
+    spy = PrefixSpy()
+    for _ in range(2):
+        agent = create_assistant_agent(api_key=SecretStr("secret-api-key"))
+        with agent.override(model=FunctionModel(spy.respond)):
+            for prompt in prompts:
+                await agent.run(prompt, deps=deps)
+
+    by_tools: dict[tuple[str, ...], set[str]] = {}
+    for tools, prefix in zip(spy.tools, spy.prefixes):
+        assert tools == sorted(tools)
+        by_tools.setdefault(tuple(tools), set()).add(prefix)
+    assert len(by_tools) == len(prompts)
+    assert all(len(prefixes) == 1 for prefixes in by_tools.values())
+    assert len({s["openai_prompt_cache_key"] for s in spy.settings}) == 1
+
+
+@pytest.mark.asyncio
+async def test_prefix_is_reused_across_turns(deps):
+    """Should keep a conversation's prefix once its tools are exposed."""
+    spy = PrefixSpy()
+    agent = create_assistant_agent(api_key=SecretStr("secret-api-key"))
+    history = []
+
+    with agent.override(model=FunctionModel(spy.respond)):
+        for prompt in ["Will it rain?", "What time is it?", "And in Tokyo?"]:
+            result = await agent.run(prompt, deps=deps, message_history=history)
+            history = result.all_messages()
+
+    assert len(spy.prefixes) == 4
+    assert len(set(spy.prefixes)) == 1
+    assert "get_weather" in spy.tools[-1]
+
+
+@pytest.mark.asyncio
+async def test_sends_prompt_cache_key(deps):
+    """Should route requests sharing the prefix to the same cache."""
+    spy = PrefixSpy()
+    agent = create_assistant_agent(
+        api_key=SecretStr("secret-api-key"), select_tools=False
+    )
+
+    with agent.override(model=FunctionModel(spy.respond)):
+        await agent.run("What day is it?", deps=deps)
+
+    key = spy.settings[0]["openai_prompt_cache_key"]
+    assert key.startswith("nestor-")
+    assert key[len("nestor-") :] == spy.prefixes[0][:16]
+
+
+def test_digest_changes_with_instructions():
+    """Should notice any change to the prefix text."""
+    assert prefix_digest(INSTRUCTIONS, []) != prefix_digest(INSTRUCTIONS + " ", [])
+
+
+@pytest.mark.asyncio
+async def test_records_cached_tokens(deps):
+    """Should ledger input tokens served from the prompt cache."""
+    spy = PrefixSpy()
+    agent = create_assistant_agent(api_key=SecretStr("secret-api-key"))
+
+    with agent.override(model=FunctionModel(spy.respond)), recording() as recorder:
+        result = await agent.run("What day is it?", deps=deps)
+
+    record = recorder.finish(result)
+    assert record.cache_read_tokens == 2 * 1536
+    assert record.input_tokens == 2 * 2000
@@ -0,0 +1,163 @@
+"""Tests for latency-aware model routing."""
+
+import asyncio
+
+import pytest
+from pydantic import SecretStr
+from pydantic_ai import models
+from pydantic_ai.exceptions import FallbackExceptionGroup, ModelHTTPError
+from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart, UserPromptPart
+from pydantic_ai.models.function import FunctionModel
+
+from nestor.agents import create_agent
+from nestor.agents.routing import RoutedModel, is_hard_prompt
+from nestor.ledger import recording
+
+models.ALLOW_MODEL_REQUESTS = False
+
+
+def answering(text: str, delay: float = 0.0) -> FunctionModel:
+    """Model answering `text` after `delay` seconds."""
+
+    async def respond(messages, info):
+        await asyncio.sleep(delay)
+        return ModelResponse(parts=[TextPart(text)])
+
+    return FunctionModel(respond, model_name=text)
+
+
+def failing(name: str) -> FunctionModel:
+    """Model failing every request with a server error."""
+
+    async def respond(messages, info):
+        raise ModelHTTPError(status_code=503, model_name=name)
+
+    return FunctionModel(respond, model_name=name)
+
+
+@pytest.fixture
+def agent():
+    return create_agent(output_type=str, api_key=SecretStr("secret-api-key"))
+
+
+class TestIsHardPrompt:
+    """Tests for the default prompt classifier."""
+
+    @pytest.mark.parametrize(
+        "prompt, hard",
+        [
+            ("What's the weather in Madrid?", False),
+            ("Compare Python and Rust for a CLI", True),
+            ("Why? How? When?", True),
+            ("x" * 1000, True),
+        ],
+    )
+    def test_classifies_latest_prompt(self, prompt, hard):
+        """Should flag long, multi-question or reasoning-heavy prompts."""
+        messages = [ModelRequest(parts=[UserPromptPart(prompt)])]
+
+        assert is_hard_prompt(messages) is hard
+
+
+class TestRoutedModel:
+    """Tests for RoutedModel."""
+
+    @pytest.mark.asyncio
+    async def test_uses_primary(self, agent):
+        """Should answer from the primary when healthy."""
+        model = RoutedModel(answering("primary"), answering("fallback"))
+
+        with agent.override(model=model), recording() as recorder:
+            result = await agent.run("Hi")
+
+        assert result.output == "primary"
+        assert model.decisions[-1].reason == "primary"
+        assert recorder.routes == ["primary:primary"]
+
+    @pytest.mark.asyncio
+    async def test_falls_back_on_error(self, agent):
+        """Should try the next model when one fails."""
+        model = RoutedModel(failing("primary"), answering("fallback"))
+
+        with agent.override(model=model):
+            result = await agent.run("Hi")
+
+        assert result.output == "fallback"
+        decision = model.decisions[-1]
+        assert decision.reason == "fallback"
+        assert decision.tried == ["primary", "fallback"]
+        assert model.health["primary"].error_rate == 1
+
+    @pytest.mark.asyncio
+    async def test_cooling_model_is_tried_last(self, agent):
+        """Should skip a recently failing model on later requests."""
+        model = RoutedModel(failing("primary"), answering("fallback"))
+
+        with agent.override(model=model):
+            await agent.run("Hi")
+            await agent.run("Hi again")
+
+        assert model.decisions[-1].tried == ["fallback"]
+
+    @pytest.mark.asyncio
+    async def test_raises_when_all_fail(self, agent):
+        """Should raise once every model has failed."""
+        model = RoutedModel(failing("primary"), failing("fallback"))
+
+        with agent.override(model=model), pytest.raises(FallbackExceptionGroup):
+            await agent.run("Hi")
+
+    @pytest.mark.asyncio
+    async def test_hedges_slow_requests(self, agent):
+        """Should race the next model when the first is slow."""
+        model = RoutedModel(
+            answering("slow", delay=1), answering("fast"), hedge_after=0.05
+        )
+
+        with agent.override(model=model):
+            result = await agent.run("Hi")
+
+        assert result.output == "fast"
+        assert model.decisions[-1].reason == "hedged"
+        assert model.decisions[-1].latency < 0.5
+
+    @pytest.mark.asyncio
+    async def test_demotes_slow_models(self, agent):
+        """Should try models over the latency budget last."""
+        model = RoutedModel(
+            answering("slow", delay=0.05), answering("fast"), max_latency=0.01
+        )
+        model.health_of(model.models[0]).record_success(1.0)
+
+        with agent.override(model=model):
+            result = await agent.run("Hi")
+
+        assert result.output == "fast"
+
+    @pytest.mark.asyncio
+    async def test_escalates_hard_prompts(self, agent):
+        """Should send prompts flagged as hard to the escalation model."""
+        model = RoutedModel(answering("cheap"), escalate=answering("strong"))
+
+        with agent.override(model=model):
+            easy = await agent.run("Hi")
+            hard = await agent.run("Explain why the sky is blue, step by step")
+
+        assert easy.output == "cheap"
+        assert hard.output == "strong"
+        assert model.decisions[-1].reason == "escalated"
+
+    def test_create_agent_with_fallbacks(self):
+        """Should route when fallbacks are configured."""
+        agent = create_agent(
+            output_type=str,
+            api_key=SecretStr("secret-api-key"),
+            model_name="gpt-4o-mini",
+            fallback_models=["gpt-4o"],
+            hedge_after=2.0,
+        )
+
+        assert isinstance(agent.model, RoutedModel)
+        assert [m.model_name for m in agent.model.models] == ["gpt-4o-mini", "gpt-4o"]
+        assert agent.model.hedge_after == 2.0
+        assert agent.model.profile == agent.model.models[0].profile
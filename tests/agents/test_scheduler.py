@@ -0,0 +1,301 @@
+"""Tests for the model request scheduler."""
+
+import asyncio
+
+import httpx
+import pytest
+from pydantic import SecretStr
+from pydantic_ai import models
+from pydantic_ai.exceptions import ModelAPIError, ModelHTTPError
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from nestor.agents import create_agent
+from nestor.agents import scheduler as scheduler_module
+from nestor.agents.scheduler import (
+    Priority,
+    RequestScheduler,
+    ScheduledModel,
+    TokenBucket,
+    retry_after,
+    scheduling,
+)
+
+models.ALLOW_MODEL_REQUESTS = False
+
+
+def rate_limit_error(headers: dict[str, str]) -> ModelHTTPError:
+    """A 429 error chained from a response carrying `headers`."""
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers=headers, request=request)
+    error = ModelHTTPError(status_code=429, model_name="test")
+    error.__cause__ = httpx.HTTPStatusError("429", request=request, response=response)
+    return error
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket."""
+
+    def test_starts_full(self):
+        """Should admit up to capacity immediately."""
+        bucket = TokenBucket(per_minute=60)
+
+        assert bucket.delay(60) == 0
+
+    def test_delay_after_consume(self):
+        """Should wait for refill once empty."""
+        bucket = TokenBucket(per_minute=60)
+        bucket.consume(60)
+
+        assert bucket.delay(1) == pytest.approx(1, abs=0.05)
+
+    def test_oversized_requests_wait_for_full_bucket(self):
+        """Should not block forever on amounts above capacity."""
+        bucket = TokenBucket(per_minute=60)
+        bucket.consume(60)
+
+        assert bucket.delay(1000) == pytest.approx(60, abs=0.1)
+
+
+class TestRequestScheduler:
+    """Tests for RequestScheduler."""
+
+    @pytest.mark.asyncio
+    async def test_unlimited_grants_immediately(self):
+        """Should not queue without limits."""
+        scheduler = RequestScheduler()
+
+        waits = await asyncio.gather(*(scheduler.acquire(100) for _ in range(10)))
+
+        assert max(waits) < 0.01
+        assert scheduler.stats.granted == 10
+
+    @pytest.mark.asyncio
+    async def test_interactive_before_batch(self):
+        """Should serve interactive requests before queued batch ones."""
+        scheduler = RequestScheduler(rpm=600)  # One request every 0.1s
+        scheduler.requests.consume(600)
+        order = []
+
+        async def request(name, priority):
+            await scheduler.acquire(priority=priority)
+            order.append(name)
+
+        batch = asyncio.create_task(request("batch", Priority.BATCH))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(request("chat", Priority.INTERACTIVE))
+        await asyncio.gather(batch, interactive)
+
+        assert order == ["chat", "batch"]
+
+    @pytest.mark.asyncio
+    async def test_fair_across_sessions(self):
+        """Should round-robin between sessions of the same class."""
+        scheduler = RequestScheduler(rpm=6000)
+        scheduler.requests.consume(6000)
+        order = []
+
+        async def request(session):
+            await scheduler.acquire(session=session)
+            order.append(session)
+
+        tasks = [asyncio.create_task(request("greedy")) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("polite")))
+        await asyncio.gather(*tasks)
+
+        assert order[:2] == ["greedy", "polite"]
+
+    @pytest.mark.asyncio
+    async def test_backoff_pauses_dispatch(self):
+        """Should hold requests until the backoff expires."""
+        scheduler = RequestScheduler()
+        scheduler.backoff(0.05)
+
+        waited = await scheduler.acquire()
+
+        assert waited >= 0.04
+        assert scheduler.stats.rate_limited == 1
+        assert scheduler.stats.wait_percentile(95) == waited
+
+    @pytest.mark.asyncio
+    async def test_settle_charges_actual_usage(self):
+        """Should debit tokens used above the estimate."""
+        scheduler = RequestScheduler(tpm=1000)
+
+        await scheduler.acquire(100)
+        scheduler.settle(100, 400)
+
+        assert scheduler.tokens.level == pytest.approx(600, abs=1)
+
+
+class TestRetryAfter:
+    """Tests for retry_after."""
+
+    def test_seconds(self):
+        """Should parse retry-after seconds."""
+        assert retry_after(rate_limit_error({"retry-after": "2"})) == 2
+
+    def test_milliseconds(self):
+        """Should prefer retry-after-ms."""
+        error = rate_limit_error({"retry-after-ms": "250", "retry-after": "1"})
+
+        assert retry_after(error) == 0.25
+
+    def test_missing(self):
+        """Should return None without headers."""
+        assert retry_after(ModelHTTPError(status_code=429, model_name="x")) is None
+
+
+class TestScheduledModel:
+    """Tests for ScheduledModel."""
+
+    @pytest.mark.asyncio
+    async def test_requeues_rate_limited_requests(self):
+        """Should back off and retry after a 429."""
+        calls = 0
+
+        def respond(messages, info):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise rate_limit_error({"retry-after-ms": "10"})
+            return ModelResponse(parts=[TextPart("Hello")])
+
+        scheduler = RequestScheduler()
+        agent = create_agent(output_type=str, api_key=SecretStr("secret-api-key"))
+
+        with agent.override(model=ScheduledModel(FunctionModel(respond), scheduler)):
+            result = await agent.run("Hi")
+
+        assert result.output == "Hello"
+        assert calls == 2
+        assert scheduler.stats.rate_limited == 1
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self):
+        """Should raise once rate-limit retries are exhausted."""
+
+        def respond(messages, info):
+            raise rate_limit_error({"retry-after-ms": "1"})
+
+        model = ScheduledModel(
+            FunctionModel(respond), RequestScheduler(), max_retries=1
+        )
+        agent = create_agent(output_type=str, api_key=SecretStr("secret-api-key"))
+
+        with agent.override(model=model), pytest.raises(ModelHTTPError):
+            await agent.run("Hi")
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "error",
+        [
+            ModelHTTPError(status_code=503, model_name="test"),
+            ModelAPIError(model_name="test", message="Connection error."),
+        ],
+    )
+    async def test_retries_transient_errors(self, error, monkeypatch):
+        """Should retry server and connection errors, since the SDK won't."""
+        monkeypatch.setattr(scheduler_module, "DEFAULT_BACKOFF", 0.001)
+        calls = 0
+
+        def respond(messages, info):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise error
+            return ModelResponse(parts=[TextPart("Hello")])
+
+        scheduler = RequestScheduler()
+        agent = create_agent(output_type=str, api_key=SecretStr("secret-api-key"))
+
+        with agent.override(model=ScheduledModel(FunctionModel(respond), scheduler)):
+            result = await agent.run("Hi")
+
+        assert result.output == "Hello"
+        assert calls == 2
+        assert scheduler.stats.rate_limited == 0
+
+    @pytest.mark.asyncio
+    async def test_retries_streams_until_open(self, monkeypatch):
+        """Should retry a stream that fails before its first event."""
+        monkeypatch.setattr(scheduler_module, "DEFAULT_BACKOFF", 0.001)
+        calls = 0
+
+        async def stream(messages, info):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise ModelHTTPError(status_code=502, model_name="test")
+            yield "Hello"
+
+        model = ScheduledModel(
+            FunctionModel(stream_function=stream), RequestScheduler()
+        )
+        agent = create_agent(output_type=str, api_key=SecretStr("secret-api-key"))
+
+        with agent.override(model=model):
+            async with agent.run_stream("Hi") as result:
+                output = await result.get_output()
+
+        assert output == "Hello"
+        assert calls == 2
+
+    @pytest.mark.asyncio
+    async def test_does_not_retry_client_errors(self):
+        """Should raise errors a retry can't fix right away."""
+        calls = 0
+
+        def respond(messages, info):
+            nonlocal calls
+            calls += 1
+            raise ModelHTTPError(status_code=400, model_name="test")
+
+        model = ScheduledModel(FunctionModel(respond), RequestScheduler())
+        agent = create_agent(output_type=str, api_key=SecretStr("secret-api-key"))
+
+        with agent.override(model=model), pytest.raises(ModelHTTPError):
+            await agent.run("Hi")
+
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_uses_scheduling_context(self):
+        """Should queue requests under the current priority and session."""
+        scheduler = RequestScheduler()
+        seen = []
+        acquire = scheduler.acquire
+
+        async def spy(tokens=0, **kwargs):
+            seen.append(kwargs)
+            return await acquire(tokens, **kwargs)
+
+        scheduler.acquire = spy
+        model = ScheduledModel(
+            FunctionModel(lambda m, i: ModelResponse(parts=[TextPart("ok")])),
+            scheduler,
+        )
+        agent = create_agent(output_type=str, api_key=SecretStr("secret-api-key"))
+
+        with (
+            agent.override(model=model),
+            scheduling(priority=Priority.BATCH, session="digest"),
+        ):
+            await agent.run("Hi")
+
+        assert seen == [{"priority": Priority.BATCH, "session": "digest"}]
+
+    def test_create_agent_with_scheduler(self):
+        """Should wrap the model when a scheduler is given."""
+        scheduler = RequestScheduler(rpm=10)
+        agent = create_agent(
+            output_type=str,
+            api_key=SecretStr("secret-api-key"),
+            model_name="gpt-4o-mini",
+            scheduler=scheduler,
+        )
+
+        assert isinstance(agent.model, ScheduledModel)
+        assert agent.model.scheduler is scheduler
+        assert agent.model.model_name == "gpt-4o-mini"
@@ -0,0 +1,138 @@
+"""Tests for per-run tool selection."""
+
+import pytest
+from pydantic import SecretStr
+from pydantic_ai import models
+from pydantic_ai.messages import (
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from nestor.agents.assistant import TOOL_GROUPS, TOOLS, create_assistant_agent
+from nestor.agents.selection import ToolSelector
+
+models.ALLOW_MODEL_REQUESTS = False
+
+ALL_TOOLS = sorted(func.__name__ for func, _ in TOOLS)
+
+
+def turn(prompt: str, *tools: str) -> list:
+    """A past conversation turn calling the given tools."""
+    return [
+        ModelRequest(parts=[UserPromptPart(prompt)]),
+        ModelResponse(parts=[ToolCallPart(tool, {}) for tool in tools]),
+        ModelResponse(parts=[TextPart("ok")]),
+    ]
+
+
+def names(groups) -> list[str] | None:
+    return None if groups is None else [group.name for group in groups]
+
+
+class TestToolSelector:
+    """Tests for ToolSelector.select."""
+
+    selector = ToolSelector(TOOL_GROUPS)
+
+    @pytest.mark.parametrize(
+        ("prompt", "expected"),
+        [
+            ("What time is it in Tokyo?", ["time"]),
+            ("Will it rain in Segovia tomorrow?", ["time", "weather"]),
+            ("Summarize https://example.com/post", ["time", "search"]),
+            ("Latest news about the weather in Spain", ["time", "weather", "search"]),
+            ("Who was Dante Alighieri?", None),
+            ("Hello", None),
+        ],
+    )
+    def test_prompt(self, prompt, expected):
+        """Should expose matching groups, with time, or all tools."""
+        assert names(self.selector.select(prompt)) == expected
+
+    @pytest.mark.parametrize(
+        ("prompt", "expected"),
+        [
+            ("What time does the Prado museum open?", ["time", "search"]),
+            (
+                "What is the date of the next Champions League final?",
+                ["time", "search"],
+            ),
+            ("What day is the Eurovision final this year?", ["time", "search"]),
+            (
+                "How warm is the Mediterranean in June, and what are the best beaches?",
+                ["time", "weather", "search"],
+            ),
+        ],
+    )
+    def test_keeps_search_for_unexplained_words(self, prompt, expected):
+        """Should keep search when a pattern matches only part of the prompt."""
+        assert names(self.selector.select(prompt)) == expected
+
+    def test_follow_up_keeps_recent_tools(self):
+        """Should keep groups called in recent turns."""
+        history = turn("Weather in Segovia?", "get_weather")
+
+        assert names(self.selector.select("And tomorrow?", history)) == [
+            "time",
+            "weather",
+        ]
+
+    def test_only_grows_within_conversation(self):
+        """Should keep the groups of every earlier prompt."""
+        history = [
+            *turn("Will it rain in Segovia?", "get_weather"),
+            *turn("What time is it?", "get_current_time"),
+            *turn("Thanks!"),
+        ]
+
+        assert names(self.selector.select("What day is it?", history)) == [
+            "time",
+            "weather",
+        ]
+
+    def test_all_tools_stay_exposed(self):
+        """Should keep all tools once an earlier prompt needed them."""
+        history = turn("Who was Dante Alighieri?")
+
+        assert self.selector.select("What time is it?", history) is None
+
+
+class ToolSpy:
+    """Model recording the tools of every request."""
+
+    def __init__(self):
+        self.tools: list[list[str]] = []
+
+    def respond(self, messages, info: AgentInfo) -> ModelResponse:
+        self.tools.append([tool.name for tool in info.function_tools])
+        return ModelResponse(parts=[TextPart("ok")])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("prompt", "select_tools", "expected"),
+    [
+        (
+            "What time is it?",
+            True,
+            ["get_current_date", "get_current_time", "get_current_times"],
+        ),
+        ("Tell me a joke", True, ALL_TOOLS),
+        ("What time is it?", False, ALL_TOOLS),
+    ],
+)
+async def test_agent_sends_selected_tools(deps, prompt, select_tools, expected):
+    """Should only send the selected tools, in stable order."""
+    spy = ToolSpy()
+    agent = create_assistant_agent(
+        api_key=SecretStr("secret-api-key"), select_tools=select_tools
+    )
+
+    with agent.override(model=FunctionModel(spy.respond)):
+        await agent.run(prompt, deps=deps)
+
+    assert spy.tools == [expected]
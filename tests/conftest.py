@@ -1,6 +1,22 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import httpx
 import pytest
 
+from nestor import http
+from nestor.agents.scheduler import TokenBucket
 from nestor.dependencies import AssistantDeps
+from nestor.tools import weather
+from nestor.upstream import DDGS, OPEN_METEO
+
+
+@pytest.fixture(autouse=True)
+def upstream_rates():
+    """Fresh upstream rate limits, so tests don't wait on earlier requests."""
+    for upstream in (OPEN_METEO, DDGS):
+        upstream.bucket = TokenBucket(upstream.per_minute, upstream.burst)
 
 
 @pytest.fixture
@@ -11,3 +27,99 @@ def deps():
         safesearch="moderate",
         default_location="Madrid",
     )
+
+
+class FakeOpenMeteo:
+    """In-memory Open-Meteo API recording every request."""
+
+    def __init__(self):
+        self.calls: list[httpx.Request] = []
+        self.start = datetime.now(UTC).date()
+        self.fail = False
+        self.delay = 0.0
+
+    def requests(self, api: str) -> list[httpx.Request]:
+        """Recorded requests for an API endpoint."""
+        return [r for r in self.calls if str(r.url).startswith(api)]
+
+    def __call__(self, request: httpx.Request):
+        if self.delay:
+            return self._delayed(request)
+        return self._respond(request)
+
+    async def _delayed(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.delay)
+        return self._respond(request)
+
+    def _respond(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request)
+        params = request.url.params
+
+        if str(request.url).startswith(weather.GEOCODING_API):
+            if params["name"] == "Nowhere":
+                return httpx.Response(200, json={})
+            return httpx.Response(
+                200,
+                json={
+                    "results": [
+                        {
+                            "name": params["name"],
+                            "country": "Spain",
+                            "latitude": 40.0 + len(params["name"]) / 100,
+                            "longitude": -3.7,
+                            "elevation": 657.0,
+                        }
+                    ]
+                },
+            )
+
+        if self.fail:
+            return httpx.Response(500, json={"error": True, "reason": "Boom"})
+
+        if "daily" in params:
+            n = int(params["forecast_days"])
+            dates = [(self.start + timedelta(days=i)).isoformat() for i in range(n)]
+            variables = params["daily"].split(",")
+            daily = {v: [1] * n for v in variables}
+            forecasts = [
+                {
+                    "latitude": float(lat),
+                    "utc_offset_seconds": 0,
+                    "daily": {"time": dates, **daily},
+                }
+                for lat in params["latitude"].split(",")
+            ]
+            # Like Open-Meteo: a list for several locations
+            return httpx.Response(
+                200, json=forecasts if len(forecasts) > 1 else forecasts[0]
+            )
+
+        date = params["start_date"]
+        times = [f"{date}T{h:02d}:00" for h in range(24)]
+        variables = params["hourly"].split(",")
+        hourly = {v: [1] * 24 for v in variables}
+        return httpx.Response(
+            200,
+            json={"utc_offset_seconds": 0, "hourly": {"time": times, **hourly}},
+        )
+
+
+@pytest.fixture
+def open_meteo():
+    """Route Open-Meteo requests to an in-memory fake, with cold caches."""
+    fake = FakeOpenMeteo()
+
+    for cached in (weather.geocode, weather.request_daily, weather.request_hourly):
+        cached.cache_clear()
+    weather.daily_variables_seen.clear()
+    weather.hourly_variables_seen.clear()
+
+    with patch.object(http, "transport", httpx.MockTransport(fake)):
+        http.reset()
+        yield fake
+
+    http.reset()
+    for cached in (weather.geocode, weather.request_daily, weather.request_hourly):
+        cached.cache_clear()
+    weather.daily_variables_seen.clear()
+    weather.hourly_variables_seen.clear()
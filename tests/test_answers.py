@@ -0,0 +1,167 @@
+import dataclasses
+from unittest.mock import patch
+
+import pytest
+from pydantic import SecretStr
+from pydantic_ai import models
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.test import TestModel
+
+from nestor.agents.assistant import create_assistant_agent
+from nestor.answers import (
+    STATIC_TTL,
+    AnswerCache,
+    answer_ttl,
+    history_fingerprint,
+    normalize_prompt,
+)
+from nestor.deadline import Deadline
+from nestor.ledger import recording
+from nestor.tools.weather import FORECAST_TTL
+from nestor.tools.websearch import SEARCH_TTL
+
+models.ALLOW_MODEL_REQUESTS = False
+
+
+@pytest.fixture
+def agent():
+    return create_assistant_agent(api_key=SecretStr("secret-api-key"))
+
+
+async def run(agent, prompt, deps, tools: list[str], history=None):
+    with agent.override(model=TestModel(call_tools=tools)):
+        return await agent.run(prompt, deps=deps, message_history=history)
+
+
+def calls(*parts: ToolCallPart) -> list[ModelResponse]:
+    return [ModelResponse(parts=list(parts))]
+
+
+class TestNormalization:
+    """Tests for prompt and history normalization."""
+
+    def test_normalize_prompt(self):
+        """Should ignore case, punctuation and spacing."""
+        assert normalize_prompt("  Who was Dante   Alighieri?! ") == (
+            "who was dante alighieri"
+        )
+
+    def test_history_fingerprint_uses_recent_turns(self):
+        """Should only depend on the last turns."""
+        assert history_fingerprint(None) == history_fingerprint([])
+
+
+class TestAnswerTtl:
+    """Tests for tool-derived TTLs."""
+
+    def test_no_tools_is_static(self):
+        """Should keep knowledge answers for long."""
+        assert answer_ttl([]) == STATIC_TTL
+
+    def test_shortest_tool_wins(self):
+        """Should expire with the most time-sensitive tool."""
+        messages = calls(
+            ToolCallPart("web_search", {"query": "dante"}),
+            ToolCallPart("get_weather", {"location": "Madrid"}),
+        )
+
+        assert answer_ttl(messages) == FORECAST_TTL
+
+    def test_clock_is_never_cached(self):
+        """Should not reuse answers about the current time."""
+        assert answer_ttl(calls(ToolCallPart("get_current_time", {}))) == 0
+
+    def test_recent_searches_expire_fast(self):
+        """Should treat time-limited searches as news."""
+        messages = calls(ToolCallPart("web_search", {"query": "x", "timelimit": "d"}))
+
+        assert answer_ttl(messages) == SEARCH_TTL
+
+    def test_unknown_tools_are_never_cached(self):
+        """Should be conservative with tools it doesn't know."""
+        assert answer_ttl(calls(ToolCallPart("fetch_stock_price", {}))) == 0
+
+
+class TestAnswerCache:
+    """Tests for AnswerCache."""
+
+    @pytest.mark.asyncio
+    async def test_serves_repeated_prompt(self, agent, deps):
+        """Should answer a repeat of a cached prompt."""
+        cache = AnswerCache()
+        result = await run(agent, "Who was Dante?", deps, tools=[])
+
+        assert cache.store("Who was Dante?", deps, None, result)
+        hit = cache.lookup("who was dante", deps)
+
+        assert hit is not None
+        assert hit.output == result.output
+        assert hit.model == "test"
+        assert len(hit.messages("who was dante")) == 2
+
+    @pytest.mark.asyncio
+    async def test_skips_time_sensitive_runs(self, agent, deps):
+        """Should not cache answers that read the clock."""
+        cache = AnswerCache()
+        result = await run(agent, "Time?", deps, tools=["get_current_time"])
+
+        assert not cache.store("Time?", deps, None, result)
+        assert cache.lookup("Time?", deps) is None
+
+    @pytest.mark.asyncio
+    async def test_expires_with_tool_ttl(self, agent, deps, open_meteo):
+        """Should expire weather answers with the forecast cadence."""
+        cache = AnswerCache()
+        result = await run(agent, "Weather?", deps, tools=["get_weather"])
+        cache.store("Weather?", deps, None, result)
+
+        with patch("nestor.cache.time.monotonic", return_value=1e12):
+            assert cache.lookup("Weather?", deps) is None
+
+    @pytest.mark.asyncio
+    async def test_keyed_by_deps_and_history(self, agent, deps):
+        """Should not share answers across settings or conversations."""
+        cache = AnswerCache()
+        result = await run(agent, "Who was Dante?", deps, tools=[])
+        cache.store("Who was Dante?", deps, None, result)
+
+        other = dataclasses.replace(deps, default_location="Segovia")
+        assert cache.lookup("Who was Dante?", other) is None
+        assert cache.lookup("Who was Dante?", deps, result.all_messages()) is None
+        # Deadlines vary per run and don't affect answers
+        timed = dataclasses.replace(deps, deadline=Deadline.after(10))
+        assert cache.lookup("Who was Dante?", timed) is not None
+
+    @pytest.mark.asyncio
+    async def test_near_duplicates(self, agent, deps):
+        """Should serve similar prompts only when enabled."""
+        prompt = "who was the italian poet dante alighieri"
+        exact, fuzzy = AnswerCache(), AnswerCache(near_duplicates=True)
+        result = await run(agent, prompt, deps, tools=[])
+        exact.store(prompt, deps, None, result)
+        fuzzy.store(prompt, deps, None, result)
+
+        similar = "who was the italian poet dante alighieri exactly"
+        assert exact.lookup(similar, deps) is None
+        assert fuzzy.lookup(similar, deps) is not None
+        assert fuzzy.near_hits == 1
+        assert fuzzy.lookup("who was the italian poet petrarca", deps) is None
+
+    @pytest.mark.asyncio
+    async def test_near_duplicates_require_same_numbers(self, agent, deps):
+        """Should not mix answers about different dates or hours."""
+        cache = AnswerCache(near_duplicates=True, similarity=0.5)
+        prompt = "what happened in spain in 1492"
+        result = await run(agent, prompt, deps, tools=[])
+        cache.store(prompt, deps, None, result)
+
+        assert cache.lookup("what happened in spain in 1493", deps) is None
+
+    def test_hit_recorded_in_ledger(self):
+        """Should record cached answers without tokens."""
+        with recording() as recorder:
+            record = recorder.finish_cached("gpt-5-nano")
+
+        assert record.answer_cached
+        assert record.input_tokens == 0
+        assert record.model == "gpt-5-nano"
@@ -0,0 +1,135 @@
+import sqlite3
+import time
+
+"""Tests for batch mode and the shared store."""
+
+import pytest
+from click.testing import CliRunner
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from nestor import cli, shared
+from nestor.batch import BatchResult, run_batch
+from nestor.shared import SharedStore, shared_get, shared_set
+from nestor.tools import weather
+
+
+def echo_model() -> FunctionModel:
+    """Model answering with the prompt (created in each worker)."""
+
+    def respond(messages, info) -> ModelResponse:
+        return ModelResponse(
+            parts=[TextPart(f"echo: {messages[-1].parts[-1].content}")]
+        )
+
+    return FunctionModel(respond)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Shared store that tools use."""
+    store = SharedStore(tmp_path / "shared.sqlite")
+    monkeypatch.setattr(shared, "store", store)
+    yield store
+    store.close()
+
+
+class TestSharedStore:
+    """Tests for the on-disk store."""
+
+    def test_round_trip_and_expiry(self, store):
+        """Should return values until they expire."""
+        store.set("ns", ("a", 1), {"x": [1, 2]}, ttl=60)
+        store.set("ns", "old", "value", ttl=-1)
+
+        assert store.get("ns", ("a", 1)) == {"x": [1, 2]}
+        assert store.get("other", ("a", 1)) is None
+        assert store.get("ns", "old") is None
+        assert store.purge() == 1
+
+    def test_buckets_are_shared(self, store):
+        """Should share token bucket levels between processes (connections)."""
+        other = SharedStore(store.path)
+
+        store.bucket("api", per_minute=60, capacity=2).consume(2)
+
+        assert other.bucket("api", per_minute=60, capacity=2).delay(1) > 0.5
+        other.close()
+
+    def test_bucket_update_never_blocks(self, store):
+        """Should defer updates while another process holds the write lock."""
+        bucket = store.bucket("api", per_minute=60, capacity=2)
+        other = sqlite3.connect(store.path, isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+
+        start = time.perf_counter()
+        bucket.consume(2)
+
+        assert time.perf_counter() - start < 1
+        assert bucket.delay(1) > 0.5
+        other.execute("COMMIT")
+        bucket.consume(0)
+        assert store.bucket("api", per_minute=60, capacity=2).delay(1) > 0.5
+        other.close()
+
+    def test_helpers_without_store(self, monkeypatch):
+        """Should do nothing when no store is open."""
+        monkeypatch.setattr(shared, "store", None)
+
+        shared_set("ns", "key", "value", ttl=60)
+
+        assert shared_get("ns", "key") is None
+
+    @pytest.mark.asyncio
+    async def test_second_cache_tier(self, store, open_meteo):
+        """Should serve tool calls another process already made."""
+        await weather.geocode("Segovia")
+        weather.geocode.cache_clear()  # As if in another process
+
+        await weather.geocode("Segovia")
+
+        assert len(open_meteo.requests(weather.GEOCODING_API)) == 1
+
+
+def test_run_batch(tmp_path, monkeypatch):
+    """Should answer every prompt across workers, in input order."""
+    # Workers build the configured agent before the model is swapped in
+    monkeypatch.setenv("NESTOR_OPENAI_API_KEY", "secret-api-key")
+    prompts = [f"prompt {i}" for i in range(7)]
+
+    results = list(
+        run_batch(
+            prompts,
+            store_path=tmp_path / "batch.sqlite",
+            workers=2,
+            chunk_size=2,
+            model=echo_model,
+        )
+    )
+
+    assert [r.index for r in results] == list(range(7))
+    assert [r.output for r in results] == [f"echo: {p}" for p in prompts]
+    assert all(r.error is None for r in results)
+
+
+def test_batch_command(tmp_path, monkeypatch):
+    """Should answer a prompts file, indexing results by input line."""
+
+    def answer(prompts, **kwargs):
+        for index, prompt in enumerate(prompts):
+            yield BatchResult(index=index, prompt=prompt, output=f"echo: {prompt}")
+
+    monkeypatch.setattr(cli, "run_batch", answer)
+    prompts = tmp_path / "prompts.txt"
+    prompts.write_text("first\n\n  \nsecond\n")
+
+    result = CliRunner().invoke(
+        cli.cli, ["batch", str(prompts), "--store", str(tmp_path / "batch.sqlite")]
+    )
+
+    assert result.exit_code == 0, result.output
+    results = [
+        BatchResult.model_validate_json(line) for line in result.stdout.splitlines()
+    ]
+    assert [r.output for r in results] == ["echo: first", "echo: second"]
+    assert [r.index for r in results] == [0, 3]
@@ -0,0 +1,135 @@
+import asyncio
+import dataclasses
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pydantic import SecretStr
+from pydantic_ai import models
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+from pydantic_ai.models.test import TestModel
+
+from nestor.agents.assistant import create_assistant_agent
+from nestor.deadline import Deadline, run_with_deadline, tool_timeout, within
+from nestor.tools.weather import get_weather
+from nestor.tools.websearch import ddgs_pool, web_search
+
+models.ALLOW_MODEL_REQUESTS = False
+
+
+class TestDeadline:
+    """Tests for Deadline."""
+
+    def test_remaining(self):
+        """Should count down from the budget."""
+        deadline = Deadline.after(10)
+
+        assert 9.9 < deadline.remaining() <= 10
+        assert not deadline.expired
+
+    def test_default_reserve(self):
+        """Should reserve a quarter of short budgets, capped for long ones."""
+        assert Deadline.after(4).reserve == 1
+        assert Deadline.after(100).reserve == 5
+
+    def test_tool_remaining_excludes_reserve(self):
+        """Should leave the reserve for the final answer."""
+        deadline = Deadline.after(10, reserve=3)
+
+        assert 6.9 < deadline.tool_remaining() <= 7
+
+    def test_expired(self):
+        """Should never report negative time."""
+        deadline = Deadline(at=time.monotonic() - 1)
+
+        assert deadline.expired
+        assert deadline.remaining() == 0
+        assert deadline.tool_remaining() == 0
+
+    def test_tool_timeout(self):
+        """Should cap the operation timeout by the time left."""
+        assert tool_timeout(None, 30) == 30
+        assert tool_timeout(Deadline.after(100, reserve=0), 30) == 30
+        assert tool_timeout(Deadline.after(2, reserve=0), 30) <= 2
+
+    @pytest.mark.asyncio
+    async def test_within_cancels_work(self):
+        """Should raise TimeoutError once tool time is up."""
+        with pytest.raises(TimeoutError):
+            async with within(Deadline.after(0.05, reserve=0)):
+                await asyncio.sleep(1)
+
+    @pytest.mark.asyncio
+    async def test_within_without_deadline(self):
+        """Should not limit work without a deadline."""
+        async with within(None):
+            await asyncio.sleep(0)
+
+
+class TestToolDeadlines:
+    """Tests for deadline handling in tools."""
+
+    @pytest.mark.asyncio
+    async def test_weather_returns_none_on_deadline(self, deps, open_meteo):
+        """Should give up on slow upstreams instead of hanging."""
+        open_meteo.delay = 1.0
+        deps = dataclasses.replace(deps, deadline=Deadline.after(0.05, reserve=0))
+
+        start = time.monotonic()
+        result = await get_weather(MagicMock(deps=deps))
+
+        assert result is None
+        assert time.monotonic() - start < 0.5
+
+    @pytest.mark.asyncio
+    async def test_search_returns_empty_on_deadline(self, deps):
+        """Should abandon the search thread when time is up."""
+        deps = dataclasses.replace(deps, deadline=Deadline.after(0.05, reserve=0))
+        ddgs_pool.clear()
+
+        with patch("nestor.tools.websearch.DDGS") as MockDDGS:
+            MockDDGS.return_value.text.side_effect = lambda *a, **kw: time.sleep(0.5)
+            start = time.monotonic()
+            results = await web_search(
+                MagicMock(deps=deps),
+                "slow",
+                max_results=5,
+                region="ww-en",
+                timelimit=None,
+            )
+
+        assert results == []
+        assert time.monotonic() - start < 0.4
+        assert MockDDGS.call_args.kwargs["timeout"] == 1
+
+
+class TestRunWithDeadline:
+    """Tests for run_with_deadline."""
+
+    @pytest.mark.asyncio
+    async def test_passes_deadline_to_tools(self, deps, open_meteo):
+        """Should attach the deadline to deps without mutating the original."""
+        agent = create_assistant_agent(api_key=SecretStr("secret-api-key"))
+
+        with agent.override(model=TestModel(call_tools=["get_weather"])):
+            with patch("nestor.tools.weather.within", wraps=within) as spy:
+                await run_with_deadline(agent, "Weather?", deps=deps, timeout=10)
+
+        deadline = spy.call_args.args[0]
+        assert isinstance(deadline, Deadline)
+        assert deps.deadline is None
+
+    @pytest.mark.asyncio
+    async def test_cancels_slow_runs(self, deps):
+        """Should raise TimeoutError if the run doesn't finish in time."""
+
+        async def hang(messages, info):
+            await asyncio.sleep(1)
+            return ModelResponse(parts=[TextPart("late")])
+
+        agent = create_assistant_agent(api_key=SecretStr("secret-api-key"))
+
+        with agent.override(model=FunctionModel(function=hang)):
+            with pytest.raises(TimeoutError):
+                await run_with_deadline(agent, "Hi", deps=deps, timeout=0.05)
@@ -0,0 +1,117 @@
+import sys
+
+import pytest
+from pydantic_ai.messages import (
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+from nestor import diagnostics
+from nestor.cache import TTLCache
+from nestor.diagnostics import AllocationTracker, memory_report, subsystem
+from nestor.history import trim_history
+from nestor.tools import weather
+from nestor.tools.websearch import ClientPool
+
+
+class TestMemoryReport:
+    """Tests for memory_report."""
+
+    def test_reports_caches_and_registered(self, monkeypatch):
+        """Should include built-in caches and embedder structures."""
+        monkeypatch.setattr(diagnostics, "_sizers", {})
+        diagnostics.register("tenancy", lambda: 7)
+
+        report = memory_report()
+
+        assert {"geocode", "search", "pages", "ddgs_clients"} <= set(report.caches)
+        assert report.caches["tenancy"] == 7
+        assert "nestor.dependencies.AssistantDeps" in report.objects
+        assert "tenancy: 7" in report.format()
+
+    def test_geocode_cache_is_bounded(self):
+        """Should never cache an unbounded number of locations."""
+        assert weather.geocode.cache_info().maxsize == weather.GEOCODE_CACHE_SIZE
+
+
+class TestAllocationTracker:
+    """Tests for AllocationTracker."""
+
+    def test_subsystem(self):
+        """Should map files to Néstor modules or third-party packages."""
+        assert subsystem("/app/src/nestor/tools/weather.py") == "nestor.tools.weather"
+        assert subsystem("/venv/lib/site-packages/httpx/_client.py") == "httpx"
+        assert subsystem("<frozen importlib._bootstrap>") == "other"
+        assert subsystem(f"{sys.prefix}/lib/python3/json/decoder.py") == "stdlib"
+
+    def test_attributes_growth(self):
+        """Should attribute retained allocations to the allocating module."""
+        cache: TTLCache[int, int] = TTLCache(maxsize=1000, ttl=60)
+        tracker = AllocationTracker()
+        tracker.start()
+        try:
+            for i in range(1000):
+                cache.set(i, i)
+            growth = {g.subsystem: g.count for g in tracker.growth()}
+        finally:
+            tracker.stop()
+
+        assert growth["nestor.cache"] >= 1000
+
+    def test_requires_start(self):
+        """Should refuse to diff without a baseline."""
+        with pytest.raises(RuntimeError):
+            AllocationTracker().growth()
+
+
+class TestClientPool:
+    """Tests for the DDGS client pool."""
+
+    def test_reuses_clients(self):
+        """Should hand back idle clients per timeout, up to the idle limit."""
+        pool = ClientPool(max_idle=1, factory=lambda timeout: object())
+
+        with pool.client(5) as first:
+            pass
+        with pool.client(5) as second, pool.client(5) as third:
+            pass
+        with pool.client(10) as other:
+            pass
+
+        assert second is first
+        assert third is not first
+        assert other is not first
+        assert len(pool) == 2
+
+
+def turn(prompt: str, tool: bool = False) -> list:
+    messages: list = [ModelRequest(parts=[UserPromptPart(prompt)])]
+    if tool:
+        messages += [
+            ModelResponse(parts=[ToolCallPart("get_current_date", {}, "call")]),
+            ModelRequest(parts=[ToolReturnPart("get_current_date", "today", "call")]),
+        ]
+    return messages + [ModelResponse(parts=[TextPart(f"Answer to {prompt}")])]
+
+
+class TestTrimHistory:
+    """Tests for trim_history."""
+
+    def test_keeps_last_turns_whole(self):
+        """Should drop whole turns, keeping tool calls with their returns."""
+        messages = turn("a") + turn("b", tool=True) + turn("c")
+
+        trimmed = trim_history(messages, 2)
+
+        assert trimmed == messages[2:]
+
+    def test_short_history(self):
+        """Should return short histories unchanged."""
+        messages = turn("a")
+
+        assert trim_history(messages, 2) is messages
+        assert trim_history(messages, 0) == []
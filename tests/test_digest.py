@@ -0,0 +1,79 @@
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from nestor.digest import Subscriber, build_digests
+from nestor.tools.weather import FORECAST_API, GEOCODING_API
+
+SUBSCRIBERS = [
+    Subscriber(id="ana", location="Madrid", name="Ana"),
+    Subscriber(id="bea", location="Segovia"),
+    Subscriber(id="carlos", location=" madrid"),
+    Subscriber(id="dani", location="Nowhere"),
+    Subscriber(id="eva", location="Segovia"),
+]
+
+
+class TestBuildDigests:
+    """Tests for build_digests."""
+
+    @pytest.mark.asyncio
+    async def test_shares_work_per_location(self, open_meteo):
+        """Should geocode and fetch each location once, in one forecast request."""
+        _, report = await build_digests(SUBSCRIBERS)
+
+        assert len(open_meteo.requests(GEOCODING_API)) == 3
+        [forecast] = open_meteo.requests(FORECAST_API)
+        assert forecast.url.params["latitude"].count(",") == 1
+        assert (report.queries, report.locations, report.forecast_requests) == (3, 2, 1)
+        assert report.dedup_ratio == 2.0
+        assert report.failed == 1
+
+    @pytest.mark.asyncio
+    async def test_renders_in_input_order(self, open_meteo):
+        """Should render one message per subscriber, reporting failures."""
+        digests, _ = await build_digests(
+            SUBSCRIBERS, template="{name}: {location}, {temp_max:.0f} °C"
+        )
+
+        assert [d.subscriber for d in digests] == [s.id for s in SUBSCRIBERS]
+        assert digests[0].message == "Ana: Madrid, 1 °C"
+        assert digests[1].message == "bea: Segovia, 1 °C"
+        assert digests[3].message is None
+        assert digests[3].error == "location not found"
+
+    @pytest.mark.asyncio
+    async def test_rendering_errors_fail_one_digest(self, open_meteo):
+        """Should report templates that don't fit a field per subscriber."""
+        digests, report = await build_digests(SUBSCRIBERS, template="{name:.0f}")
+
+        assert digests[0].message is None
+        assert "ValueError" in digests[0].error
+        assert report.failed == len(SUBSCRIBERS)
+
+    @pytest.mark.asyncio
+    async def test_summarizes_once_per_location(self, open_meteo):
+        """Should make one model call per location and share its summary."""
+        calls = []
+
+        def respond(messages, info) -> ModelResponse:
+            calls.append(messages)
+            return ModelResponse(parts=[TextPart("Take an umbrella.")])
+
+        agent = Agent(FunctionModel(respond))
+
+        digests, report = await build_digests(
+            SUBSCRIBERS, template="{name}: {summary}", agent=agent
+        )
+
+        assert len(calls) == report.model_calls == 2
+        assert digests[2].message == "carlos: Take an umbrella."
+
+    @pytest.mark.asyncio
+    async def test_rejects_unknown_template_fields(self, open_meteo):
+        """Should fail before any request on unknown template fields."""
+        with pytest.raises(ValueError, match="humidity"):
+            await build_digests(SUBSCRIBERS, template="{name}: {humidity}%")
+
+        assert open_meteo.calls == []
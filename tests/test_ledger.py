@@ -0,0 +1,167 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from pydantic import SecretStr
+from pydantic_ai import models
+from pydantic_ai.models.test import TestModel
+
+from nestor.agents.assistant import create_assistant_agent
+from nestor.ledger import Ledger, RunRecord, ToolCall, recording, summarize
+
+models.ALLOW_MODEL_REQUESTS = False
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    """Ledger in a temporary directory."""
+    return Ledger(tmp_path / "nestor" / "ledger.jsonl")
+
+
+def make_record(day: int = 1, model: str = "gpt-5-nano", **kwargs) -> RunRecord:
+    return RunRecord(
+        timestamp=datetime(2025, 1, day, 12, tzinfo=UTC),
+        model=model,
+        input_tokens=100,
+        output_tokens=10,
+        requests=2,
+        **kwargs,
+    )
+
+
+class TestLedger:
+    """Tests for the Ledger file."""
+
+    def test_append_and_read(self, ledger):
+        """Should round-trip records, creating parent directories."""
+        ledger.append(make_record(tool_calls=[ToolCall(name="x", duration=0.5)]))
+        ledger.append(make_record(day=2))
+
+        records = list(ledger.read())
+
+        assert [r.timestamp.day for r in records] == [1, 2]
+        assert records[0].tool_calls[0].duration == 0.5
+
+    def test_read_since(self, ledger):
+        """Should filter out older records."""
+        for day in (1, 2, 3):
+            ledger.append(make_record(day=day))
+
+        records = ledger.read(since=datetime(2025, 1, 2, tzinfo=UTC))
+
+        assert [r.timestamp.day for r in records] == [2, 3]
+
+    def test_skips_malformed_lines(self, ledger):
+        """Should ignore truncated or foreign lines."""
+        ledger.append(make_record())
+        with ledger.path.open("a") as f:
+            f.write('{"timestamp": \n')
+        ledger.append(make_record(day=2))
+
+        assert len(list(ledger.read())) == 2
+
+    def test_missing_file(self, ledger):
+        """Should read nothing if the ledger doesn't exist yet."""
+        assert list(ledger.read()) == []
+
+
+class TestSummarize:
+    """Tests for summarize."""
+
+    def test_by_day(self):
+        """Should aggregate runs per day."""
+        records = [
+            make_record(day=1, latency=1.0),
+            make_record(day=1, latency=3.0),
+            make_record(day=2, latency=2.0),
+        ]
+
+        rows = summarize(records, by="day")
+
+        assert [r.key for r in rows] == ["2025-01-01", "2025-01-02"]
+        assert rows[0].runs == 2
+        assert rows[0].input_tokens == 200
+        assert rows[0].p50 == 2.0
+
+    def test_by_model(self):
+        """Should aggregate runs per model."""
+        records = [make_record(model="a"), make_record(model="b")]
+
+        assert [r.key for r in summarize(records, by="model")] == ["a", "b"]
+
+    def test_prompt_cache_ratio(self):
+        """Should report the share of input tokens read from the prompt cache."""
+        records = [make_record(cache_read_tokens=50), make_record()]
+
+        assert summarize(records)[0].prompt_cache_ratio == 0.25
+
+    def test_prefetch_hit_rate(self):
+        """Should report the share of speculative requests a tool used."""
+        records = [make_record(prefetch_hits=2, prefetch_wasted=1), make_record()]
+
+        row = summarize(records)[0]
+
+        assert (row.prefetch_hits, row.prefetch_wasted) == (2, 1)
+        assert row.prefetch_hit_rate == pytest.approx(2 / 3)
+
+    def test_by_route(self):
+        """Should aggregate runs per routing decision, once per run."""
+        records = [
+            make_record(routes=["a:primary", "a:primary"]),
+            make_record(routes=["b:hedged"]),
+            make_record(),
+        ]
+
+        rows = summarize(records, by="route")
+
+        assert [(r.key, r.runs) for r in rows] == [("a:primary", 1), ("b:hedged", 1)]
+
+    def test_by_tool(self):
+        """Should aggregate tool call durations, counting run tokens once."""
+        calls = [
+            ToolCall(name="get_weather", duration=0.2),
+            ToolCall(name="get_weather", duration=0.4),
+            ToolCall(name="web_search", duration=1.0),
+        ]
+
+        rows = summarize([make_record(tool_calls=calls)], by="tool")
+
+        weather = rows[0]
+        assert weather.key == "get_weather"
+        assert weather.runs == 2
+        assert weather.input_tokens == 100
+        assert weather.p95 == pytest.approx(0.39)
+
+    def test_tool_queue_times(self):
+        """Should report tool queue times when grouping by tool."""
+        calls = [
+            ToolCall(name="web_search", duration=1.0, queued=0.5),
+            ToolCall(name="web_search", duration=1.0),
+        ]
+
+        rows = summarize([make_record(tool_calls=calls)], by="tool")
+
+        assert rows[0].queue_times == [0.5, 0.0]
+        assert summarize([make_record(tool_calls=calls)])[0].queue_times == []
+
+
+class TestRecording:
+    """Tests for run recording."""
+
+    @pytest.mark.asyncio
+    async def test_records_run(self, deps, open_meteo):
+        """Should capture usage, tool durations and cache activity."""
+        agent = create_assistant_agent(
+            api_key=SecretStr("secret-api-key"), select_tools=False
+        )
+
+        with agent.override(model=TestModel()), recording() as recorder:
+            result = await agent.run("Weather?", deps=deps)
+
+        record = recorder.finish(result)
+
+        assert record.model == "test"
+        assert record.requests == result.usage().requests
+        assert {c.name for c in record.tool_calls} >= {"get_weather", "web_search"}
+        assert record.cache_misses > 0
+        assert record.latency > 0
+        assert record.timestamp > datetime.now(UTC) - timedelta(minutes=1)
@@ -0,0 +1,163 @@
+import asyncio
+
+import httpx
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+
+from nestor import metrics
+from nestor.agents.execution import ToolTraits, executed
+from nestor.agents.metered import MeteredModel
+from nestor.cache import TTLCache
+from nestor.metrics import Registry
+from nestor.tools.weather import GEOCODING_API, geocode
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+class TestRegistry:
+    """Tests for metrics and their exposition."""
+
+    def test_counter_and_gauge(self, registry):
+        """Should expose counters and gauges per label values."""
+        requests = registry.counter("requests_total", "Requests.", ("host",))
+        in_flight = registry.gauge("in_flight", "Pending.")
+        requests.labels("a").inc()
+        requests.labels("a").inc(2)
+        requests.labels('b"\n').inc()
+        with in_flight.labels().track():
+            in_flight.labels().inc(0.5)
+
+        assert registry.expose() == (
+            "# HELP requests_total Requests.\n"
+            "# TYPE requests_total counter\n"
+            'requests_total{host="a"} 3\n'
+            'requests_total{host="b\\"\\n"} 1\n'
+            "# HELP in_flight Pending.\n"
+            "# TYPE in_flight gauge\n"
+            "in_flight 0.5\n"
+        )
+
+    def test_histogram(self, registry):
+        """Should expose cumulative buckets, sum and count."""
+        latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            latency.labels().observe(value)
+
+        lines = registry.expose().splitlines()
+
+        assert lines[2:] == [
+            'latency_seconds_bucket{le="0.1"} 2',
+            'latency_seconds_bucket{le="1"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            "latency_seconds_sum 3.65",
+            "latency_seconds_count 4",
+        ]
+
+    def test_cache(self, registry):
+        """Should expose cache statistics at exposition time."""
+        cache: TTLCache[str, int] = TTLCache(maxsize=8, ttl=60)
+        registry.cache("test", cache.cache_info)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+
+        text = registry.expose()
+
+        assert 'nestor_cache_hits_total{cache="test"} 1' in text
+        assert 'nestor_cache_misses_total{cache="test"} 1' in text
+        assert 'nestor_cache_entries{cache="test"} 1' in text
+
+    def test_wrong_labels(self, registry):
+        """Should reject label values not matching the label names."""
+        counter = registry.counter("calls_total", "Calls.", ("tool",))
+
+        with pytest.raises(ValueError):
+            counter.labels("a", "b")
+
+    def test_duplicate_name(self, registry):
+        """Should reject registering a name twice."""
+        registry.gauge("x", "X.")
+
+        with pytest.raises(ValueError):
+            registry.counter("x", "X.")
+
+    @pytest.mark.asyncio
+    async def test_serve(self, registry):
+        """Should serve the exposition over HTTP."""
+        registry.counter("hits_total", "Hits.").labels().inc()
+        server = await metrics.serve(port=0, registry=registry)
+        port = server.sockets[0].getsockname()[1]
+
+        async with server, httpx.AsyncClient() as client:
+            response = await client.get(f"http://127.0.0.1:{port}/metrics")
+            missing = await client.get(f"http://127.0.0.1:{port}/")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == metrics.CONTENT_TYPE
+        assert "hits_total 1" in response.text
+        assert missing.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_serve_drops_idle_clients(self, registry, monkeypatch):
+        """Should close connections that send no request in time."""
+        monkeypatch.setattr(metrics, "READ_TIMEOUT", 0.05)
+        server = await metrics.serve(port=0, registry=registry)
+        port = server.sockets[0].getsockname()[1]
+
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            async with asyncio.timeout(1):
+                assert await reader.read() == b""
+            writer.close()
+
+
+class TestInstrumentation:
+    """Tests for the metrics recorded by Néstor."""
+
+    @pytest.mark.asyncio
+    async def test_tool_calls(self):
+        """Should record tool durations and errors."""
+
+        async def flaky(fail: bool) -> None:
+            await asyncio.sleep(0)
+            if fail:
+                raise RuntimeError("boom")
+
+        tool = executed(flaky, ToolTraits())
+        await tool(False)
+        with pytest.raises(RuntimeError):
+            await tool(True)
+
+        assert metrics.tool_seconds.labels("flaky").count == 2
+        assert metrics.tool_errors.labels("flaky").value == 1
+        assert metrics.tools_in_flight.labels("flaky").value == 0
+
+    @pytest.mark.asyncio
+    async def test_upstream_requests(self, open_meteo):
+        """Should record upstream requests per host and outcome."""
+        host = httpx.URL(GEOCODING_API).host
+        ok = metrics.upstream_requests.labels(host, "2xx")
+        before = ok.value
+
+        await geocode("Madrid")
+        await geocode("Madrid")  # Cached
+
+        assert ok.value == before + 1
+        assert 'nestor_cache_hits_total{cache="geocode"} 1' in metrics.expose()
+
+    @pytest.mark.asyncio
+    async def test_model_requests(self):
+        """Should record model requests and tokens per model."""
+        model = MeteredModel(TestModel(custom_output_text="hi"))
+        requests = metrics.model_requests.labels("test", "ok")
+        output = metrics.model_tokens.labels("test", "output")
+        before = requests.value, output.value
+
+        result = await Agent(model).run("Hello")
+
+        assert requests.value == before[0] + 1
+        assert output.value == before[1] + result.usage().output_tokens
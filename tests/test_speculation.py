@@ -0,0 +1,120 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+
+from nestor.ledger import recording
+from nestor.speculation import Guess, Speculation, guess, places
+from nestor.tools.weather import FORECAST_API, GEOCODING_API, get_weather
+
+
+def tool_calls(*calls: tuple[str, dict]) -> list[ModelResponse]:
+    """Model response calling the given tools."""
+    return [ModelResponse(parts=[ToolCallPart(name, args) for name, args in calls])]
+
+
+class TestGuess:
+    """Tests for the prompt matcher."""
+
+    @pytest.mark.parametrize(
+        ("prompt", "expected"),
+        [
+            ("Will it rain in Segovia?", ["Segovia"]),
+            ("Weather in Alcalá de Henares and Ávila", ["Alcalá de Henares", "Ávila"]),
+            (
+                "Forecast for Madrid, Toledo or Cuenca on Monday",
+                ["Madrid", "Toledo", "Cuenca"],
+            ),
+            ("Is it cold in the mountains?", []),
+            ("Temperature in Celsius for Friday", []),
+        ],
+    )
+    def test_places(self, prompt, expected):
+        """Should find capitalized place names after prepositions."""
+        assert places(prompt) == expected
+
+    def test_not_weather(self):
+        """Should not guess for prompts without weather words."""
+        assert guess("What time is it in Tokyo?", "Madrid") is None
+
+    def test_default_location(self):
+        """Should fall back to the default location."""
+        assert guess("Do I need an umbrella?", "Madrid") == Guess(("Madrid",))
+
+    def test_hourly(self):
+        """Should guess hourly forecasts for time-of-day questions."""
+        tomorrow = (datetime.now(UTC).date() + timedelta(days=1)).isoformat()
+
+        result = guess("Can I hang the laundry tomorrow in Segovia? Rain?", "Madrid")
+
+        assert result == Guess(("Segovia",), hourly_dates=(tomorrow,))
+
+
+class TestSpeculation:
+    """Tests for Speculation."""
+
+    @pytest.mark.asyncio
+    async def test_tool_uses_prefetch(self, deps, open_meteo):
+        """Should prefetch while the model thinks, and count the hits."""
+        open_meteo.delay = 0.05
+
+        with recording() as recorder:
+            async with Speculation("Weather in Segovia?", "Madrid") as speculation:
+                await asyncio.sleep(0)  # The first model request
+                forecast = await get_weather(MagicMock(deps=deps), location="Segovia")
+                report = await speculation.settle(
+                    tool_calls(("get_weather", {"location": "Segovia"}))
+                )
+
+        assert forecast is not None
+        assert len(open_meteo.requests(GEOCODING_API)) == 1
+        assert len(open_meteo.requests(FORECAST_API)) == 1
+        assert (report.hits, report.wasted) == (2, 0)
+        assert (recorder.prefetch_hits, recorder.prefetch_wasted) == (2, 0)
+        # The tool joined the prefetch instead of going upstream
+        assert recorder.cache_misses == 0
+
+    @pytest.mark.asyncio
+    async def test_wrong_guess_is_wasted(self, open_meteo):
+        """Should count prefetches no tool used as waste."""
+        async with Speculation("Weather in Segovia?", "Madrid") as speculation:
+            await asyncio.sleep(0.01)
+            report = await speculation.settle(
+                tool_calls(("get_hourly_forecast", {"location": "Segovia"}))
+            )
+
+        assert (report.hits, report.wasted) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_cancels_unused(self, open_meteo):
+        """Should cancel prefetches still running when the run ends."""
+        open_meteo.delay = 10
+
+        async with Speculation("Weather in Segovia?", "Madrid") as speculation:
+            await asyncio.sleep(0.01)
+            report = await speculation.settle([])
+
+        assert all(task.done() for task in speculation._tasks)
+        assert (report.hits, report.wasted) == (0, 1)
+
+    @pytest.mark.asyncio
+    async def test_cached_data_not_reported(self, open_meteo):
+        """Should only report prefetches that went upstream."""
+        for _ in range(2):
+            async with Speculation("Weather in Segovia?", "Madrid") as speculation:
+                await asyncio.sleep(0.01)
+                report = await speculation.settle([])
+
+        assert report.requests == 0
+        assert len(open_meteo.requests(FORECAST_API)) == 1
+
+    @pytest.mark.asyncio
+    async def test_no_guess(self, open_meteo):
+        """Should do nothing for prompts it can't guess."""
+        async with Speculation("Tell me a joke", "Madrid") as speculation:
+            report = await speculation.settle([])
+
+        assert report.requests == 0
+        assert open_meteo.calls == []
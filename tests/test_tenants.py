@@ -0,0 +1,156 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from nestor.tenants import (
+    JsonProfileStore,
+    MemoryProfileStore,
+    Tenancy,
+    UserProfile,
+    deps_from_settings,
+)
+from nestor.tools.websearch import ddgs_pool, search_cache, web_search
+
+
+@pytest.fixture
+def store():
+    return MemoryProfileStore(
+        {
+            "ana": UserProfile(default_location="Segovia"),
+            "bob": UserProfile(default_location="Segovia"),
+            "kid": UserProfile(safesearch="on"),
+        }
+    )
+
+
+class TestUserProfile:
+    """Tests for UserProfile."""
+
+    def test_apply_overrides(self, deps):
+        """Should override only the fields set in the profile."""
+        result = UserProfile(safesearch="off").apply(deps)
+
+        assert result.safesearch == "off"
+        assert result.default_location == deps.default_location
+
+    def test_empty_profile_returns_base(self, deps):
+        """Should reuse the base deps without overrides."""
+        assert UserProfile().apply(deps) is deps
+
+
+class TestTenancy:
+    """Tests for Tenancy."""
+
+    def test_resolves_profiles(self, store, deps):
+        """Should apply each user's profile."""
+        tenancy = Tenancy(store, base=deps)
+
+        assert tenancy.deps_for("ana").default_location == "Segovia"
+        assert tenancy.deps_for("kid").safesearch == "on"
+        assert tenancy.deps_for("unknown") is deps
+
+    def test_shares_equal_deps(self, store, deps):
+        """Should intern deps so users with equal settings share one instance."""
+        tenancy = Tenancy(store, base=deps)
+
+        assert tenancy.deps_for("ana") is tenancy.deps_for("bob")
+
+    def test_many_users_few_instances(self, deps):
+        """Should keep memory bounded by distinct settings, not users."""
+        store = MemoryProfileStore(
+            {
+                f"user{i}": UserProfile(safesearch="on" if i % 2 else "off")
+                for i in range(5000)
+            }
+        )
+        tenancy = Tenancy(store, base=deps)
+
+        resolved = [tenancy.deps_for(f"user{i}") for i in range(5000)]
+
+        assert len({id(d) for d in resolved}) == 2
+        assert tenancy.distinct_deps == 2
+
+    def test_caches_resolution(self, deps):
+        """Should not hit the store again for known users."""
+        store = MagicMock()
+        store.get.return_value = UserProfile(default_location="Ávila")
+        tenancy = Tenancy(store, base=deps)
+
+        tenancy.deps_for("ana")
+        tenancy.deps_for("ana")
+
+        store.get.assert_called_once_with("ana")
+
+    def test_bounded_cache(self, store, deps):
+        """Should evict least recently used users."""
+        tenancy = Tenancy(store, base=deps, cache_size=1)
+        tenancy.deps_for("ana")
+        tenancy.deps_for("kid")
+
+        assert list(tenancy._resolved) == ["kid"]
+
+    def test_invalidate(self, store, deps):
+        """Should pick up profile changes after invalidation."""
+        tenancy = Tenancy(store, base=deps)
+        tenancy.deps_for("ana")
+
+        store.set("ana", UserProfile(default_location="Toledo"))
+        tenancy.invalidate("ana")
+
+        assert tenancy.deps_for("ana").default_location == "Toledo"
+
+
+class TestJsonProfileStore:
+    """Tests for JsonProfileStore."""
+
+    def test_loads_profiles(self, tmp_path):
+        """Should read profiles keyed by user ID."""
+        path = tmp_path / "profiles.json"
+        path.write_text(json.dumps({"ana": {"default_location": "Segovia"}}))
+
+        store = JsonProfileStore(path)
+
+        assert store.get("ana") == UserProfile(default_location="Segovia")
+        assert store.get("bob") is None
+
+    def test_missing_file(self, tmp_path):
+        """Should start empty without a file."""
+        assert JsonProfileStore(tmp_path / "missing.json").profiles == {}
+
+
+class TestSharedSearchCache:
+    """Tests for search caching across users."""
+
+    @pytest.mark.asyncio
+    async def test_partitioned_by_safesearch_only(self, store, deps):
+        """Should share results between users unless their settings differ."""
+        search_cache.clear()
+        ddgs_pool.clear()
+        tenancy = Tenancy(store, base=deps)
+
+        with patch("nestor.tools.websearch.DDGS") as MockDDGS:
+            MockDDGS.return_value.text.return_value = []
+            for user in ("ana", "bob", "unknown", "kid"):
+                ctx = MagicMock(deps=tenancy.deps_for(user))
+                await web_search(
+                    ctx, "news", max_results=5, region="ww-en", timelimit=None
+                )
+
+        # One search for moderate safesearch users, one for the kid
+        assert MockDDGS.return_value.text.call_count == 2
+
+
+def test_deps_from_settings():
+    """Should build base deps from settings."""
+    settings = MagicMock(
+        search_backend="wikipedia",
+        safesearch="on",
+        default_location="Ávila",
+        search_token_budget=100,
+    )
+
+    deps = deps_from_settings(settings)
+
+    assert deps.search_backend == "wikipedia"
+    assert deps.deadline is None
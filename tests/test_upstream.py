@@ -0,0 +1,56 @@
+"""Tests for upstream request rates."""
+
+import asyncio
+import time
+
+import pytest
+
+from nestor.tools.weather import geocode
+from nestor.upstream import OPEN_METEO, Upstream
+
+
+class TestUpstream:
+    """Tests for Upstream."""
+
+    @pytest.mark.asyncio
+    async def test_spaces_requests(self):
+        """Should admit requests at the upstream's rate, in order."""
+        upstream = Upstream("test", per_minute=3000, burst=1)  # One per 20 ms
+
+        start = time.perf_counter()
+        await asyncio.gather(*(upstream.admit() for _ in range(3)))
+
+        assert time.perf_counter() - start >= 0.035
+
+    @pytest.mark.asyncio
+    async def test_cancelled_wait_returns_slot(self):
+        """Should give back the slot of a request cancelled while waiting."""
+        upstream = Upstream("test", per_minute=60, burst=1)  # One per second
+        await upstream.admit()
+
+        waiting = asyncio.create_task(upstream.admit())
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        assert upstream.bucket.delay(1) < 1.1
+
+
+@pytest.mark.asyncio
+async def test_admits_requests_sent_only(open_meteo, monkeypatch):
+    """Should admit upstream requests, not cached lookups."""
+    admitted = 0
+    admit = OPEN_METEO.admit
+
+    async def counting() -> None:
+        nonlocal admitted
+        admitted += 1
+        await admit()
+
+    monkeypatch.setattr(OPEN_METEO, "admit", counting)
+
+    await geocode("Madrid")
+    await geocode("Madrid")
+
+    assert admitted == 1
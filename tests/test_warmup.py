@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from nestor.tools.weather import FORECAST_API, GEOCODING_API, request_daily
+from nestor.warmup import Warmer, warm_up
+
+
+class TestWarmUp:
+    """Tests for warm_up."""
+
+    @pytest.mark.asyncio
+    async def test_prefetches_forecasts(self, open_meteo):
+        """Should resolve locations and fetch daily and hourly forecasts."""
+        results = await warm_up(["Madrid", "Segovia"])
+
+        assert [r.location for r in results] == ["Madrid", "Segovia"]
+        assert all(r.error is None for r in results)
+        assert len(open_meteo.requests(GEOCODING_API)) == 2
+        forecasts = open_meteo.requests(FORECAST_API)
+        hourly = [r for r in forecasts if "hourly" in r.url.params]
+        daily = [r for r in forecasts if "daily" in r.url.params]
+        assert len(hourly) == 2
+        # Daily forecasts may share a multi-location request
+        assert sum(r.url.params["latitude"].count(",") + 1 for r in daily) == 2
+
+    @pytest.mark.asyncio
+    async def test_warm_calls_hit_cache(self, open_meteo):
+        """Should not refetch already warm locations."""
+        await warm_up(["Madrid"])
+        await warm_up(["Madrid"])
+
+        assert len(open_meteo.requests(FORECAST_API)) == 2
+
+    @pytest.mark.asyncio
+    async def test_refresh_replaces_forecasts(self, open_meteo):
+        """Should refetch forecasts, but not geocodes, on refresh."""
+        await warm_up(["Madrid"])
+        await warm_up(["Madrid"], refresh=True)
+
+        assert len(open_meteo.requests(GEOCODING_API)) == 1
+        assert len(open_meteo.requests(FORECAST_API)) == 4
+        assert request_daily.cache_info().currsize == 1
+
+    @pytest.mark.asyncio
+    async def test_reports_errors(self, open_meteo):
+        """Should report failures instead of raising."""
+        open_meteo.fail = True
+
+        results = await warm_up(["Nowhere", "Madrid"])
+
+        assert results[0].error == "location not found"
+        assert results[1].geo is not None
+        assert "HTTPStatusError" in results[1].error
+
+
+class TestWarmer:
+    """Tests for the background Warmer."""
+
+    @pytest.mark.asyncio
+    async def test_refreshes_periodically(self, open_meteo):
+        """Should warm on start and refresh every interval."""
+        async with Warmer(["Madrid", "Madrid"], interval=0.01) as warmer:
+            assert warmer.locations == ["Madrid"]
+            await asyncio.sleep(0.1)
+
+        assert not warmer.running
+        assert len(open_meteo.requests(FORECAST_API)) > 2
+
+    @pytest.mark.asyncio
+    async def test_no_locations(self):
+        """Should not start without locations."""
+        warmer = Warmer([])
+        warmer.start()
+
+        assert not warmer.running
+        await warmer.stop()
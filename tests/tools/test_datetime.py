@@ -3,7 +3,12 @@ from unittest.mock import patch
 
 import pytest
 
-from nestor.tools.datetime import get_current_date, get_current_time
+from nestor.tools.datetime import (
+    get_current_date,
+    get_current_time,
+    get_current_times,
+    zone,
+)
 
 
 @pytest.fixture
@@ -44,6 +49,63 @@ class TestGetCurrentTime:
         assert "2025-01-15T12:00:00" in result
 
 
+class TestGetCurrentTimes:
+    """Tests for get_current_times."""
+
+    def test_one_instant_for_all_zones(self, ctx, now):
+        """Should convert a single clock reading to every timezone."""
+        now.return_value = datetime(2025, 1, 15, 20, 30, tzinfo=UTC)
+
+        tokyo, new_york, london = get_current_times(
+            ctx, ["Asia/Tokyo", "America/New_York", "Europe/London"]
+        )
+
+        assert now.call_count == 1
+        assert tokyo.time == "2025-01-16T05:30:00+09:00"
+        assert (tokyo.utc_offset, tokyo.weekday, tokyo.day_offset) == (
+            "+09:00",
+            "Thursday",
+            1,
+        )
+        assert new_york.time == "2025-01-15T15:30:00-05:00"
+        assert new_york.day_offset == 0
+        assert london.utc_offset == "+00:00"
+
+    @pytest.mark.parametrize(
+        ("query", "expected"),
+        [
+            ("Tokyo", "Asia/Tokyo"),
+            ("new york", "America/New_York"),
+            ("europe/madrid", "Europe/Madrid"),
+            ("UTC", "UTC"),
+        ],
+    )
+    def test_resolves_city_names(self, ctx, query, expected):
+        """Should accept cities and case-insensitive IANA names."""
+        [result] = get_current_times(ctx, [query])
+
+        assert result.timezone == expected
+
+    def test_reports_invalid_zones_per_item(self, ctx):
+        """Should report unknown timezones without failing the others."""
+        valid, invalid, empty = get_current_times(
+            ctx, ["Europe/Madrid", "Invalid/Timezone", ""]
+        )
+
+        assert valid.error is None and valid.time is not None
+        assert invalid.error is not None and invalid.time is None
+        assert empty.error is not None
+
+    def test_caches_zones(self):
+        """Should resolve each name once."""
+        zone.cache_clear()
+
+        zone("Tokyo")
+        zone("Tokyo")
+
+        assert zone.cache_info().hits == 1
+
+
 class TestGetCurrentDate:
     """Tests for get_current_date."""
 
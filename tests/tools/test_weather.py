@@ -0,0 +1,214 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+from nestor.tools.weather import (
+    FORECAST_API,
+    GEOCODING_API,
+    MAX_BATCH_LOCATIONS,
+    daily_variables_seen,
+    fetch_daily,
+    get_hourly_forecast,
+    get_weather,
+    request_daily,
+)
+
+
+@pytest.fixture
+def ctx(deps):
+    """Mock RunContext with deps."""
+    mock_ctx = MagicMock()
+    mock_ctx.deps = deps
+    return mock_ctx
+
+
+class TestGetWeather:
+    """Tests for get_weather."""
+
+    @pytest.mark.asyncio
+    async def test_uses_default_location(self, ctx, open_meteo):
+        """Should geocode the default location when none is given."""
+        result = await get_weather(ctx)
+
+        assert result is not None
+        assert result.location == "Madrid"
+        assert open_meteo.requests(GEOCODING_API)[0].url.params["name"] == "Madrid"
+
+    @pytest.mark.asyncio
+    async def test_slices_forecast_days(self, ctx, open_meteo):
+        """Should return the requested number of days, starting today."""
+        result = await get_weather(ctx, forecast_days=2)
+
+        assert result is not None
+        today = datetime.now(UTC).date()
+        assert [day.date for day in result.days] == [
+            today.isoformat(),
+            (today + timedelta(days=1)).isoformat(),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_serves_shorter_ranges_from_cache(self, ctx, open_meteo):
+        """Should fetch once for any number of forecast days."""
+        await get_weather(ctx, forecast_days=7)
+        await get_weather(ctx, forecast_days=1)
+        await get_weather(ctx)
+
+        assert len(open_meteo.requests(FORECAST_API)) == 1
+
+    @pytest.mark.asyncio
+    async def test_skips_past_days(self, ctx, open_meteo):
+        """Should skip cached days before the location's current date."""
+        open_meteo.start = datetime.now(UTC).date() - timedelta(days=1)
+
+        result = await get_weather(ctx, forecast_days=1)
+
+        assert result is not None
+        assert result.days[0].date == datetime.now(UTC).date().isoformat()
+
+    @pytest.mark.asyncio
+    async def test_location_not_found(self, ctx, open_meteo):
+        """Should return None for unknown locations."""
+        result = await get_weather(ctx, location="Nowhere")
+
+        assert result is None
+        assert open_meteo.requests(FORECAST_API) == []
+
+    @pytest.mark.asyncio
+    async def test_upstream_errors_are_not_cached(self, ctx, open_meteo):
+        """Should retry the forecast after an upstream error."""
+        open_meteo.fail = True
+        with pytest.raises(Exception):
+            await get_weather(ctx)
+
+        open_meteo.fail = False
+        assert await get_weather(ctx) is not None
+        assert request_daily.cache_info().currsize == 1
+
+
+class TestProjection:
+    """Tests for forecasts narrowed to some fields."""
+
+    @pytest.mark.asyncio
+    async def test_narrows_query_and_result(self, ctx, open_meteo):
+        """Should request and return only the fields asked for."""
+        result = await get_weather(ctx, fields=["precipitation"])
+
+        [request] = open_meteo.requests(FORECAST_API)
+        assert set(request.url.params["daily"].split(",")) == {
+            "precipitation_sum",
+            "precipitation_hours",
+            "precipitation_probability_max",
+            "weather_code",
+        }
+        assert result is not None
+        day = result.days[0].model_dump()
+        assert day["precipitation_probability_max"] == 1
+        assert "temp_max" not in day
+        assert "temp_max" not in result.model_dump_json()
+
+    @pytest.mark.asyncio
+    async def test_serves_narrower_from_wider(self, ctx, open_meteo):
+        """Should reuse a cached wider response for narrower fields."""
+        await get_weather(ctx)
+        result = await get_weather(ctx, fields=["wind"])
+
+        assert len(open_meteo.requests(FORECAST_API)) == 1
+        assert result is not None
+        assert set(result.days[0].model_dump()) == {
+            "date",
+            "wind_speed_max",
+            "wind_gusts_max",
+            "weather_code",
+            "weather_description",
+        }
+
+    @pytest.mark.asyncio
+    async def test_widens_cached_projection(self, ctx, open_meteo):
+        """Should fetch the union for wider fields, then serve both from it."""
+        await get_weather(ctx, fields=["wind"])
+        await get_weather(ctx, fields=["temperature"])
+        await get_weather(ctx, fields=["wind"])
+
+        first, second = open_meteo.requests(FORECAST_API)
+        assert "temperature_2m_max" not in first.url.params["daily"]
+        assert {"temperature_2m_max", "wind_speed_10m_max"} <= set(
+            second.url.params["daily"].split(",")
+        )
+
+    @pytest.mark.asyncio
+    async def test_hourly_wind(self, ctx, open_meteo):
+        """Should add hourly wind only when asked for."""
+        default = await get_hourly_forecast(ctx, date="2025-01-15")
+        windy = await get_hourly_forecast(ctx, date="2025-01-15", fields=["wind"])
+
+        assert default is not None and windy is not None
+        assert default.hours[0].wind_speed is None
+        assert windy.hours[0].wind_speed == 1
+        assert windy.hours[0].temp is None
+        assert len(open_meteo.requests(FORECAST_API)) == 2
+
+
+class TestFetchDaily:
+    """Tests for multi-location batching of daily forecasts."""
+
+    @pytest.mark.asyncio
+    async def test_batches_concurrent_fetches(self, open_meteo):
+        """Should fetch concurrent locations in one request, in chunks."""
+        n = MAX_BATCH_LOCATIONS + 2
+        coordinates = [(40.0 + i / 100, -3.7) for i in range(n)]
+
+        results = await asyncio.gather(
+            *(fetch_daily(lat, lon) for lat, lon in coordinates)
+        )
+
+        assert [r["latitude"] for r in results] == [lat for lat, _ in coordinates]
+        assert len(open_meteo.requests(FORECAST_API)) == 2
+
+    @pytest.mark.asyncio
+    async def test_batch_errors_fail_every_location(self, open_meteo):
+        """Should raise the upstream error for every location of a batch."""
+        open_meteo.fail = True
+
+        results = await asyncio.gather(
+            fetch_daily(40.1, -3.7), fetch_daily(40.2, -3.7), return_exceptions=True
+        )
+
+        assert all(isinstance(r, Exception) for r in results)
+        assert request_daily.cache_info().currsize == 0
+
+    @pytest.mark.asyncio
+    async def test_refresh_renews_widest_variables(self, open_meteo):
+        """Should keep the widest variables as long as the refetched response."""
+        await fetch_daily(40.4, -3.7)
+        expires = daily_variables_seen._data[40.4, -3.7][0]
+        await asyncio.sleep(0.01)
+
+        await fetch_daily(40.4, -3.7, ["weather_code"], refresh=True)
+
+        assert daily_variables_seen._data[40.4, -3.7][0] > expires
+        assert len(open_meteo.requests(FORECAST_API)) == 2
+
+
+class TestGetHourlyForecast:
+    """Tests for get_hourly_forecast."""
+
+    @pytest.mark.asyncio
+    async def test_returns_hours(self, ctx, open_meteo):
+        """Should return 24 hours for the requested date."""
+        result = await get_hourly_forecast(ctx, date="2025-01-15")
+
+        assert result is not None
+        assert result.date == "2025-01-15"
+        assert len(result.hours) == 24
+        assert result.hours[0].time == "00:00"
+
+    @pytest.mark.asyncio
+    async def test_caches_per_date(self, ctx, open_meteo):
+        """Should fetch each date once."""
+        await get_hourly_forecast(ctx, date="2025-01-15")
+        await get_hourly_forecast(ctx, date="2025-01-15")
+        await get_hourly_forecast(ctx, date="2025-01-16")
+
+        assert len(open_meteo.requests(FORECAST_API)) == 2
@@ -0,0 +1,241 @@
+import dataclasses
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from nestor import http
+from nestor.tools import webpage
+from nestor.tools.webpage import (
+    MAX_PAGE_BYTES,
+    PAGE_FRESH_TTL,
+    TextExtractor,
+    fetch_page,
+    page_cache,
+)
+
+ARTICLE = """<!doctype html>
+<html><head><title>Dante Alighieri</title><style>p { color: red }</style></head>
+<body>
+  <nav><a href="/">Home</a> | <a href="/about">About</a></nav>
+  <main>
+    <h1>Dante Alighieri</h1>
+    <p>Italian poet, writer and philosopher &amp; author of the
+       <i>Divine Comedy</i>.</p>
+    <script>track()</script>
+  </main>
+  <footer>© 2025 Example</footer>
+</body></html>"""
+
+
+@pytest.fixture
+def ctx(deps):
+    """Mock RunContext with deps."""
+    mock_ctx = MagicMock()
+    mock_ctx.deps = deps
+    return mock_ctx
+
+
+class FakeSite:
+    """Site serving `body` with validators, counting requests.
+
+    Hosts resolve to a public address unless listed in `dns`, and paths in
+    `redirects` redirect to their URL.
+    """
+
+    def __init__(self):
+        self.body = ARTICLE.encode()
+        self.content_type = "text/html; charset=utf-8"
+        self.requests: list[httpx.Request] = []
+        self.streamed = 0
+        self.dns: dict[str, list[str]] = {}
+        self.redirects: dict[str, str] = {}
+
+    async def resolve(self, host: str, port: int) -> list[str]:
+        return self.dns.get(host, ["93.184.215.14"])
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.path in self.redirects:
+            location = self.redirects[request.url.path]
+            return httpx.Response(302, headers={"location": location})
+        headers = {"content-type": self.content_type, "etag": '"v1"'}
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers=headers)
+        return httpx.Response(200, headers=headers, stream=self._stream())
+
+    def _stream(self) -> httpx.AsyncByteStream:
+        site = self
+
+        class Stream(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                for i in range(0, len(site.body), 1024):
+                    site.streamed += 1
+                    yield site.body[i : i + 1024]
+
+        return Stream()
+
+
+@pytest.fixture
+def site():
+    site = FakeSite()
+    page_cache.clear()
+    with (
+        patch.object(http, "transport", httpx.MockTransport(site.handler)),
+        patch.object(webpage, "resolve_host", site.resolve),
+    ):
+        http.reset()
+        yield site
+    http.reset()
+
+
+class TestTextExtractor:
+    """Tests for TextExtractor."""
+
+    def test_extracts_main_text(self):
+        """Should keep content text and drop boilerplate and code."""
+        extractor = TextExtractor()
+        # Fed in small chunks, as when streaming
+        for i in range(0, len(ARTICLE), 7):
+            extractor.feed(ARTICLE[i : i + 7])
+        extractor.close()
+
+        assert extractor.title == "Dante Alighieri"
+        assert extractor.text() == (
+            "Dante Alighieri\n"
+            "Italian poet, writer and philosopher & author of the Divine Comedy."
+        )
+
+
+class TestFetchPage:
+    """Tests for fetch_page."""
+
+    @pytest.mark.asyncio
+    async def test_fetches_page(self, ctx, site):
+        """Should return the page title and main text."""
+        page = await fetch_page(ctx, "https://example.com/dante")
+
+        assert page is not None
+        assert page.title == "Dante Alighieri"
+        assert "Divine Comedy" in page.text
+        assert "Home" not in page.text
+        assert not page.truncated
+
+    @pytest.mark.asyncio
+    async def test_truncates_to_token_budget(self, ctx, site):
+        """Should stop streaming once enough text is extracted."""
+        site.body = ("<html><body>" + "<p>word " * 100_000 + "</body></html>").encode()
+        ctx.deps = dataclasses.replace(ctx.deps, page_token_budget=50)
+
+        page = await fetch_page(ctx, "https://example.com/long")
+
+        assert page is not None
+        assert page.truncated
+        assert len(page.text) <= 50 * 4 + 1
+        assert site.streamed < len(site.body) // 1024
+
+    @pytest.mark.asyncio
+    async def test_byte_cap(self, ctx, site):
+        """Should never download more than the byte cap."""
+        site.content_type = "text/plain"
+        site.body = b" " * (MAX_PAGE_BYTES + 10_000)
+
+        page = await fetch_page(ctx, "https://example.com/blank.txt")
+
+        assert page is not None
+        assert page.truncated
+        assert site.streamed <= MAX_PAGE_BYTES // 1024 + 1
+
+    @pytest.mark.asyncio
+    async def test_cached_then_revalidated(self, ctx, site):
+        """Should serve fresh pages from cache and revalidate stale ones."""
+        first = await fetch_page(ctx, "https://example.com/dante")
+        await fetch_page(ctx, "https://example.com/dante")
+        assert len(site.requests) == 1
+
+        later = page_cache._data["https://example.com/dante"][1].fetched
+        with patch(
+            "nestor.tools.webpage.time.monotonic",
+            return_value=later + PAGE_FRESH_TTL + 1,
+        ):
+            again = await fetch_page(ctx, "https://example.com/dante")
+
+        assert again == first
+        assert len(site.requests) == 2
+        assert site.requests[-1].headers["if-none-match"] == '"v1"'
+
+    @pytest.mark.asyncio
+    async def test_reuses_pooled_client(self, ctx, site):
+        """Should share one client across fetches."""
+        await fetch_page(ctx, "https://example.com/a")
+        client = http.get_client()
+        await fetch_page(ctx, "https://example.com/b")
+
+        assert http.get_client() is client
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("url", ["file:///etc/passwd", "ftp://example.com/x"])
+    async def test_rejects_non_http(self, ctx, site, url):
+        """Should only fetch http(s) URLs."""
+        assert await fetch_page(ctx, url) is None
+        assert site.requests == []
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "http://169.254.169.254/latest/meta-data/",
+            "http://127.0.0.1:8080/",
+            "http://[::1]/",
+            "http://10.0.0.1/",
+        ],
+    )
+    async def test_rejects_private_address(self, ctx, site, url):
+        """Should not connect to non-public IP literals."""
+        assert await fetch_page(ctx, url) is None
+        assert site.requests == []
+
+    @pytest.mark.asyncio
+    async def test_rejects_host_resolving_to_loopback(self, ctx, site):
+        """Should check the addresses a hostname resolves to."""
+        site.dns["intranet.example.com"] = ["93.184.215.14", "127.0.0.1"]
+
+        assert await fetch_page(ctx, "https://intranet.example.com/") is None
+        assert site.requests == []
+
+    @pytest.mark.asyncio
+    async def test_rejects_redirect_to_private_address(self, ctx, site):
+        """Should check every redirect before following it."""
+        site.redirects["/go"] = "http://192.168.1.1/admin"
+
+        assert await fetch_page(ctx, "https://example.com/go") is None
+        assert [str(request.url) for request in site.requests] == [
+            "https://example.com/go"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_follows_redirects(self, ctx, site):
+        """Should follow redirects to public addresses."""
+        site.redirects["/old"] = "/dante"
+
+        page = await fetch_page(ctx, "https://example.com/old")
+
+        assert page is not None
+        assert page.url == "https://example.com/dante"
+        assert len(site.requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_unsupported_content_type(self, ctx, site):
+        """Should return None for binary content."""
+        site.content_type = "application/pdf"
+
+        assert await fetch_page(ctx, "https://example.com/doc.pdf") is None
+
+    @pytest.mark.asyncio
+    async def test_http_error(self, ctx, site):
+        """Should return None on HTTP errors."""
+        site.handler = lambda request: httpx.Response(404)
+        http.transport = httpx.MockTransport(site.handler)
+        http.reset()
+
+        assert await fetch_page(ctx, "https://example.com/missing") is None
@@ -4,7 +4,14 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-from nestor.tools.websearch import web_search
+from nestor.tokens import estimate_tokens
+from nestor.tools.websearch import (
+    bm25_scores,
+    ddgs_pool,
+    postprocess,
+    search_cache,
+    web_search,
+)
 
 
 @pytest.fixture
@@ -17,6 +24,8 @@ def ctx(deps):
 
 @pytest.fixture
 def ddgs():
+    search_cache.clear()
+    ddgs_pool.clear()
     with patch("nestor.tools.websearch.DDGS") as MockDDGS:
         ddgs = MagicMock()
         MockDDGS.return_value = ddgs
@@ -145,3 +154,93 @@ class TestWebSearch:
         call_kwargs = ddgs.text.call_args.kwargs
         assert call_kwargs["safesearch"] == custom_deps.safesearch
         assert call_kwargs["backend"] == custom_deps.search_backend
+
+
+def result(href: str, body: str, title: str = "Title") -> dict:
+    return {"title": title, "href": href, "body": body}
+
+
+class TestPostprocess:
+    """Tests for search result post-processing."""
+
+    def test_bm25_prefers_matching_documents(self):
+        """Should score documents containing query terms higher."""
+        scores = bm25_scores(
+            "python tutorial",
+            [["cooking", "recipes"], ["python", "tutorial"], ["python", "news"]],
+        )
+
+        assert scores[1] > scores[2] > scores[0]
+
+    def test_reranks_by_relevance(self):
+        """Should move relevant results ahead of irrelevant ones."""
+        results = [
+            result("https://a.com", "Celebrity gossip and fashion trends today"),
+            result("https://b.com", "Dante Alighieri was an Italian poet"),
+            result("https://c.com", "Dante Alighieri wrote the Divine Comedy"),
+        ]
+
+        ranked = postprocess("Dante Alighieri", results, token_budget=1000)
+
+        assert ranked[-1]["href"] == "https://a.com"
+
+    def test_removes_duplicate_urls(self):
+        """Should drop results pointing to the same page."""
+        results = [
+            result("https://www.example.com/page/", "First copy of the page"),
+            result("http://example.com/page?utm_source=x", "Second copy, other text"),
+        ]
+
+        assert len(postprocess("page", results, token_budget=1000)) == 1
+
+    def test_removes_near_duplicate_content(self):
+        """Should drop mirrors with nearly identical snippets."""
+        body = "Python is a programming language that lets you work quickly"
+        results = [
+            result("https://python.org", body),
+            result("https://mirror.net/python", body + " and integrate"),
+            result("https://other.com", "Snakes of the world, a field guide"),
+        ]
+
+        hrefs = [r["href"] for r in postprocess("python", results, 1000)]
+
+        assert hrefs == ["https://python.org", "https://other.com"]
+
+    def test_trims_to_token_budget(self):
+        """Should keep total tokens within budget."""
+        results = [
+            result(f"https://site{i}.com", f"topic{i} " + "word " * 400)
+            for i in range(6)
+        ]
+
+        processed = postprocess("word", results, token_budget=300)
+
+        total = sum(
+            estimate_tokens(r["title"])
+            + estimate_tokens(r["href"])
+            + estimate_tokens(r["body"])
+            for r in processed
+        )
+        assert total <= 300
+        assert all(r["body"].endswith("…") for r in processed)
+
+    def test_keeps_best_result_over_budget(self):
+        """Should always return at least one result."""
+        results = [result("https://a.com", "word " * 1000)]
+
+        assert len(postprocess("word", results, token_budget=1)) == 1
+
+    @pytest.mark.asyncio
+    async def test_web_search_applies_budget(self, deps, ddgs):
+        """Should post-process results with the budget from deps."""
+        ctx = MagicMock(deps=dataclasses.replace(deps, search_token_budget=50))
+        ddgs.text.return_value = [
+            result(f"https://site{i}.com", f"topic{i} " + "word " * 100)
+            for i in range(5)
+        ]
+
+        results = await web_search(
+            ctx, "word", max_results=5, region="ww-en", timelimit=None
+        )
+
+        assert 0 < len(results) < 5